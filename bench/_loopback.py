@@ -0,0 +1,197 @@
+"""Outils communs aux benchmarks : deux noeuds sur 127.0.0.1 avec perte simulee."""
+import heapq
+import os
+import random
+import secrets
+import tempfile
+import threading
+import time
+
+from src.network.file_transfer import FileTransfer
+from src.network.peer_table import PeerTable
+from src.network.secure_channel import SecureChannel
+from src.protocol.packet import TYPE_SECURE_MSG
+from src.security.resumption import ResumptionStore
+from src.security.trust_store import TrustStore
+
+
+class LossySocket:
+    """Enveloppe un socket UDP et jette une fraction des paquets securises emis.
+
+    Avec `link_mtu`, la perte s'applique a chaque fragment IP qu'un lien de
+    cette MTU produirait : un datagramme de n fragments est perdu avec une
+    probabilite 1 - (1 - perte)^n.
+    """
+
+    def __init__(self, sock, loss=0.0, seed=None, link_mtu=None):
+        self._sock = sock
+        self.loss = loss
+        self.link_mtu = link_mtu
+        self.dropped = 0
+        self._rng = random.Random(seed)
+
+    def sendto(self, data, addr):
+        if self.loss and len(data) > 5 and data[5] == TYPE_SECURE_MSG:
+            fragments = 1
+            if self.link_mtu:
+                fragments = -(-(len(data) + 8) // (self.link_mtu - 20))
+            if self._rng.random() < 1 - (1 - self.loss) ** fragments:
+                self.dropped += 1
+                return len(data)
+        return self._sock.sendto(data, addr)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class DelayedSocket:
+    """Enveloppe un socket UDP et retarde chaque envoi de `delay` secondes (latence de lien)."""
+
+    def __init__(self, sock, delay):
+        self._sock = sock
+        self.delay = delay
+        self._queue = []  # tas de (echeance, seq, data, addr)
+        self._seq = 0
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def sendto(self, data, addr):
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._queue, (time.time() + self.delay, self._seq, bytes(data), addr))
+            self._cond.notify()
+        return len(data)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue or self._queue[0][0] > time.time():
+                    timeout = self._queue[0][0] - time.time() if self._queue else None
+                    self._cond.wait(timeout)
+                _, _, data, addr = heapq.heappop(self._queue)
+            try:
+                self._sock.sendto(data, addr)
+            except OSError:
+                pass  # socket ferme a l'arret du noeud
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class ThrottledSocket:
+    """Limite le debit emis par un socket (seau a jetons, en octets/s)."""
+
+    def __init__(self, sock, rate):
+        self._sock = sock
+        self._rate = rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def sendto(self, data, addr):
+        with self._lock:
+            now = time.time()
+            self._next = max(self._next, now) + len(data) / self._rate
+            delay = self._next - now - len(data) / self._rate
+        if delay > 0:
+            time.sleep(delay)
+        return self._sock.sendto(data, addr)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class LoopbackNode:
+    def __init__(
+        self,
+        root,
+        port,
+        loss=0.0,
+        seed=None,
+        transfer_opts=None,
+        node_id=None,
+        resume=False,
+        **channel_opts,
+    ):
+        # `node_id` connu : redemarrage du meme noeud (memes fichiers sous root).
+        self.node_id = node_id or secrets.token_hex(32)
+        self.dir = os.path.join(root, self.node_id[:8])
+        self.table = PeerTable()
+        self.trust = TrustStore(path=os.path.join(self.dir, "trust.json"))
+        if resume:
+            channel_opts["resumption"] = ResumptionStore(os.path.join(self.dir, "resumption.json"))
+        self.secure = SecureChannel(
+            self.node_id, self.table, self.trust, secure_port=port, **channel_opts
+        )
+        self.secure._socket = LossySocket(self.secure._socket, loss, seed)
+        self.transfer = FileTransfer(
+            self.node_id,
+            self.secure,
+            share_dir=os.path.join(self.dir, "share"),
+            download_dir=os.path.join(self.dir, "downloads"),
+            **(transfer_opts or {}),
+        )
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self.secure.listen, daemon=True),
+            threading.Thread(target=self._tick_loop, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _tick_loop(self):
+        while self._running:
+            self.transfer.tick()
+            time.sleep(0.2)
+
+    def stop(self):
+        self._running = False
+        self.secure.stop()
+        self.transfer.stop()
+        self.trust.flush()
+
+
+def make_pair(root, base_port, loss=0.0, **channel_opts):
+    a = LoopbackNode(root, base_port, loss, seed=1, **channel_opts)
+    b = LoopbackNode(root, base_port + 1, loss, seed=2, **channel_opts)
+    a.table.update(b.node_id, "127.0.0.1", port=base_port + 1)
+    b.table.update(a.node_id, "127.0.0.1", port=base_port)
+    return a, b
+
+
+def make_file(root, size, name="payload.bin", compressible=False):
+    path = os.path.join(root, name)
+    with open(path, "wb") as f:
+        if compressible:
+            # Journal realiste : horodatage et champs variables, pas une ligne repetee.
+            rng = random.Random(size)
+            levels = ("INFO", "INFO", "INFO", "DEBUG", "WARN")
+            lines = []
+            total = 0
+            i = 0
+            while total < size:
+                line = (
+                    f"2024-01-01 12:{i // 60 % 60:02d}:{i % 60:02d}.{rng.randrange(1000):03d} "
+                    f"{rng.choice(levels)} archipel transfer chunk={i} peer={rng.getrandbits(32):08x} "
+                    f"rtt={rng.uniform(1, 80):.1f}ms ok\n"
+                ).encode("ascii")
+                lines.append(line)
+                total += len(line)
+                i += 1
+            f.write(b"".join(lines)[:size])
+        else:
+            f.write(os.urandom(size))
+    return path
+
+
+def wait_download(node, offer_id, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        dl = node.transfer.downloads.get(offer_id)
+        if dl and dl["done"]:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def temp_root():
+    return tempfile.mkdtemp(prefix="archipel-bench-")
@@ -0,0 +1,148 @@
+"""Un noeud qui joint N pairs neufs : threads par service contre une boucle asyncio.
+
+« threads » : chaque canal a son thread d'ecoute et l'emetteur lance un
+thread par pair (l'API synchrone bloque pendant le handshake). « asyncio » :
+les N + 1 canaux sont servis par une seule boucle et l'emetteur attend
+tous les envois avec `asyncio.gather`. On mesure la duree jusqu'a la
+remise du premier message a chaque pair et le pic de threads vivants.
+
+Usage : python -m bench.aio_peers [--peers 200]
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import shutil
+import threading
+import time
+
+from bench._loopback import temp_root
+from src.network.aio import AsyncSecureChannel, serve_channel
+from src.network.peer_table import PeerTable
+from src.network.secure_channel import SecureChannel
+from src.security.trust_store import TrustStore
+
+
+class ThreadPeak:
+    """Echantillonne threading.active_count() pendant la mesure."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.peak
+
+
+def make_channels(root, base_port, peers):
+    """Un emetteur et `peers` canaux qui se connaissent deja (pas de decouverte).
+
+    Un seul trust store pour tous : un noeud reel n'en a qu'un, et son
+    ecriture differee (un Timer) ne doit pas compter N fois.
+    """
+    trust = TrustStore(path=os.path.join(root, "trust.json"))
+    channels = []
+    for i in range(peers + 1):
+        node_id = secrets.token_hex(32)
+        channels.append(
+            SecureChannel(node_id, PeerTable(), trust, secure_port=base_port + i, rx_workers=0)
+        )
+    hub = channels[0]
+    for i, channel in enumerate(channels[1:], 1):
+        hub.peer_table.update(channel.node_id, "127.0.0.1", port=base_port + i)
+        channel.peer_table.update(hub.node_id, "127.0.0.1", port=base_port)
+    return hub, channels
+
+
+def count_pings(channels):
+    received = threading.Semaphore(0)
+    for channel in channels[1:]:
+        channel.register_handler("ping", lambda peer_id, obj: received.release())
+    return received
+
+
+def run_threads(root, base_port, peers):
+    hub, channels = make_channels(root, base_port, peers)
+    received = count_pings(channels)
+    for channel in channels:
+        threading.Thread(target=channel.listen, daemon=True).start()
+    time.sleep(0.2)
+    peak = ThreadPeak()
+    start = time.perf_counter()
+    senders = [
+        threading.Thread(target=hub.send_secure_object, args=(c.node_id, {"kind": "ping"}))
+        for c in channels[1:]
+    ]
+    for t in senders:
+        t.start()
+    delivered = sum(received.acquire(timeout=30) for _ in channels[1:])
+    elapsed = time.perf_counter() - start
+    for t in senders:
+        t.join()
+    peak = peak.stop()
+    for channel in channels:
+        channel.stop()
+    hub.trust_store.flush()
+    return elapsed, delivered, peak
+
+
+def run_asyncio(root, base_port, peers):
+    hub, channels = make_channels(root, base_port, peers)
+    received = count_pings(channels)
+
+    async def main():
+        for channel in channels:
+            await serve_channel(channel)
+        peak = ThreadPeak()
+        start = time.perf_counter()
+        aio = AsyncSecureChannel(hub)
+        await asyncio.gather(
+            *(aio.send_secure_object(c.node_id, {"kind": "ping"}) for c in channels[1:])
+        )
+        delivered = 0
+        while delivered < peers and received.acquire(timeout=0):
+            delivered += 1
+        while delivered < peers and time.perf_counter() - start < 30:
+            await asyncio.sleep(0.001)
+            while delivered < peers and received.acquire(timeout=0):
+                delivered += 1
+        elapsed = time.perf_counter() - start
+        peak = peak.stop()
+        for channel in channels:
+            channel.stop()
+        hub.trust_store.flush()
+        await asyncio.sleep(0)
+        return elapsed, delivered, peak
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peers", type=int, default=200)
+    parser.add_argument("--port", type=int, default=18701)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} | {'pairs':>5} | {'remis':>5} | {'duree (ms)':>10} | {'threads max':>11}")
+    port = args.port
+    # asyncio d'abord : les threads d'ecoute bloques dans recvfrom survivent a stop().
+    for name, run in (("asyncio", run_asyncio), ("threads", run_threads)):
+        root = temp_root()
+        try:
+            elapsed, delivered, peak = run(root, port, args.peers)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        port += args.peers + 1
+        print(f"{name:>8} | {args.peers:>5} | {delivered:>5} | {elapsed * 1000:>10.0f} | {peak:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Une offre servie a N pairs simultanement, avec et sans cache de blocs.
+
+Usage : python -m bench.block_cache [--size-mb 8] [--peers 4] [--cache-mb 0 64]
+"""
+import argparse
+import shutil
+import threading
+import time
+
+from bench._loopback import LoopbackNode, make_file, temp_root, wait_download
+
+
+def run(size, n_peers, cache_mb, port):
+    root = temp_root()
+    seeder = LoopbackNode(root, port, transfer_opts={"block_cache_mb": cache_mb})
+    peers = [LoopbackNode(root, port + 1 + i) for i in range(n_peers)]
+    for peer in peers:
+        seeder.table.update(peer.node_id, "127.0.0.1", port=peer.secure.secure_port)
+        peer.table.update(seeder.node_id, "127.0.0.1", port=port)
+    try:
+        path = make_file(root, size)
+        for peer in peers:
+            manifest = seeder.transfer.offer_file(peer.node_id, path)
+        offer_id = manifest["offer_id"]
+        deadline = time.time() + 10
+        while time.time() < deadline and not all(offer_id in p.transfer.remote_offers for p in peers):
+            time.sleep(0.01)
+
+        results = []
+        start = time.time()
+        threads = [
+            threading.Thread(target=lambda p=p: results.append(wait_download(p, offer_id))) for p in peers
+        ]
+        for peer in peers:
+            peer.transfer.request_download(offer_id)
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return all(results), time.time() - start, seeder.transfer.cache_stats()
+    finally:
+        for node in [seeder] + peers:
+            node.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--peers", type=int, default=4)
+    parser.add_argument("--cache-mb", type=int, nargs="+", default=[0, 64])
+    parser.add_argument("--port", type=int, default=17501)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(f"{'cache (Mo)':>10} | {'statut':>7} | {'duree (s)':>9} | {'Mo/s servis':>11} | {'hits':>7} | {'miss':>6}")
+    for i, cache_mb in enumerate(args.cache_mb):
+        ok, elapsed, stats = run(size, args.peers, cache_mb, args.port + 10 * i)
+        served = size * args.peers / elapsed / 1e6 if ok else 0.0
+        hits, misses = (stats["hits"], stats["misses"]) if stats else ("-", "-")
+        status = "ok" if ok else "echec"
+        print(f"{cache_mb:>10} | {status:>7} | {elapsed:>9.2f} | {served:>11.2f} | {hits:>7} | {misses:>6}")
+
+
+if __name__ == "__main__":
+    main()
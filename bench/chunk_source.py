@@ -0,0 +1,68 @@
+"""Lecture des chunks d'une offre : read_chunk_at contre ChunkSource (mmap / pread).
+
+Chaque chunk lu est concatene a un en-tete de 82 octets, comme dans
+`send_secure_file_chunk`, pour inclure la copie vers le chemin de chiffrement.
+
+Usage : python -m bench.chunk_source [--size-mb 256] [--readers 1 4]
+"""
+import argparse
+import shutil
+import threading
+import time
+
+from bench._loopback import make_file, temp_root
+from src.file.chunk_source import ChunkSourcePool
+from src.file.chunker import DEFAULT_CHUNK_SIZE, read_chunk_at
+
+
+HEADER = bytes(82)
+
+
+def run(read, total, readers):
+    """`readers` threads lisent chacun tout le fichier (pairs concurrents)."""
+
+    def reader():
+        for idx in range(total):
+            HEADER + read(idx)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return total * readers / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=256)
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    root = temp_root()
+    try:
+        size = int(args.size_mb * 1024 * 1024)
+        path = make_file(root, size)
+        chunk_size = DEFAULT_CHUNK_SIZE
+        total = (size + chunk_size - 1) // chunk_size
+        mmap_pool = ChunkSourcePool(use_mmap=True)
+        pread_pool = ChunkSourcePool()
+        modes = [
+            ("read_chunk_at", lambda idx: read_chunk_at(path, idx, chunk_size)),
+            ("source mmap", lambda idx: mmap_pool.read(path, idx, chunk_size)),
+            ("source pread", lambda idx: pread_pool.read(path, idx, chunk_size)),
+        ]
+        print(f"{'mode':>14} | {'lecteurs':>8} | {'chunks/s':>10} | {'Mo/s':>8}")
+        for readers in args.readers:
+            for name, read in modes:
+                rate = run(read, total, readers)
+                print(f"{name:>14} | {readers:>8} | {rate:>10.0f} | {rate * chunk_size / 1e6:>8.1f}")
+        mmap_pool.close_all()
+        pread_pool.close_all()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Debit de chiffrement par suite negociee, sur les chemins d'envoi et de reception.
+
+Pour chaque suite, deux canaux en boucle locale font un vrai handshake,
+puis on mesure hors reseau : `_send_datagram` (chiffrement + en-tetes,
+sendto remplace par une capture) et `_open_secure_msg` (dechiffrement +
+analyse de la trame, handler vide). Les colonnes « seal/open » isolent le
+cout cryptographique seul. La fenetre anti-rejeu refusant un paquet deja
+vu, chaque paquet recu est scelle a l'avance, hors mesure.
+
+Usage : python -m bench.cipher_suites [--sizes 1200 8192 60000] [--seconds 1]
+"""
+import argparse
+import shutil
+import time
+
+from bench._loopback import make_pair, temp_root
+from src.security.session import DEFAULT_SUITES, open_sealed, seal
+
+
+class CaptureSocket:
+    """Remplace sendto : garde le dernier datagramme au lieu de l'emettre."""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self.last = None
+
+    def sendto(self, data, addr):
+        self.last = data
+        return len(data)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def rate(fn, size, seconds, prepare=None):
+    """Octets de charge utile traites par seconde.
+
+    `prepare(n)` fournit n entrees distinctes passees a `fn`, preparees hors chrono.
+    """
+    count = 0
+    elapsed = 0.0
+    while elapsed < seconds:
+        items = prepare(256) if prepare else [None] * 256
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        elapsed += time.perf_counter() - start
+        count += len(items)
+    return count * size / elapsed
+
+
+def run(suite, sizes, seconds, port):
+    root = temp_root()
+    a, b = make_pair(root, port, cipher_suites=[suite])
+    try:
+        a.secure.send_secure_message(b.node_id, "bench")  # handshake
+        b.transfer.secure.register_handler("file_segment", lambda peer_id, obj: None)
+        send_keys = a.secure._sessions[b.node_id]
+        recv_keys = b.secure._sessions[a.node_id]
+        sender_id = a.node_id.encode("ascii")
+        capture = CaptureSocket(a.secure._socket)
+        a.secure._socket = capture
+        addr = ("127.0.0.1", a.secure.secure_port)
+        rows = []
+        for size in sizes:
+            # Trame de segment : le recepteur la remet au handler sans JSON.
+            frame = b"FSG1" + b"0" * 16 + bytes(8) + bytes(size)
+
+            def send(_):
+                a.secure._send_datagram(b.node_id, "127.0.0.1", frame)
+
+            def payloads(n):
+                out = []
+                for _ in range(n):
+                    send(None)
+                    out.append(capture.last[8:])  # sans l'en-tete de paquet Archipel
+                return out
+
+            def sealed(n):
+                return [seal(send_keys, sender_id, frame) for _ in range(n)]
+
+            rows.append(
+                (
+                    size,
+                    rate(send, size, seconds),
+                    rate(lambda p: b.secure._open_secure_msg(p, addr), size, seconds, payloads),
+                    rate(lambda _: seal(send_keys, sender_id, frame), size, seconds),
+                    rate(lambda p: open_sealed(recv_keys, sender_id, p), size, seconds, sealed),
+                )
+            )
+        return rows
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suites", nargs="+", default=DEFAULT_SUITES)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1200, 8192, 60000])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=17901)
+    args = parser.parse_args()
+
+    print(
+        f"{'suite':>18} | {'octets':>6} | {'envoi Mo/s':>10} | {'recep. Mo/s':>11} | "
+        f"{'seal Mo/s':>9} | {'open Mo/s':>9}"
+    )
+    port = args.port
+    for suite in args.suites:
+        for size, send, recv, sealed, opened in run(suite, args.sizes, args.seconds, port):
+            print(
+                f"{suite:>18} | {size:>6} | {send / 1e6:>10.1f} | {recv / 1e6:>11.1f} | "
+                f"{sealed / 1e6:>9.1f} | {opened / 1e6:>9.1f}"
+            )
+        port += 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Transfert d'un journal texte et d'un fichier aleatoire, avec et sans compression.
+
+L'emetteur compresse chaque unite d'envoi avec le codec negocie dans
+file_get et l'envoie brute si elle ne retrecit pas. On rapporte le taux
+obtenu et le temps CPU de compression, cote emetteur. La source est bridee
+a `--link-mbps` Mo/s (0 : boucle locale sans limite) : la compression n'est
+rentable que si le lien, et non le CPU, est le goulot.
+
+Usage : python -m bench.compression [--size-mb 8] [--compression off zlib] [--max-datagram 0 65507] [--link-mbps 4]
+"""
+import argparse
+import shutil
+import time
+
+from bench._loopback import ThrottledSocket, make_file, make_pair, temp_root, wait_download
+from src.network.compression import supported_codecs
+
+
+def run(size, compressible, mode, max_datagram, link_rate, port):
+    root = temp_root()
+    a, b = make_pair(
+        root, port, max_datagram=max_datagram, transfer_opts={"compression": mode}
+    )
+    if link_rate:
+        a.secure._socket = ThrottledSocket(a.secure._socket, link_rate)
+    try:
+        path = make_file(root, size, compressible=compressible)
+        offer_id = a.transfer.offer_file(b.node_id, path)["offer_id"]
+        deadline = time.time() + 10
+        while time.time() < deadline and offer_id not in b.transfer.remote_offers:
+            time.sleep(0.01)
+        time.sleep(0.5)  # sonde de chemin terminee
+        stats = {}
+        original = a.transfer._on_upload_done
+
+        def on_done(sender, ok):
+            if sender.compressor:
+                stats.update(sender.compressor.stats())
+            original(sender, ok)
+
+        a.transfer._on_upload_done = on_done
+        start = time.time()
+        b.transfer.request_download(offer_id)
+        ok = wait_download(b, offer_id)
+        elapsed = time.time() - start
+        time.sleep(0.2)  # dernier ACK : fin de l'envoi cote source
+        return ok, elapsed, stats
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--compression", nargs="+", default=["off"] + supported_codecs())
+    parser.add_argument("--max-datagram", type=int, nargs="+", default=[0, 65507])
+    parser.add_argument("--link-mbps", type=float, default=4)
+    parser.add_argument("--port", type=int, default=17801)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(
+        f"{'contenu':>9} | {'max datagr.':>11} | {'codec':>5} | {'statut':>7} | {'duree (s)':>9} | "
+        f"{'Mo/s':>7} | {'taux':>6} | {'CPU (ms)':>8}"
+    )
+    port = args.port
+    for compressible in (True, False):
+        for max_datagram in args.max_datagram:
+            for mode in args.compression:
+                ok, elapsed, stats = run(
+                    size, compressible, mode, max_datagram, args.link_mbps * 1e6, port
+                )
+                port += 10
+                goodput = size / elapsed / 1e6 if ok else 0.0
+                status = "ok" if ok else "echec"
+                ratio = f"x{stats['ratio']:.2f}" if stats else "-"
+                cpu = f"{stats['cpu_time'] * 1000:.0f}" if stats else "-"
+                print(
+                    f"{'journal' if compressible else 'aleatoire':>9} | {max_datagram or 'ancien':>11} | "
+                    f"{mode:>5} | {status:>7} | {elapsed:>9.2f} | {goodput:>7.2f} | {ratio:>6} | {cpu:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Messages de controle : codec binaire contre JSON, par type de message.
+
+Un exemple realiste de chaque message (handshakes, chat, offre, requetes
+et accuses de fichier, lot de hash avec sa preuve) est encode puis decode
+en boucle avec l'ancien chemin (json.dumps / json.loads) et avec
+src.protocol.codec. On rapporte les operations par seconde (meilleure
+serie) et la taille du message en clair, avant chiffrement.
+
+Usage : python -m bench.control_codec [--seconds 0.5]
+"""
+import argparse
+import json
+import os
+import time
+
+from src.protocol.codec import CODEC_VERSION, decode, decode_object, encode, encode_object
+
+
+def _hex(size):
+    return os.urandom(size).hex()
+
+
+def samples():
+    manifest = {
+        "offer_id": _hex(8),
+        "file_name": "rapport-annuel.pdf",
+        "file_size": 123_456_789,
+        "chunk_size": 524_288,
+        "total_chunks": 236,
+        "file_hash": _hex(32),
+        "merkle_root": _hex(32),
+    }
+    init = {
+        "from_id": _hex(32),
+        "eph_pub": _hex(32),
+        "suites": ["chacha20-poly1305", "aes-256-gcm", "aes-gcm-hmac"],
+        "codec": CODEC_VERSION,
+    }
+    resumed = dict(init, ticket=_hex(16), nonce=_hex(16))
+    resp = {"from_id": _hex(32), "eph_pub": _hex(32), "codec": CODEC_VERSION, "suite": "chacha20-poly1305"}
+    cookie = {"from_id": _hex(32), "eph_pub": _hex(32), "cookie": _hex(16)}
+    return [
+        ("hs_init", init),
+        ("hs_init", resumed),
+        ("hs_resp", resp),
+        ("hs_cookie", cookie),
+        (None, {"kind": "chat", "text": "Salut, le fichier arrive dans une minute."}),
+        (None, {"kind": "file_offer", "manifest": manifest}),
+        (
+            None,
+            {
+                "kind": "file_get",
+                "offer_id": manifest["offer_id"],
+                "ranges": [[0, 63], [128, 191]],
+                "extend": True,
+                "max_datagram": 1472,
+                "fec": 8,
+                "compress": ["zlib"],
+            },
+        ),
+        (
+            None,
+            {
+                "kind": "file_ack",
+                "offer_id": manifest["offer_id"],
+                "base": 1024,
+                "sack": [[1030, 1040], [1050, 1052]],
+                "unit": [64, 1],
+            },
+        ),
+        (None, {"kind": "file_hashes_get", "offer_id": manifest["offer_id"], "batch": 3}),
+        (
+            None,
+            {
+                "kind": "file_hashes",
+                "offer_id": manifest["offer_id"],
+                "batch": 3,
+                "hashes": _hex(32 * 16),
+                "proof": [_hex(32) for _ in range(4)],
+            },
+        ),
+    ]
+
+
+def best_rate(fn, seconds, rounds=5):
+    """Meilleur debit (operations/s) sur `rounds` series."""
+    best = 0.0
+    for _ in range(rounds):
+        count, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds / rounds:
+            for _ in range(256):
+                fn()
+            count += 256
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(
+        f"{'message':>15} | {'JSON o':>6} | {'bin. o':>6} | {'enc. JSON/s':>11} | {'enc. bin./s':>11}"
+        f" | {'dec. JSON/s':>11} | {'dec. bin./s':>11}"
+    )
+    for kind, obj in samples():
+        if kind:
+            # Handshakes : ancien chemin json.dumps sans separateurs compacts.
+            json_enc = lambda obj=obj: json.dumps(obj).encode("utf-8")
+            bin_enc = lambda obj=obj, kind=kind: encode(kind, obj)
+            bin_dec = decode
+            label = kind + (" (0-RTT)" if "ticket" in obj else "")
+        else:
+            json_enc = lambda obj=obj: json.dumps(obj, separators=(",", ":")).encode("utf-8")
+            bin_enc = lambda obj=obj: encode_object(obj)
+            bin_dec = decode_object
+            label = obj["kind"]
+        as_json, as_bin = json_enc(), bin_enc()
+        rates = [
+            best_rate(json_enc, args.seconds),
+            best_rate(bin_enc, args.seconds),
+            best_rate(lambda: json.loads(as_json.decode("utf-8")), args.seconds),
+            best_rate(lambda: bin_dec(as_bin), args.seconds),
+        ]
+        print(
+            f"{label:>15} | {len(as_json):>6} | {len(as_bin):>6} | "
+            + " | ".join(f"{rate:>11,.0f}" for rate in rates)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Duree d'un transfert avec et sans FEC, sous perte et latence simulees.
+
+Le recepteur demande une parite XOR toutes les `--fec-group` unites (0 = sans
+FEC) ; une unite perdue dans un groupe par ailleurs complet est reconstruite
+sans attendre sa retransmission. Chaque envoi est retarde de `--delay`
+secondes pour que la retransmission coute un aller-retour reel.
+
+Usage : python -m bench.fec [--size-mb 3] [--max-datagram 1472 8972] [--loss 0.01 0.03] [--fec-group 0 8]
+"""
+import argparse
+import shutil
+import time
+
+from bench._loopback import DelayedSocket, make_file, make_pair, temp_root, wait_download
+
+
+def run(size, max_datagram, loss, fec_group, delay, port):
+    root = temp_root()
+    a, b = make_pair(root, port, loss=loss, max_datagram=max_datagram)
+    b.transfer.fec_group = fec_group
+    for node in (a, b):
+        node.secure._socket = DelayedSocket(node.secure._socket, delay)
+    try:
+        path = make_file(root, size)
+        offer_id = a.transfer.offer_file(b.node_id, path)["offer_id"]
+        deadline = time.time() + 10
+        while time.time() < deadline and offer_id not in b.transfer.remote_offers:
+            time.sleep(0.01)
+        time.sleep(0.5)  # sonde de chemin terminee
+        start = time.time()
+        b.transfer.request_download(offer_id)
+        ok = wait_download(b, offer_id, timeout=120)
+        elapsed = time.time() - start
+        recovered = b.transfer.downloads[offer_id]["fec_recovered"]
+        return ok, elapsed, recovered
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=3)
+    parser.add_argument("--max-datagram", type=int, nargs="+", default=[1472, 8972])
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.01, 0.03])
+    parser.add_argument("--fec-group", type=int, nargs="+", default=[0, 8])
+    parser.add_argument("--delay", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=17701)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(
+        f"{'perte':>7} | {'max datagr.':>11} | {'FEC':>4} | {'statut':>7} | "
+        f"{'duree (s)':>9} | {'Mo/s':>7} | {'reconstr.':>9}"
+    )
+    port = args.port
+    for loss in args.loss:
+        for max_datagram in args.max_datagram:
+            for fec_group in args.fec_group:
+                ok, elapsed, recovered = run(size, max_datagram, loss, fec_group, args.delay, port)
+                port += 10
+                goodput = size / elapsed / 1e6 if ok else 0.0
+                status = "ok" if ok else "echec"
+                print(
+                    f"{loss:>7.1%} | {max_datagram:>11} | {fec_group or '-':>4} | {status:>7} | "
+                    f"{elapsed:>9.2f} | {goodput:>7.2f} | {recovered:>9}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Envoi d'objets securises de 1 Kio a 50 Mio (fragmentation et reassemblage).
+
+Chaque objet est un message JSON `{"kind": "bench_blob", "data": ...}` ; on
+mesure le delai entre l'appel a `send_secure_object` et la remise de l'objet
+reassemble au handler du recepteur.
+
+Usage : python -m bench.fragmentation [--sizes-kb 1 64 1024 10240 51200] [--loss 0 0.01]
+"""
+import argparse
+import shutil
+import threading
+import time
+
+from bench._loopback import make_pair, temp_root
+
+
+def run(sizes, loss, port):
+    root = temp_root()
+    a, b = make_pair(root, port, loss=loss)
+    received = {}
+    arrived = threading.Condition()
+
+    def on_blob(peer_id, obj):
+        with arrived:
+            received[obj["seq"]] = (time.time(), len(obj["data"]))
+            arrived.notify_all()
+
+    b.secure.register_handler("bench_blob", on_blob)
+    results = []
+    try:
+        a.secure.send_secure_message(b.node_id, "bench")  # etablit la session
+        for seq, size in enumerate(sizes):
+            obj = {"kind": "bench_blob", "seq": seq, "data": "x" * size}
+            start = time.time()
+            a.secure.send_secure_object(b.node_id, obj)
+            deadline = start + 120
+            with arrived:
+                while seq not in received and time.time() < deadline:
+                    arrived.wait(timeout=0.1)
+            if seq in received and received[seq][1] == size:
+                results.append((size, True, received[seq][0] - start))
+            else:
+                results.append((size, False, time.time() - start))
+        return results, a.secure._socket.dropped + b.secure._socket.dropped
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[1, 64, 1024, 10240, 51200])
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.01])
+    parser.add_argument("--port", type=int, default=17201)
+    args = parser.parse_args()
+
+    sizes = [kb * 1024 for kb in args.sizes_kb]
+    print(f"{'perte':>7} | {'taille':>9} | {'statut':>7} | {'duree (s)':>9} | {'Mo/s':>7}")
+    for i, loss in enumerate(args.loss):
+        results, dropped = run(sizes, loss, args.port + 2 * i)
+        for size, ok, elapsed in results:
+            rate = size / elapsed / 1e6 if ok and elapsed > 0 else 0.0
+            status = "ok" if ok else "echec"
+            print(f"{loss:>7.1%} | {size // 1024:>6} Ki | {status:>7} | {elapsed:>9.3f} | {rate:>7.1f}")
+        print(f"{'':>7} | paquets jetes : {dropped}")
+
+
+if __name__ == "__main__":
+    main()
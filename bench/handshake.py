@@ -0,0 +1,139 @@
+"""Latence du premier message vers un pair sans session (handshake compris).
+
+Mesure, sur des paires de noeuds neuves : un appelant seul, `--callers`
+appelants simultanes (qui doivent rejoindre un seul handshake), puis un
+premier HS_INIT perdu (rattrape par le renvoi avec backoff). Enfin, un
+noeud redemarre (meme identite) sans ticket de reprise, puis avec : le
+premier message part alors en 0-RTT, avec le HS_INIT. `--delay-ms`
+retarde chaque datagramme emis (latence de lien, aller simple).
+
+Usage : python -m bench.handshake [--rounds 20] [--callers 8] [--delay-ms 10]
+"""
+import argparse
+import shutil
+import statistics
+import threading
+import time
+
+from bench._loopback import DelayedSocket, LoopbackNode, make_pair, temp_root
+from src.protocol.packet import TYPE_HANDSHAKE_INIT
+
+
+class DropFirstInit:
+    """Enveloppe un socket et perd le premier HS_INIT emis."""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self.dropped = False
+
+    def sendto(self, data, addr):
+        if not self.dropped and len(data) > 5 and data[5] == TYPE_HANDSHAKE_INIT:
+            self.dropped = True
+            return len(data)
+        return self._sock.sendto(data, addr)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def delay_link(nodes, delay):
+    for node in nodes:
+        if delay:
+            node.secure._socket = DelayedSocket(node.secure._socket, delay)
+
+
+def first_message(port, callers=1, lose_init=False, delay=0.0):
+    """Duree jusqu'a la remise du dernier des premiers messages, et stats de handshake."""
+    root = temp_root()
+    a, b = make_pair(root, port)
+    received = threading.Semaphore(0)
+    b.secure.register_handler("ping", lambda peer_id, obj: received.release())
+    delay_link((a, b), delay)
+    if lose_init:
+        a.secure._socket = DropFirstInit(a.secure._socket)
+    try:
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=a.secure.send_secure_object, args=(b.node_id, {"kind": "ping"})
+            )
+            for _ in range(callers)
+        ]
+        for t in threads:
+            t.start()
+        for _ in range(callers):
+            received.acquire(timeout=10)
+        elapsed = time.perf_counter() - start
+        return elapsed, a.secure.session_stats()["handshakes"]
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def after_restart(port, resume, delay=0.0):
+    """Comme first_message, pour le premier message d'un noeud qui vient de redemarrer."""
+    root = temp_root()
+    a, b = make_pair(root, port, resume=resume)
+    received = threading.Semaphore(0)
+    b.secure.register_handler("ping", lambda peer_id, obj: received.release())
+    restarted = None
+    try:
+        a.secure.send_secure_object(b.node_id, {"kind": "ping"})  # handshake complet, ticket
+        received.acquire(timeout=10)
+        a.stop()
+        restarted = LoopbackNode(root, port, seed=1, node_id=a.node_id, resume=resume)
+        restarted.table.update(b.node_id, "127.0.0.1", port=port + 1)
+        delay_link((restarted, b), delay)
+        start = time.perf_counter()
+        restarted.secure.send_secure_object(b.node_id, {"kind": "ping"})
+        received.acquire(timeout=10)
+        elapsed = time.perf_counter() - start
+        return elapsed, restarted.secure.session_stats()["handshakes"]
+    finally:
+        if restarted:
+            restarted.stop()
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--callers", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=18001)
+    args = parser.parse_args()
+    delay = args.delay_ms / 1000
+
+    scenarios = [
+        ("1 appelant", lambda port: first_message(port, delay=delay)),
+        (f"{args.callers} appelants", lambda port: first_message(port, args.callers, delay=delay)),
+        ("HS_INIT perdu", lambda port: first_message(port, lose_init=True, delay=delay)),
+        ("redemarrage", lambda port: after_restart(port, False, delay)),
+        ("reprise 0-RTT", lambda port: after_restart(port, True, delay)),
+    ]
+    print(
+        f"{'scenario':>14} | {'mediane (ms)':>12} | {'max (ms)':>8} | {'handshakes':>10} | "
+        f"{'renvois':>7} | {'reprises':>8}"
+    )
+    port = args.port
+    for name, scenario in scenarios:
+        times, started, retransmits, resumed = [], 0, 0, 0
+        for _ in range(args.rounds):
+            elapsed, stats = scenario(port)
+            port += 2
+            times.append(elapsed * 1000)
+            started += stats["started"]
+            retransmits += stats["retransmits"]
+            resumed += stats["resumed"]
+        print(
+            f"{name:>14} | {statistics.median(times):>12.1f} | {max(times):>8.1f} | "
+            f"{started / args.rounds:>10.1f} | {retransmits / args.rounds:>7.1f} | "
+            f"{resumed / args.rounds:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Handshakes legitimes pendant une inondation de HS_INIT a adresse usurpee.
+
+Un thread emet, depuis 127.0.0.2, des HS_INIT tous differents sans jamais
+lire les reponses (comme un emetteur a l'adresse usurpee). Pendant ce temps
+un pair legitime refait des handshakes vers le repondeur et mesure le
+delai jusqu'a la remise de son premier message. Compare le repondeur sans
+defense (garde permissive) et avec cookies sous charge + debit par IP.
+
+Usage : python -m bench.handshake_flood [--seconds 5] [--rate 2000]
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import threading
+import time
+
+from bench._loopback import make_pair, temp_root
+from src.protocol.packet import TYPE_HANDSHAKE_INIT, pack_packet
+from src.security.handshake_guard import HandshakeGuard
+from src.security.session import DEFAULT_SUITES
+
+
+def spoofed_inits(count):
+    return [
+        pack_packet(
+            TYPE_HANDSHAKE_INIT,
+            json.dumps(
+                {
+                    "from_id": os.urandom(32).hex(),
+                    "eph_pub": os.urandom(32).hex(),
+                    "suites": DEFAULT_SUITES,
+                }
+            ).encode("utf-8"),
+        )
+        for _ in range(count)
+    ]
+
+
+def flood(target, rate, stop, sent):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.2", 0))
+    packets = spoofed_inits(1024)
+    interval = 1.0 / rate
+    next_at = time.time()
+    while not stop.is_set():
+        sock.sendto(packets[sent[0] % len(packets)], target)
+        sent[0] += 1
+        next_at += interval
+        delay = next_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    sock.close()
+
+
+def run(port, seconds, rate, guard):
+    root = temp_root()
+    a, b = make_pair(root, port, handshake_guard=guard)
+    received = threading.Semaphore(0)
+    b.secure.register_handler("ping", lambda peer_id, obj: received.release())
+    stop = threading.Event()
+    sent = [0]
+    flooder = threading.Thread(target=flood, args=(("127.0.0.1", port + 1), rate, stop, sent))
+    times, failures = [], 0
+    try:
+        flooder.start()
+        time.sleep(0.5)  # la charge s'installe
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            with a.secure._lock:
+                a.secure._sessions.pop(b.node_id, None)  # force un nouveau handshake
+                a.secure._send_contexts.pop(b.node_id, None)
+            start = time.perf_counter()
+            try:
+                a.secure.send_secure_object(b.node_id, {"kind": "ping"})
+                ok = received.acquire(timeout=5)
+            except TimeoutError:
+                ok = False
+            if ok:
+                times.append((time.perf_counter() - start) * 1000)
+            else:
+                failures += 1
+            time.sleep(0.1)
+        stats = b.secure.session_stats()["handshake_guard"]
+        return times, failures, sent[0], stats
+    finally:
+        stop.set()
+        flooder.join()
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rate", type=int, default=2000, help="HS_INIT usurpes par seconde")
+    parser.add_argument("--port", type=int, default=18101)
+    args = parser.parse_args()
+
+    inf = float("inf")
+    modes = [
+        ("sans defense", lambda: HandshakeGuard(load_threshold=inf, ip_rate=inf, ip_burst=inf)),
+        ("cookies", HandshakeGuard),
+    ]
+    print(
+        f"{'repondeur':>12} | {'handshakes':>10} | {'echecs':>6} | {'mediane (ms)':>12} | "
+        f"{'max (ms)':>8} | {'usurpes':>7} | {'cookies':>7} | {'limites':>7}"
+    )
+    port = args.port
+    for name, make_guard in modes:
+        times, failures, sent, stats = run(port, args.seconds, args.rate, make_guard())
+        port += 2
+        median = statistics.median(times) if times else float("nan")
+        worst = max(times) if times else float("nan")
+        print(
+            f"{name:>12} | {len(times):>10} | {failures:>6} | {median:>12.1f} | "
+            f"{worst:>8.1f} | {sent:>7} | {stats['cookies_sent']:>7} | {stats['rate_limited']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
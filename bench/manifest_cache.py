@@ -0,0 +1,49 @@
+"""Cout d'une offre de fichier : hachage a froid (1 ou N threads) puis cache chaud.
+
+Usage : python -m bench.manifest_cache [--size-mb 256] [--workers 1 4]
+"""
+import argparse
+import os
+import shutil
+import time
+
+from bench._loopback import make_file, temp_root
+from src.file.chunker import build_manifest
+from src.file.manifest_cache import ManifestCache
+
+
+def timed(fn):
+    start = time.time()
+    result = fn()
+    return result, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=256)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    root = temp_root()
+    try:
+        size = int(args.size_mb * 1024 * 1024)
+        path = make_file(root, size)
+        print(f"CPU disponibles : {os.cpu_count()}")
+        print(f"{'mode':>14} | {'duree (s)':>9} | {'Mo/s':>8}")
+        for workers in args.workers:
+            _, elapsed = timed(lambda: build_manifest(path, workers=workers))
+            print(f"{f'froid x{workers}':>14} | {elapsed:>9.3f} | {size / elapsed / 1e6:>8.1f}")
+
+        cache = ManifestCache(os.path.join(root, "cache"))
+        cold, elapsed = timed(lambda: cache.build(path))
+        print(f"{'cache (manque)':>14} | {elapsed:>9.3f} | {size / elapsed / 1e6:>8.1f}")
+        warm, elapsed = timed(lambda: cache.build(path))
+        print(f"{'cache (chaud)':>14} | {elapsed:>9.3f} | {size / elapsed / 1e6:>8.1f}")
+        if warm != cold:
+            print("ERREUR : manifeste du cache different")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Debit de reception de SecureChannel selon le nombre de workers.
+
+Les datagrammes (chunks de 8 Kio chiffres) sont prepares a l'avance puis
+envoyes vers un canal de reception en gardant au plus `--inflight` paquets
+non traites (pour mesurer le debit soutenable plutot que le debordement du
+buffer socket) ; le handler verifie le SHA-256 de chaque chunk comme
+FileTransfer.
+
+Usage : python -m bench.rx_pipeline [--chunks 20000] [--workers 0 1 2 4] [--inflight 256]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import socket
+import threading
+import time
+
+from bench._loopback import LoopbackNode, temp_root
+
+
+class CaptureSocket:
+    def __init__(self, sock):
+        self._sock = sock
+        self.captured = []
+
+    def sendto(self, data, addr):
+        self.captured.append(data)
+        return len(data)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def run(workers, chunks, port, inflight):
+    root = temp_root()
+    a = LoopbackNode(root, port)
+    b = LoopbackNode(root, port + 1, rx_workers=workers)
+    a.table.update(b.node_id, "127.0.0.1", port=port + 1)
+    b.table.update(a.node_id, "127.0.0.1", port=port)
+    try:
+        a.secure.send_secure_message(b.node_id, "bench")  # etablit la session
+
+        data = os.urandom(8192)
+        digest = hashlib.sha256(data).hexdigest()
+        capture = CaptureSocket(a.secure._socket)
+        a.secure._socket = capture
+        for idx in range(chunks):
+            a.secure.send_secure_file_chunk(b.node_id, "0" * 16, idx, chunks, digest, data)
+        packets = capture.captured
+
+        count = [0]
+        lock = threading.Lock()
+        finished = threading.Event()
+
+        def on_chunk(peer_id, obj):
+            if hashlib.sha256(obj["data"]).hexdigest() != obj["chunk_hash"]:
+                return
+            with lock:
+                count[0] += 1
+                if count[0] == chunks:
+                    finished.set()
+
+        b.secure.register_handler("file_chunk", on_chunk)
+        out = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        start = time.time()
+        lost = 0
+        for sent, pkt in enumerate(packets):
+            stalled_since = None
+            while sent - count[0] - lost > inflight:
+                # Paquets jetes par le noyau : on resynchronise apres 200 ms.
+                stalled_since = stalled_since or time.time()
+                if time.time() - stalled_since > 0.2:
+                    lost = sent - count[0]
+                    break
+                time.sleep(0.0005)
+            out.sendto(pkt, ("127.0.0.1", port + 1))
+        while not finished.is_set():
+            before = count[0]
+            if finished.wait(timeout=0.2) or count[0] == before:
+                break
+        elapsed = time.time() - start
+        return count[0], elapsed
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--inflight", type=int, default=256)
+    parser.add_argument("--port", type=int, default=17101)
+    args = parser.parse_args()
+
+    print(f"CPU disponibles : {os.cpu_count()}")
+    print(f"{'workers':>7} | {'recus':>7} | {'chunks/s':>9} | {'Mo/s':>7}")
+    for i, workers in enumerate(args.workers):
+        got, elapsed = run(workers, args.chunks, args.port + 2 * i, args.inflight)
+        rate = got / elapsed
+        print(f"{workers:>7} | {got:>7} | {rate:>9.0f} | {rate * 8192 / 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Goodput d'un transfert selon la taille de datagramme negociee.
+
+`--max-datagram` borne ce que la sonde de chemin peut retenir : 0 = ancien
+format (chunks de 8 Kio fragmentes par IP), 1472 = MTU Ethernet, 8972 = jumbo
+frames, 65507 = boucle locale. La perte est appliquee a chaque fragment IP
+d'un lien de MTU `--link-mtu` (0 : perte par datagramme).
+
+Usage : python -m bench.segment_size [--size-mb 8] [--max-datagram 0 1472 8972 65507] [--loss 0 0.01]
+"""
+import argparse
+import shutil
+import time
+
+from bench._loopback import make_file, make_pair, temp_root, wait_download
+
+
+def run(size, max_datagram, loss, link_mtu, port):
+    root = temp_root()
+    a, b = make_pair(root, port, loss=loss, max_datagram=max_datagram)
+    for node in (a, b):
+        node.secure._socket.link_mtu = link_mtu or None
+    try:
+        path = make_file(root, size)
+        offer_id = a.transfer.offer_file(b.node_id, path)["offer_id"]
+        deadline = time.time() + 10
+        while time.time() < deadline and offer_id not in b.transfer.remote_offers:
+            time.sleep(0.01)
+        time.sleep(0.5)  # sonde de chemin terminee
+        start = time.time()
+        b.transfer.request_download(offer_id)
+        ok = wait_download(b, offer_id)
+        elapsed = time.time() - start
+        datagram = a.secure.datagram_size(b.node_id) if max_datagram else 0
+        return ok, elapsed, datagram, a.secure._socket.dropped + b.secure._socket.dropped
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--max-datagram", type=int, nargs="+", default=[0, 1472, 8972, 65507])
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.01])
+    parser.add_argument("--link-mtu", type=int, default=1500)
+    parser.add_argument("--port", type=int, default=17601)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(
+        f"{'perte':>7} | {'max datagr.':>11} | {'retenu':>6} | {'statut':>7} | "
+        f"{'duree (s)':>9} | {'Mo/s':>7} | {'perdus':>6}"
+    )
+    port = args.port
+    for loss in args.loss:
+        for max_datagram in args.max_datagram:
+            ok, elapsed, datagram, dropped = run(size, max_datagram, loss, args.link_mtu, port)
+            port += 10
+            goodput = size / elapsed / 1e6 if ok else 0.0
+            status = "ok" if ok else "echec"
+            print(
+                f"{loss:>7.1%} | {max_datagram or 'ancien':>11} | {datagram or '-':>6} | {status:>7} | "
+                f"{elapsed:>9.2f} | {goodput:>7.2f} | {dropped:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Telechargement en essaim depuis 1 a N sources en boucle locale.
+
+Chaque source est bridee a `--seeder-mbps` Mo/s (seau a jetons sur son
+socket) pour imiter des liens LAN distincts : le debit agrege doit croitre
+avec le nombre de sources. `--kill-after` arrete une source en cours de
+route pour mesurer la redistribution de sa part.
+
+Usage : python -m bench.swarm [--size-mb 32] [--seeders 1 2 3] [--seeder-mbps 4] [--kill-after 0]
+"""
+import argparse
+import shutil
+import time
+
+from bench._loopback import LoopbackNode, ThrottledSocket, make_file, temp_root, wait_download
+
+
+def run(size, n_seeders, seeder_rate, kill_after, port):
+    root = temp_root()
+    leecher = LoopbackNode(root, port)
+    seeders = [LoopbackNode(root, port + 1 + i) for i in range(n_seeders)]
+    nodes = [leecher] + seeders
+    for node in nodes:
+        for other in nodes:
+            if other is not node:
+                node.table.update(other.node_id, "127.0.0.1", port=other.secure.secure_port)
+    try:
+        path = make_file(root, size)
+        for seeder in seeders:
+            seeder.secure._socket = ThrottledSocket(seeder.secure._socket, seeder_rate)
+            manifest = seeder.transfer.offer_file(leecher.node_id, path)
+        offer_id = manifest["offer_id"]
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            info = leecher.transfer.remote_offers.get(offer_id)
+            if info and len(info["owners"]) == n_seeders:
+                break
+            time.sleep(0.01)
+
+        start = time.time()
+        leecher.transfer.request_download(offer_id)
+        if kill_after and n_seeders > 1:
+            time.sleep(kill_after)
+            seeders[-1].stop()
+        ok = wait_download(leecher, offer_id)
+        return ok, time.time() - start
+    finally:
+        for node in nodes:
+            node.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=32)
+    parser.add_argument("--seeders", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--seeder-mbps", type=float, default=4.0)
+    parser.add_argument("--kill-after", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=17301)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(f"{'sources':>7} | {'statut':>7} | {'duree (s)':>9} | {'Mo/s':>7}")
+    for i, n in enumerate(args.seeders):
+        ok, elapsed = run(size, n, args.seeder_mbps * 1e6, args.kill_after, args.port + 10 * i)
+        rate = size / elapsed / 1e6 if ok else 0.0
+        status = "ok" if ok else "echec"
+        print(f"{n:>7} | {status:>7} | {elapsed:>9.2f} | {rate:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
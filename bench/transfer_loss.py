@@ -0,0 +1,50 @@
+"""Goodput d'un transfert de fichier en boucle locale sous perte simulee.
+
+Usage : python -m bench.transfer_loss [--size-mb 16] [--loss 0 0.01 0.05]
+"""
+import argparse
+import shutil
+import time
+
+from bench._loopback import make_file, make_pair, temp_root, wait_download
+
+
+def run(size, loss, port):
+    root = temp_root()
+    a, b = make_pair(root, port, loss=loss)
+    try:
+        path = make_file(root, size)
+        manifest = a.transfer.offer_file(b.node_id, path)
+        offer_id = manifest["offer_id"]
+        deadline = time.time() + 10
+        while offer_id not in b.transfer.remote_offers and time.time() < deadline:
+            time.sleep(0.01)
+        start = time.time()
+        b.transfer.request_download(offer_id)
+        ok = wait_download(b, offer_id)
+        elapsed = time.time() - start
+        return ok, elapsed, a.secure._socket.dropped + b.secure._socket.dropped
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=16)
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.01, 0.05])
+    parser.add_argument("--port", type=int, default=17001)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(f"{'perte':>7} | {'statut':>7} | {'duree (s)':>9} | {'goodput (MB/s)':>14} | jetes")
+    for i, loss in enumerate(args.loss):
+        ok, elapsed, dropped = run(size, loss, args.port + 2 * i)
+        goodput = size / elapsed / 1e6 if ok else 0.0
+        status = "ok" if ok else "echec"
+        print(f"{loss:>7.1%} | {status:>7} | {elapsed:>9.2f} | {goodput:>14.2f} | {dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Chunks recus par seconde selon la persistance du trust store.
+
+Le recepteur dechiffre des segments de fichier de 8 Kio deja scelles
+(`_open_secure_msg`, qui marque l'emetteur comme vu a chaque paquet),
+avec un trust store de `--peers` pairs connus : soit reecrit a chaque
+paquet (comportement historique), soit ecrit en differe.
+
+Usage : python -m bench.trust_store [--peers 10 1000] [--seconds 2]
+"""
+import argparse
+import os
+import shutil
+import time
+
+from bench._loopback import make_pair, temp_root
+from src.security.session import seal
+from src.security.trust_store import TrustStore
+
+
+class EagerTrustStore(TrustStore):
+    """Reecrit tout le fichier a chaque `mark_seen`, comme avant l'ecriture differee."""
+
+    def mark_seen(self, node_id):
+        with self._lock:
+            peers = self._data.setdefault("peers", {})
+            if node_id in peers:
+                peers[node_id]["last_seen"] = int(time.time())
+                self._save()
+
+
+def run(store_cls, peers, seconds, port, size=8192):
+    root = temp_root()
+    a, b = make_pair(root, port)
+    try:
+        a.secure.send_secure_message(b.node_id, "bench")  # handshake
+        b.transfer.secure.register_handler("file_segment", lambda peer_id, obj: None)
+        store = store_cls(os.path.join(root, "trust-bench.json"))
+        for _ in range(peers):
+            store.check_or_trust_first_use(os.urandom(32).hex())
+        store.check_or_trust_first_use(a.node_id)
+        store.flush()
+        b.secure.trust_store = store
+        writes = store.writes
+        keys = a.secure._sessions[b.node_id]
+        sender_id = a.node_id.encode("ascii")
+        frame = b"FSG1" + b"0" * 16 + bytes(8) + bytes(size)
+        addr = ("127.0.0.1", a.secure.secure_port)
+        count, elapsed = 0, 0.0
+        while elapsed < seconds:
+            payloads = [sender_id + seal(keys, sender_id, frame) for _ in range(256)]
+            start = time.perf_counter()
+            for payload in payloads:
+                b.secure._open_secure_msg(payload, addr)
+            elapsed += time.perf_counter() - start
+            count += len(payloads)
+        return count / elapsed, store.writes - writes
+    finally:
+        a.stop()
+        b.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peers", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=18201)
+    args = parser.parse_args()
+
+    stores = [("a chaque paquet", EagerTrustStore), ("differe", TrustStore)]
+    print(f"{'trust store':>16} | {'pairs':>5} | {'chunks/s':>9} | {'Mo/s':>6} | {'ecritures':>9}")
+    port = args.port
+    for peers in args.peers:
+        for name, store_cls in stores:
+            chunks, writes = run(store_cls, peers, args.seconds, port)
+            port += 2
+            print(
+                f"{name:>16} | {peers:>5} | {chunks:>9.0f} | {chunks * 8192 / 1e6:>6.1f} | "
+                f"{writes:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
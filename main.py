@@ -1,8 +1,15 @@
 import argparse
+import asyncio
 import os
 import sys
+import threading
 from dotenv import load_dotenv
 
+from src.file.block_cache import DEFAULT_BLOCK_CACHE_MB
+from src.network.compression import DEFAULT_COMPRESSION
+from src.network.fec import DEFAULT_FEC_GROUP
+from src.network.pmtu import MAX_DATAGRAM
+from src.network.rx_pipeline import DEFAULT_RX_WORKERS
 from src.node import ArchipelNode
 from src.ui.web_server import start_web_server
 
@@ -16,6 +23,7 @@ def _print_help():
     print("  send <node_id> <path>      Propose un fichier à un pair")
     print("  receive                    Liste les offres de fichiers reçues")
     print("  download <offer_id>        Télécharge un fichier offert")
+    print("  transfers                  Transferts en cours (cwnd, débit, RTT, sources)")
     print("  status                     État du nœud + stats réseau")
     print("  trust <node_id>            Approuve un pair (Web of Trust)")
     print("  untrust <node_id>          Retire la confiance explicite")
@@ -28,14 +36,37 @@ def main():
     parser.add_argument("--port", type=int, default=6000, help="Port de base pour le nœud")
     parser.add_argument("--web-port", type=int, default=5000, help="Port pour l'interface Web")
     parser.add_argument("--no-ai", action="store_true", help="Désactive l'intégration Gemini AI")
+    parser.add_argument("--upload-workers", type=int, default=2, help="Threads dédiés à l'envoi de fichiers")
+    parser.add_argument("--rx-workers", type=int, default=DEFAULT_RX_WORKERS,
+                        help="Threads de déchiffrement/vérification en réception (0 = mono-thread, au moins 1 avec --asyncio)")
+    parser.add_argument("--block-cache-mb", type=int, default=DEFAULT_BLOCK_CACHE_MB,
+                        help="Cache mémoire des blocs de fichiers partagés, en Mo (0 = désactivé)")
+    parser.add_argument("--max-datagram", type=int, default=MAX_DATAGRAM,
+                        help="Taille max d'un datagramme, bornant la sonde de MTU (0 = chunks entiers, sans sonde)")
+    parser.add_argument("--fec-group", type=int, default=DEFAULT_FEC_GROUP,
+                        help="Demande une parité XOR toutes les N unités reçues (2 à 64, 0 = sans FEC)")
+    parser.add_argument("--compression", choices=["auto", "zstd", "zlib", "off"], default=DEFAULT_COMPRESSION,
+                        help="Compression des chunks négociée avec les pairs (auto = zstd si installé, sinon zlib)")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="Réseau servi par une boucle asyncio (sans thread par service)")
     args = parser.parse_args()
 
-    node = ArchipelNode(port=args.port, no_ai=args.no_ai)
+    node = ArchipelNode(
+        port=args.port, no_ai=args.no_ai, upload_workers=args.upload_workers, rx_workers=args.rx_workers,
+        block_cache_mb=args.block_cache_mb, max_datagram=args.max_datagram,
+        fec_group=args.fec_group, compression=args.compression,
+    )
     
     print(f"Démarrage Archipel\nMon ID : {node.my_id}\n" + "-" * 30)
     
     # Lancement du moteur P2P
-    node.start()
+    if args.asyncio:
+        # La boucle tourne dans son thread ; la CLI et le Web gardent les API synchrones.
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(node.start_async(), loop).result()
+    else:
+        node.start()
     
     # Lancement de l'interface Web (en arrière-plan)
     start_web_server(node, port=args.web_port)
@@ -68,6 +99,18 @@ def main():
                 print(f"Pairs Actifs   : {s['peers_count']}")
                 print(f"Confiance      : {s['trusted_count']} pairs")
                 print(f"IA Gemini      : {'ON' if s['ai_enabled'] else 'OFF'}")
+                z = s['sessions']
+                print(f"Sessions       : {z['sessions']} | {z['rekeys']} renégociations | "
+                      f"{z['replays_dropped']} rejeux écartés | "
+                      f"{z['handshakes']['resumed']} reprises 0-RTT")
+                g = z['handshake_guard']
+                print(f"Handshakes     : {g['inits']} HS_INIT | {g['cookies_sent']} cookies "
+                      f"({g['cookies_valid']} renvoyés) | {g['rate_limited']} limités par IP"
+                      f"{' | SOUS CHARGE' if g['under_load'] else ''}")
+                c = s['block_cache']
+                if c:
+                    print(f"Cache blocs    : {c['size'] / 1e6:.1f}/{c['capacity'] / 1e6:.0f} Mo | "
+                          f"{c['hits']} hits / {c['misses']} miss ({c['hit_ratio']:.0%})")
             elif raw == "peers":
                 node.table.display()
             elif raw.startswith("ping "):
@@ -110,7 +153,28 @@ def main():
                 if not offers: print("Aucune offre.")
                 else:
                     for o in offers:
-                        print(f"{o['offer_id']} | {o['file_name']} | {o['file_size']} o | from {o['owner'][:10]}...")
+                        extra = f" (+{len(o['owners']) - 1} sources)" if len(o['owners']) > 1 else ""
+                        print(f"{o['offer_id']} | {o['file_name']} | {o['file_size']} o | from {o['owner'][:10]}...{extra}")
+            elif raw == "transfers":
+                uploads = node.transfer.list_uploads()
+                if not uploads: print("Aucun envoi en cours.")
+                for u in uploads:
+                    if u.get('legacy'):
+                        print(f"{u['offer_id']} -> {u['peer_id'][:10]}... | {u['sent']}/{u['total_chunks']} | pair ancien, sans ACK")
+                        continue
+                    srtt = f"{u['srtt'] * 1000:.1f} ms" if u['srtt'] else "?"
+                    print(f"{u['offer_id']} -> {u['peer_id'][:10]}... | {u['acked']}/{u['total_chunks']} | "
+                          f"cwnd {u['cwnd']} | {u['rate'] / 1e6:.2f} Mo/s | RTT {srtt} | retx {u['retransmits']}")
+                    c = u['compression']
+                    if c:
+                        print(f"    {c['codec']} x{c['ratio']:.2f} | {c['compressed']} compressés, "
+                              f"{c['skipped']} bruts | {c['cpu_time'] * 1000:.0f} ms CPU")
+                for d in node.transfer.list_downloads():
+                    fec = f" | FEC {d['fec_recovered']} unités reconstruites" if d['fec_recovered'] else ""
+                    fin = " | finalisation" if d['finalizing'] else ""
+                    print(f"{d['offer_id']} <- {d['file_name']} | {d['received']}/{d['total_chunks']}{fec}{fin}")
+                    for src in d['sources']:
+                        print(f"    {src['peer_id'][:10]}... | {src['rate'] / 1e6:.2f} Mo/s | reste {src['remaining']} chunks")
             elif raw.startswith("download "):
                 oid = raw.split(" ", 1)[1].strip()
                 try:
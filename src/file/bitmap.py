@@ -0,0 +1,143 @@
+import re
+
+
+_ANY_SET = re.compile(rb"[^\x00]")
+_ANY_CLEAR = re.compile(rb"[^\xff]")
+
+
+def _popcount(data):
+    return bin(int.from_bytes(data, "big")).count("1")
+
+
+class ChunkBitmap:
+    """Bitmap compact des chunks recus (1 bit par chunk).
+
+    Les plages sont exprimees en intervalles semi-ouverts [debut, fin).
+    """
+
+    def __init__(self, total, data=None):
+        if total < 0:
+            raise ValueError("total doit etre >= 0")
+        self.total = total
+        size = (total + 7) // 8
+        if data is None:
+            self._bits = bytearray(size)
+            self.count = 0
+        else:
+            if len(data) != size:
+                raise ValueError("bitmap de taille invalide")
+            self._bits = bytearray(data)
+            self.count = _popcount(self._bits)
+
+    def has(self, index):
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def set(self, index):
+        if index < 0 or index >= self.total:
+            raise IndexError(index)
+        mask = 1 << (index & 7)
+        if self._bits[index >> 3] & mask:
+            return False
+        self._bits[index >> 3] |= mask
+        self.count += 1
+        return True
+
+    def set_range(self, start, end):
+        idx, end = max(0, start), min(end, self.total)
+        added = 0
+        while idx < end and idx & 7:
+            added += self.set(idx)
+            idx += 1
+        full_end = end & ~7
+        if idx < full_end:
+            lo, hi = idx >> 3, full_end >> 3
+            before = _popcount(self._bits[lo:hi])
+            self._bits[lo:hi] = b"\xff" * (hi - lo)
+            added += (hi - lo) * 8 - before
+            self.count += (hi - lo) * 8 - before
+            idx = full_end
+        while idx < end:
+            added += self.set(idx)
+            idx += 1
+        return added
+
+    def clear_range(self, start, end):
+        idx, end = max(0, start), min(end, self.total)
+        removed = 0
+        while idx < end:
+            if not idx & 7 and idx + 8 <= end:
+                removed += _popcount(self._bits[idx >> 3:(idx >> 3) + 1])
+                self._bits[idx >> 3] = 0
+                idx += 8
+                continue
+            mask = 1 << (idx & 7)
+            if self._bits[idx >> 3] & mask:
+                self._bits[idx >> 3] &= ~mask & 0xFF
+                removed += 1
+            idx += 1
+        self.count -= removed
+        return removed
+
+    def complete(self):
+        return self.count == self.total
+
+    def _scan(self, want, idx):
+        """Premier index >= idx dont le bit vaut `want` (ou total)."""
+        while idx < self.total:
+            if idx & 7:
+                if self.has(idx) == want:
+                    return idx
+                idx += 1
+                continue
+            pattern = _ANY_SET if want else _ANY_CLEAR
+            match = pattern.search(self._bits, idx >> 3)
+            if not match:
+                return self.total
+            idx = match.start() << 3
+            while idx < self.total and self.has(idx) != want:
+                idx += 1
+            return min(idx, self.total)
+        return self.total
+
+    def first_missing(self, start=0):
+        return self._scan(False, start)
+
+    def _ranges(self, want, start, limit, stop):
+        stop = self.total if stop is None else min(stop, self.total)
+        ranges = []
+        idx = self._scan(want, start)
+        while idx < stop:
+            end = min(self._scan(not want, idx), stop)
+            ranges.append([idx, end])
+            if limit is not None and len(ranges) >= limit:
+                break
+            idx = self._scan(want, end)
+        return ranges
+
+    def received_ranges(self, start=0, limit=None, stop=None):
+        return self._ranges(True, start, limit, stop)
+
+    def missing_ranges(self, start=0, limit=None, stop=None):
+        return self._ranges(False, start, limit, stop)
+
+    def to_bytes(self):
+        return bytes(self._bits)
+
+
+def coalesce_ranges(ranges, limit):
+    """Fusionne les plages separees par les plus petits trous jusqu'a `limit` plages.
+
+    Le resultat couvre toutes les plages d'origine (et les trous combles).
+    """
+    ranges = [list(r) for r in ranges]
+    if limit <= 0 or len(ranges) <= limit:
+        return ranges
+    gaps = sorted(range(len(ranges) - 1), key=lambda i: ranges[i + 1][0] - ranges[i][1])
+    merge_after = set(gaps[: len(ranges) - limit])
+    merged = [ranges[0]]
+    for i in range(1, len(ranges)):
+        if i - 1 in merge_after:
+            merged[-1][1] = ranges[i][1]
+        else:
+            merged.append(ranges[i])
+    return merged
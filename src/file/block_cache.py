@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_BLOCK_CACHE_MB = 64
+BLOCK_BYTES = 256 * 1024  # taille cible d'un bloc, arrondie a un multiple du chunk
+
+
+def block_span(chunk_size):
+    """Nombre de chunks par bloc : un chunk n'est jamais a cheval sur deux blocs."""
+    return max(1, BLOCK_BYTES // chunk_size)
+
+
+class BlockCache:
+    """Cache LRU de blocs de fichiers partages, borne en octets.
+
+    Les blocs sont indexes par (chemin, taille de chunk, identite du fichier
+    (inode, taille, mtime_ns), numero de bloc) ;
+    quand une offre populaire est servie a beaucoup de pairs, seul le
+    premier lecteur d'un bloc touche le disque.
+    """
+
+    def __init__(self, capacity_bytes):
+        self.capacity = max(0, int(capacity_bytes))
+        self._lock = threading.Lock()
+        self._blocks = OrderedDict()  # cle -> bytes, ordre LRU
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                self.misses += 1
+                return None
+            self._blocks.move_to_end(key)
+            self.hits += 1
+            return block
+
+    def put(self, key, block):
+        if len(block) > self.capacity:
+            return
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._blocks[key] = block
+            self.size += len(block)
+            while self.size > self.capacity:
+                _, evicted = self._blocks.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, path):
+        with self._lock:
+            for key in [k for k in self._blocks if k[0] == path]:
+                self.size -= len(self._blocks.pop(key))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "size": self.size,
+                "blocks": len(self._blocks),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
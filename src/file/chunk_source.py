@@ -0,0 +1,173 @@
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.file.block_cache import block_span
+
+
+DEFAULT_MAX_OPEN = 64  # fichiers partages gardes ouverts simultanement
+DEFAULT_IDLE_TIMEOUT = 60.0  # fermeture d'une source inutilisee (secondes)
+
+
+class ChunkSource:
+    """Lecteur de chunks d'un fichier partage, ouvert une fois pour tous les envois.
+
+    Par defaut, `os.pread` sur le descripteur garde ouvert (une copie noyau,
+    aucun open/seek/close ; seek puis read sous le verrou sans pread). Avec `use_mmap`, le fichier est projete en memoire
+    et `chunk` rend une tranche `memoryview` sans copie ; chaque lecture
+    verifie alors la taille du fichier, une troncature sous un mmap tuant le
+    processus (SIGBUS). La source se rouvre d'elle-meme apres une fermeture.
+    """
+
+    def __init__(self, path, chunk_size, use_mmap=False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+        self.last_used = time.time()
+        self._lock = threading.Lock()
+        self._fd = None
+        self._map = None
+        self._view = None
+        self._size = 0
+        self._stamp = None  # (inode, taille, mtime_ns) vu a la derniere lecture par blocs
+
+    @property
+    def is_open(self):
+        return self._fd is not None
+
+    def _open(self):
+        fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        self._size = os.fstat(fd).st_size
+        self._map = self._view = None
+        if self.use_mmap and self._size:
+            try:
+                self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._map)
+            except (OSError, ValueError):
+                pass
+        self._fd = fd
+
+    def chunk(self, index):
+        if index < 0:
+            raise ValueError("index negatif")
+        return self.read_at(index * self.chunk_size, self.chunk_size)
+
+    def read_at(self, offset, length):
+        with self._lock:
+            self.last_used = time.time()
+            if self._fd is None:
+                self._open()
+            if self._map is None:
+                if hasattr(os, "pread"):
+                    return os.pread(self._fd, length, offset)
+                os.lseek(self._fd, offset, os.SEEK_SET)  # Windows : pas de pread
+                return os.read(self._fd, length)
+            # Un fichier tronque sous un mmap provoquerait un SIGBUS a la lecture.
+            if os.fstat(self._fd).st_size != self._size:
+                raise ValueError(f"fichier modifie pendant le partage: {self.path}")
+            return self._view[offset:offset + length]
+
+    def stamp(self):
+        """Identite du fichier lu : (inode, taille, mtime_ns), et si elle a change.
+
+        Meme empreinte que le cache de manifestes ; elle fait partie de la cle
+        des blocs caches, un fichier modifie sous la meme offre n'est donc
+        jamais servi depuis des blocs perimes.
+        """
+        with self._lock:
+            self.last_used = time.time()
+            if self._fd is None:
+                self._open()
+            st = os.fstat(self._fd)
+            stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+            changed = self._stamp is not None and stamp != self._stamp
+            self._stamp = stamp
+            return stamp, changed
+
+    def close(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            if self._map is not None:
+                self._view.release()
+                try:
+                    self._map.close()
+                except BufferError:
+                    pass  # tranches encore en cours d'envoi : liberee par le GC
+                self._map = self._view = None
+            os.close(self._fd)
+            self._fd = None
+
+
+class ChunkSourcePool:
+    """Sources de chunks partagees par toutes les offres locales.
+
+    Une source par (chemin, taille de chunk), commune a tous les pairs qui
+    telechargent le meme fichier. Au plus `max_open` fichiers restent ouverts
+    (les moins recemment servis sont fermes) et `close_idle` ferme ceux qui
+    ne servent plus. Avec un `BlockCache`, les chunks sont lus par blocs et
+    servis depuis la memoire aux lecteurs suivants.
+    """
+
+    def __init__(
+        self, max_open=DEFAULT_MAX_OPEN, idle_timeout=DEFAULT_IDLE_TIMEOUT, use_mmap=False, cache=None
+    ):
+        self.max_open = max(1, max_open)
+        self.idle_timeout = idle_timeout
+        self.use_mmap = use_mmap
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._sources = OrderedDict()  # (chemin, taille de chunk) -> ChunkSource, ordre LRU
+
+    def read(self, path, index, chunk_size):
+        key = (path, chunk_size)
+        with self._lock:
+            source = self._sources.get(key)
+            if source is None:
+                source = self._sources[key] = ChunkSource(path, chunk_size, self.use_mmap)
+            self._sources.move_to_end(key)
+            evict = []
+            if not source.is_open:
+                open_sources = [s for s in self._sources.values() if s.is_open]
+                evict = open_sources[: max(0, len(open_sources) + 1 - self.max_open)]
+        for old in evict:
+            old.close()
+        if self.cache is None:
+            return source.chunk(index)
+
+        stamp, changed = source.stamp()
+        if changed:
+            self.cache.invalidate(path)  # fichier modifie : ses anciens blocs ne serviront plus
+        span = block_span(chunk_size)
+        block_index, pos = divmod(index, span)
+        key = (path, chunk_size, stamp, block_index)
+        block = self.cache.get(key)
+        if block is None:
+            block = bytes(source.read_at(block_index * span * chunk_size, span * chunk_size))
+            self.cache.put(key, block)
+        start = pos * chunk_size
+        return memoryview(block)[start:start + chunk_size]
+
+    def invalidate(self, path):
+        """Oublie tout ce qui est garde d'un fichier (il vient d'etre (re)offert)."""
+        with self._lock:
+            sources = [s for key, s in self._sources.items() if key[0] == path]
+        for source in sources:
+            source.close()
+        if self.cache is not None:
+            self.cache.invalidate(path)
+
+    def close_idle(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            idle = [s for s in self._sources.values() if s.is_open and now - s.last_used > self.idle_timeout]
+        for source in idle:
+            source.close()
+
+    def close_all(self):
+        with self._lock:
+            sources = list(self._sources.values())
+        for source in sources:
+            source.close()
@@ -1,11 +1,22 @@
 import hashlib
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.file.merkle import subtree_root
 
 
 DEFAULT_CHUNK_SIZE = 8192
+HASH_BLOCK_SIZE = 4 * 1024 * 1024  # lecture par blocs, decoupes en chunks pour le pool
+DEFAULT_HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _hash_chunks(block, chunk_size):
+    view = memoryview(block)
+    return [hashlib.sha256(view[i:i + chunk_size]).digest() for i in range(0, len(block), chunk_size)]
 
 
-def build_manifest(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+def build_manifest(file_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_HASH_WORKERS):
     if not os.path.exists(file_path):
         raise FileNotFoundError(file_path)
     if chunk_size <= 0:
@@ -15,14 +26,25 @@ def build_manifest(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
     file_size = os.path.getsize(file_path)
     chunk_hashes = []
     file_hasher = hashlib.sha256()
+    block_size = max(1, HASH_BLOCK_SIZE // chunk_size) * chunk_size
 
+    # Le hash global est forcement sequentiel : il suit la lecture pendant que
+    # le pool hache les chunks des blocs deja lus (hashlib relache le GIL).
     with open(file_path, "rb") as f:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
-                break
-            chunk_hashes.append(hashlib.sha256(chunk).hexdigest())
-            file_hasher.update(chunk)
+        if workers <= 1:
+            for block in iter(lambda: f.read(block_size), b""):
+                chunk_hashes.extend(_hash_chunks(block, chunk_size))
+                file_hasher.update(block)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for block in iter(lambda: f.read(block_size), b""):
+                    pending.append(pool.submit(_hash_chunks, block, chunk_size))
+                    file_hasher.update(block)
+                    while len(pending) > 2 * workers:  # memoire bornee
+                        chunk_hashes.extend(pending.popleft().result())
+                while pending:
+                    chunk_hashes.extend(pending.popleft().result())
 
     total_chunks = len(chunk_hashes)
     file_hash = file_hasher.hexdigest()
@@ -37,32 +59,30 @@ def build_manifest(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
         "chunk_size": chunk_size,
         "total_chunks": total_chunks,
         "file_hash": file_hash,
-        "chunk_hashes": chunk_hashes,
+        "merkle_root": subtree_root(chunk_hashes).hex(),
+        "chunk_hashes": [h.hex() for h in chunk_hashes],
     }
 
 
+PUBLIC_MANIFEST_KEYS = (
+    "offer_id",
+    "file_name",
+    "file_size",
+    "chunk_size",
+    "total_chunks",
+    "file_hash",
+    "merkle_root",
+)
+
+
+def public_manifest(manifest):
+    """Manifeste annonce dans une offre : taille constante, sans la liste des hash."""
+    return {key: manifest[key] for key in PUBLIC_MANIFEST_KEYS}
+
+
 def read_chunk_at(file_path, index, chunk_size):
     if index < 0:
         raise ValueError("index negatif")
     with open(file_path, "rb") as f:
         f.seek(index * chunk_size)
         return f.read(chunk_size)
-
-
-def assemble_file(manifest, chunks_by_index, output_path):
-    expected = manifest["total_chunks"]
-    missing = [idx for idx in range(expected) if idx not in chunks_by_index]
-    if missing:
-        raise ValueError(f"Chunks manquants: {len(missing)}")
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    hasher = hashlib.sha256()
-    with open(output_path, "wb") as out:
-        for idx in range(expected):
-            data = chunks_by_index[idx]
-            hasher.update(data)
-            out.write(data)
-    rebuilt_hash = hasher.hexdigest()
-    if rebuilt_hash != manifest["file_hash"]:
-        raise ValueError("Hash global invalide apres assemblage")
-    return output_path
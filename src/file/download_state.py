@@ -0,0 +1,66 @@
+import json
+import os
+
+
+STATE_DIRNAME = ".state"
+
+
+def atomic_write(path, data):
+    """Ecrit `data` (bytes) via un fichier temporaire puis un rename atomique."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class DownloadStateStore:
+    """Etat persistant des telechargements en cours.
+
+    Par offre : `<offer_id>.json` (manifeste, proprietaire, chemin de sortie),
+    ecrit une fois au demarrage, et `<offer_id>.bitmap` (chunks recus),
+    reecrit a chaque checkpoint.
+    """
+
+    def __init__(self, download_dir):
+        self.dir = os.path.join(download_dir, STATE_DIRNAME)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _meta_path(self, offer_id):
+        return os.path.join(self.dir, f"{offer_id}.json")
+
+    def _bitmap_path(self, offer_id):
+        return os.path.join(self.dir, f"{offer_id}.bitmap")
+
+    def save_meta(self, offer_id, meta):
+        atomic_write(self._meta_path(offer_id), json.dumps(meta).encode("utf-8"))
+
+    def save_bitmap(self, offer_id, bitmap_bytes):
+        atomic_write(self._bitmap_path(offer_id), bitmap_bytes)
+
+    def load_all(self):
+        states = []
+        for name in sorted(os.listdir(self.dir)):
+            if not name.endswith(".json"):
+                continue
+            offer_id = name[: -len(".json")]
+            try:
+                with open(self._meta_path(offer_id), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"\n[FILE] Etat illisible pour {offer_id}: {e}")
+                continue
+            bitmap = None
+            if os.path.exists(self._bitmap_path(offer_id)):
+                with open(self._bitmap_path(offer_id), "rb") as f:
+                    bitmap = f.read()
+            states.append((offer_id, meta, bitmap))
+        return states
+
+    def remove(self, offer_id):
+        for path in (self._meta_path(offer_id), self._bitmap_path(offer_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+
+from src.file.chunker import DEFAULT_CHUNK_SIZE, build_manifest
+from src.file.download_state import atomic_write
+
+
+class ManifestCache:
+    """Cache persistant des manifestes de fichiers partages.
+
+    Une entree par (chemin, taille de chunk) : `<cle>.json` (manifeste sans
+    les hash de chunks, plus inode/taille/mtime_ns du fichier) et
+    `<cle>.hashes` (hash bruts, 32 octets par chunk). L'entree n'est reprise
+    que si le fichier n'a pas change depuis ; sinon elle est recalculee et
+    remplacee.
+    """
+
+    def __init__(self, cache_dir):
+        self.dir = cache_dir
+        os.makedirs(self.dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, path, chunk_size):
+        key = hashlib.sha256(f"{path}:{chunk_size}".encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.dir, key)
+
+    @staticmethod
+    def _file_stat(path):
+        st = os.stat(path)
+        return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+    def get(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        path = os.path.abspath(path)
+        entry = self._entry_path(path, chunk_size)
+        try:
+            with open(entry + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("path") != path or meta.get("stat") != self._file_stat(path):
+                return None
+            with open(entry + ".hashes", "rb") as f:
+                raw = f.read()
+        except (OSError, ValueError):
+            return None
+        manifest = meta["manifest"]
+        if len(raw) != manifest["total_chunks"] * 32:
+            return None
+        manifest["chunk_hashes"] = [raw[i:i + 32].hex() for i in range(0, len(raw), 32)]
+        return manifest
+
+    def put(self, path, manifest, stat):
+        path = os.path.abspath(path)
+        entry = self._entry_path(path, manifest["chunk_size"])
+        meta = {
+            "path": path,
+            "stat": stat,
+            "manifest": {k: v for k, v in manifest.items() if k != "chunk_hashes"},
+        }
+        try:
+            # Hash d'abord : un .json present implique des .hashes complets.
+            atomic_write(entry + ".hashes", bytes.fromhex("".join(manifest["chunk_hashes"])))
+            atomic_write(entry + ".json", json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            print(f"\n[FILE] Cache de manifeste non ecrit pour {path}: {e}")
+
+    def build(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Manifeste de `path`, depuis le cache si le fichier n'a pas change."""
+        path = os.path.abspath(path)
+        stat = self._file_stat(path)
+        manifest = self.get(path, chunk_size)
+        if manifest is not None:
+            with self._lock:
+                self.hits += 1
+            return manifest
+        with self._lock:
+            self.misses += 1
+        manifest = build_manifest(path, chunk_size)
+        if self._file_stat(path) == stat:  # fichier modifie pendant le hachage : pas de cache
+            self.put(path, manifest, stat)
+        return manifest
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
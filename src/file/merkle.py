@@ -0,0 +1,103 @@
+import hashlib
+
+
+BATCH_LEVEL = 8  # les hash de feuilles circulent par sous-arbres de 2**8 = 256 chunks
+BATCH_SIZE = 1 << BATCH_LEVEL
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+
+def node_hash(left, right):
+    # Prefixe 0x01 : un noeud interne ne peut pas etre confondu avec une feuille.
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def level_sizes(n_leaves):
+    """Nombre de noeuds par niveau, des feuilles jusqu'a la racine."""
+    sizes = [n_leaves]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def _parent_level(nodes):
+    parents = [node_hash(nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+    if len(nodes) % 2:
+        parents.append(nodes[-1])  # noeud impair promu tel quel
+    return parents
+
+
+def subtree_root(leaves):
+    """Racine d'une liste de feuilles (arbre complet ou sous-arbre aligne)."""
+    if not leaves:
+        return EMPTY_ROOT
+    nodes = list(leaves)
+    while len(nodes) > 1:
+        nodes = _parent_level(nodes)
+    return nodes[0]
+
+
+def batch_count(n_leaves):
+    return (n_leaves + BATCH_SIZE - 1) // BATCH_SIZE
+
+
+def batch_level(n_leaves):
+    """Niveau effectif d'un lot : la racine elle-meme pour les petits fichiers."""
+    return min(BATCH_LEVEL, len(level_sizes(n_leaves)) - 1) if n_leaves else 0
+
+
+class MerkleTree:
+    """Arbre de Merkle SHA-256 sur les hash de chunks (cote proprietaire)."""
+
+    def __init__(self, leaves):
+        self.levels = [list(leaves)]
+        while len(self.levels[-1]) > 1:
+            self.levels.append(_parent_level(self.levels[-1]))
+
+    @property
+    def n_leaves(self):
+        return len(self.levels[0])
+
+    def root(self):
+        if not self.n_leaves:
+            return EMPTY_ROOT
+        return self.levels[-1][0]
+
+    def leaf(self, index):
+        return self.levels[0][index]
+
+    def batch_leaves(self, batch):
+        return self.levels[0][batch * BATCH_SIZE:(batch + 1) * BATCH_SIZE]
+
+    def proof(self, level, index):
+        """Freres necessaires pour remonter du noeud (level, index) a la racine."""
+        path = []
+        for nodes in self.levels[level:-1]:
+            sibling = index ^ 1
+            if sibling < len(nodes):
+                path.append(nodes[sibling])
+            index >>= 1
+        return path
+
+
+def verify_batch(root, n_leaves, batch, leaves, proof):
+    """Verifie les feuilles d'un lot contre la racine du manifeste."""
+    start = batch * BATCH_SIZE
+    if batch < 0 or start >= max(n_leaves, 1):
+        return False
+    if len(leaves) != min(BATCH_SIZE, n_leaves - start):
+        return False
+
+    sizes = level_sizes(n_leaves)
+    level = batch_level(n_leaves)
+    node = subtree_root(leaves)
+    index = batch
+    proof = list(proof)
+    for size in sizes[level:-1]:
+        sibling = index ^ 1
+        if sibling < size:
+            if not proof:
+                return False
+            other = proof.pop(0)
+            node = node_hash(node, other) if index % 2 == 0 else node_hash(other, node)
+        index >>= 1
+    return not proof and node == root
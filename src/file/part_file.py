@@ -0,0 +1,108 @@
+import os
+import threading
+
+from src.file.bitmap import ChunkBitmap
+
+
+PART_SUFFIX = ".part"
+
+
+class PartFile:
+    """Fichier de telechargement pre-alloue (`.part`) ecrit chunk par chunk.
+
+    Chaque chunk verifie est ecrit directement a son offset ; la memoire
+    consommee se limite au bitmap de completion, quelle que soit la taille
+    du fichier. `finalize` renomme atomiquement le `.part` vers sa cible.
+    """
+
+    def __init__(self, final_path, file_size, chunk_size, total_chunks, bitmap=None):
+        self.final_path = final_path
+        self.part_path = final_path + PART_SUFFIX
+        self.file_size = file_size
+        self.chunk_size = chunk_size
+        self._io_lock = threading.Lock()
+        self._renamed = False
+
+        # Reprise : le bitmap n'a de sens que si le .part existe encore.
+        if bitmap is not None and os.path.exists(self.part_path):
+            self.received = ChunkBitmap(total_chunks, bitmap)
+        else:
+            self.received = ChunkBitmap(total_chunks)
+
+        os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self.part_path, flags, 0o644)
+        self._preallocate()
+
+    def _preallocate(self):
+        if os.fstat(self._fd).st_size == self.file_size:
+            return
+        if self.file_size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(self._fd, 0, self.file_size)
+                return
+            except OSError:
+                pass  # systeme de fichiers sans fallocate (tmpfs ancien, NFS...)
+        os.ftruncate(self._fd, self.file_size)
+
+    def _pwrite(self, data, offset):
+        if hasattr(os, "pwrite"):
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+            return
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        os.write(self._fd, data)
+
+    def write_chunk(self, index, data):
+        """Ecrit un chunk deja verifie. Le bitmap est mis a jour par l'appelant."""
+        with self._io_lock:
+            if self._fd is None:
+                raise ValueError("fichier partiel deja ferme")
+            self._pwrite(data, index * self.chunk_size)
+
+    def read_chunk(self, index):
+        """Relit un chunk deja ecrit (reconstruction par parite)."""
+        offset = index * self.chunk_size
+        length = max(0, min(self.chunk_size, self.file_size - offset))
+        with self._io_lock:
+            if self._fd is None:
+                raise ValueError("fichier partiel deja ferme")
+            if hasattr(os, "pread"):
+                return os.pread(self._fd, length, offset)
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            return os.read(self._fd, length)
+
+    def sync(self):
+        """Force les chunks ecrits sur disque (avant de checkpointer le bitmap)."""
+        with self._io_lock:
+            if self._fd is not None:
+                os.fsync(self._fd)
+
+    def close(self):
+        with self._io_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def finalize(self):
+        """Renomme le .part vers sa cible ; peut etre rappele apres un echec."""
+        if not self.received.complete():
+            raise ValueError(f"Chunks manquants: {self.received.total - self.received.count}")
+        with self._io_lock:
+            if self._fd is not None:
+                os.fsync(self._fd)
+        self.close()
+        if not self._renamed:
+            os.replace(self.part_path, self.final_path)
+            self._renamed = True
+        return self.final_path
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.protocol.codec import encode_object
+
+
+HANDSHAKE_BACKLOG = 256  # handshakes en attente du thread dedie ; au-dela, ecartes
+
+_handshakes = None
+_handshakes_lock = threading.Lock()
+
+
+def _handshake_executor():
+    """Thread des handshakes, commun a tous les canaux du processus."""
+    global _handshakes
+    with _handshakes_lock:
+        if _handshakes is None:
+            _handshakes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="handshake")
+        return _handshakes
+
+
+class LoopSocket:
+    """Remplace le socket d'un SecureChannel par le transport asyncio.
+
+    Les envois partent du thread de la boucle ou de threads de travail
+    (ordonnanceurs, pipeline de reception) : hors boucle, ils y sont confies.
+    """
+
+    def __init__(self, loop, transport, sock):
+        self._loop = loop
+        self._transport = transport
+        self._sock = sock
+        self._thread = threading.get_ident()
+
+    def sendto(self, data, addr):
+        if threading.get_ident() == self._thread:
+            self._transport.sendto(data, addr)
+        else:
+            self._loop.call_soon_threadsafe(self._transport.sendto, bytes(data), addr)
+        return len(data)
+
+    def close(self):
+        if threading.get_ident() == self._thread:
+            self._transport.close()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._transport.close)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class SecureChannelProtocol(asyncio.DatagramProtocol):
+    """Reception d'un SecureChannel sur la boucle, a la place du thread de listen.
+
+    Les handshakes (X25519, HKDF, tickets de reprise et magasin de confiance
+    ecrits avec fsync) passent par un thread dedie : un seul, commun aux
+    canaux, qui les traite dans l'ordre d'arrivee comme le thread de listen.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def connection_made(self, transport):
+        loop = asyncio.get_running_loop()
+        self.channel._socket = LoopSocket(loop, transport, self.channel._socket)
+        self.channel._spawn = lambda fn: loop.call_soon_threadsafe(loop.run_in_executor, None, fn)
+        self.channel._run_handshake = self._submit_handshake
+        if self.channel._pipeline:
+            self.channel._pipeline.start()
+        print(f"Canal securise actif sur le port {self.channel.secure_port} (asyncio)...")
+
+    def datagram_received(self, data, addr):
+        try:
+            self.channel._on_datagram(data, addr)
+        except Exception as e:
+            if self.channel.running:
+                print(f"Erreur secure listen: {e}")
+
+    def error_received(self, exc):
+        pass  # ICMP (port injoignable...) : les renvois s'en chargent
+
+    def _submit_handshake(self, handler, payload, addr):
+        with self._pending_lock:
+            if self._pending >= HANDSHAKE_BACKLOG:
+                return  # rafale : le pair renverra son handshake
+            self._pending += 1
+        try:
+            _handshake_executor().submit(self._handshake, handler, payload, addr)
+        except RuntimeError:  # arret de l'interpreteur
+            with self._pending_lock:
+                self._pending -= 1
+
+    def _handshake(self, handler, payload, addr):
+        try:
+            handler(payload, addr)
+        except Exception as e:
+            if self.channel.running:
+                print(f"Erreur secure listen: {e}")
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+
+class DiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, discovery):
+        self.discovery = discovery
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        print(f"Ecoute discovery active sur {self.discovery.mcast_port} (asyncio)...")
+
+    def datagram_received(self, data, addr):
+        try:
+            self.discovery.on_datagram(data, addr, self.transport.sendto)
+        except Exception as e:
+            print(f"Erreur reception HELLO: {e}")
+
+
+class AsyncSecureChannel:
+    """API asynchrone d'un SecureChannel servi par une boucle asyncio.
+
+    L'attente d'un handshake ne bloque pas la boucle : elle avance par pas
+    (`_handshake_tick`, renvois de HS_INIT compris) et se reveille des
+    que la session est installee.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def ensure_session(self, peer_id, ip):
+        channel = self.channel
+        with channel._lock:
+            if peer_id in channel._sessions:
+                return
+        # Cles ephemeres et, en reprise, derivation 0-RTT : hors de la boucle.
+        loop = asyncio.get_running_loop()
+        hs, _ = await loop.run_in_executor(None, channel._begin_handshake, peer_id, ip)
+        if not await self._await_handshake(peer_id, hs):
+            raise TimeoutError("Handshake timeout.")
+
+    async def _await_handshake(self, peer_id, hs):
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: done.done() or done.set_result(True))
+
+        hs["waiters"].append(notify)
+        try:
+            while True:
+                wake = self.channel._handshake_tick(peer_id, hs)
+                if wake is None:
+                    return hs["done"].is_set()
+                try:
+                    await asyncio.wait_for(asyncio.shield(done), max(0.0, wake - time.time()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            hs["waiters"].remove(notify)
+
+    async def send_secure_bytes(self, peer_id, payload_bytes):
+        channel = self.channel
+        peer = channel._peer_entry(peer_id)
+        if not peer:
+            raise ValueError("Pair introuvable. Utilise 'peers' d'abord.")
+        await self.ensure_session(peer_id, peer["ip"])
+        ctx = channel._send_context(peer_id)  # session presente : ne bloque pas
+        loop = asyncio.get_running_loop()
+        if len(payload_bytes) > channel.fragment_size:
+            # Repasse par _ensure_session, qui attendrait une renegociation
+            # (ou une session expiree entre-temps) : hors de la boucle.
+            await loop.run_in_executor(
+                None, channel._send_fragmented, peer_id, ctx["ip"], payload_bytes
+            )
+            return
+        keys = ctx["keys"]
+        if keys is None or keys.get("early") is not None or keys.get("rekey"):
+            # Chemins rares qui peuvent attendre une renegociation : hors de la boucle.
+            await loop.run_in_executor(None, channel._send_with_context, ctx, payload_bytes)
+        else:
+            channel._send_with_context(ctx, payload_bytes)
+
+    async def send_secure_object(self, peer_id, obj):
+        plaintext = encode_object(obj, binary=peer_id in self.channel._binary_peers)
+        await self.send_secure_bytes(peer_id, plaintext)
+
+    async def send_secure_message(self, peer_id, message):
+        await self.send_secure_object(peer_id, {"kind": "chat", "text": str(message)})
+
+
+async def serve_channel(channel):
+    """Branche un SecureChannel deja lie a son port sur la boucle courante.
+
+    Les handlers (file_get, ACK de fichier...) emettent de facon synchrone :
+    ils ne doivent pas tourner sur la boucle. Sans pipeline (rx_workers=0),
+    un worker de reception est donc impose.
+    """
+    if channel._pipeline is None:
+        print("[WARN] rx_workers=0 incompatible avec asyncio : 1 worker de reception.")
+        channel._pipeline = channel._make_pipeline(1)
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: SecureChannelProtocol(channel), sock=channel._socket
+    )
+    return transport
+
+
+async def serve_discovery(discovery):
+    """Ecoute et balises HELLO de la decouverte sur la boucle courante."""
+    loop = asyncio.get_running_loop()
+    listen, _ = await loop.create_datagram_endpoint(
+        lambda: DiscoveryProtocol(discovery), sock=discovery.open_listen_socket()
+    )
+    beacon, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, sock=discovery.open_broadcast_socket()
+    )
+    return listen, beacon
+
+
+async def every(interval, fn, executor=False):
+    """Appelle `fn` toutes les `interval` secondes (dans un thread si `executor`)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            if executor:
+                await loop.run_in_executor(None, fn)
+            else:
+                fn()
+        except Exception as e:
+            print(f"[WARN] Tache periodique {getattr(fn, '__name__', fn)} : {e}")
+        await asyncio.sleep(interval)
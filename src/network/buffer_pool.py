@@ -0,0 +1,45 @@
+import threading
+
+
+RX_BUFFER_SIZE = 65535  # plus grand datagramme UDP recu
+RX_BUFFERS = 256  # tampons en circulation au plus (file du pipeline comprise) : 16 Mio
+
+
+class BufferPool:
+    """Tampons de reception reutilisables pour recvfrom_into.
+
+    Un tampon est rendu (release) une fois son datagramme traite ; d'ici
+    la, les vues (memoryview) qui le decoupent restent valides. Au-dela de
+    `count` tampons en circulation, acquire() retourne None : l'appelant
+    revient a recvfrom, plutot que de bloquer la reception.
+    """
+
+    def __init__(self, size=RX_BUFFER_SIZE, count=RX_BUFFERS):
+        self.size = size
+        self.count = count
+        self._lock = threading.Lock()
+        self._free = []
+        self._out = 0  # tampons pretes, pas encore rendus
+        self._stats = {"allocated": 0, "reused": 0, "exhausted": 0}
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                self._stats["reused"] += 1
+                self._out += 1
+                return self._free.pop()
+            if self._out >= self.count:
+                self._stats["exhausted"] += 1
+                return None
+            self._stats["allocated"] += 1
+            self._out += 1
+        return bytearray(self.size)
+
+    def release(self, buffer):
+        with self._lock:
+            self._out -= 1
+            self._free.append(buffer)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "in_use": self._out}
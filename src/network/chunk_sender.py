@@ -0,0 +1,287 @@
+import threading
+import time
+
+from src.file.bitmap import ChunkBitmap
+from src.network.congestion import LedbatController
+
+
+INITIAL_RTO = 0.5
+MIN_RTO = 0.05
+MAX_RTO = 4.0
+IDLE_TIMEOUT = 60  # abandon si aucun ACK pendant ce delai (secondes)
+MAX_BURST_CREDIT = 0.005  # avance de pacing cumulable (secondes)
+
+
+class ChunkSender:
+    """Emetteur selective-repeat pour une offre vers un pair.
+
+    Fenetre glissante de chunks en vol (pilotee par le controleur de
+    congestion), retransmission sur expiration du RTO ou sur detection de
+    perte via les blocs SACK du recepteur.
+    """
+
+    def __init__(
+        self, peer_id, offer_id, total_chunks, send_chunk, chunk_size, controller=None, ranges=None
+    ):
+        self.peer_id = peer_id
+        self.offer_id = offer_id
+        self.total = total_chunks
+        self.cc = controller or LedbatController(chunk_size)
+        self._send_chunk = send_chunk  # callable(index)
+        self._next_send_at = 0.0
+
+        self._lock = threading.Lock()
+        self.acked = ChunkBitmap(total_chunks)
+        if ranges is not None:
+            # Reprise : seules les plages demandees sont a envoyer, le reste
+            # est considere comme deja acquitte.
+            wanted = ChunkBitmap(total_chunks)
+            for start, end in ranges:
+                wanted.set_range(start, end)
+            for start, end in wanted.missing_ranges():
+                self.acked.set_range(start, end)
+        self._next_new = self.acked.first_missing()
+        self._inflight = {}  # index -> {"sent_at": float, "retx": bool}
+        self._lost = []
+        self._latest_acked_sent_at = 0.0
+
+        self.srtt = None
+        self.rttvar = None
+        self.rto = INITIAL_RTO
+        self.started_at = time.time()
+        self.last_progress = self.started_at
+        self.sent = 0
+        self.retransmits = 0
+        self.cancelled = False
+        self.finished = False
+
+    def done(self):
+        return self.acked.complete()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+
+    def extend(self, ranges):
+        """Ajoute des plages a envoyer (complement d'attribution en mode essaim).
+
+        Retourne False si l'emetteur a deja termine : l'appelant en cree un nouveau.
+        """
+        with self._lock:
+            if self.finished or self.cancelled:
+                return False
+            for start, end in ranges:
+                start, end = max(0, start), min(end, self.total)
+                if start >= end:
+                    continue
+                self.acked.clear_range(start, end)
+                self._next_new = min(self._next_new, start)
+            self.last_progress = time.time()
+            return True
+
+    def _rtt_sample(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.rto = min(MAX_RTO, max(MIN_RTO, self.srtt + 4 * self.rttvar))
+
+    def on_ack(self, base, sack):
+        now = time.time()
+        with self._lock:
+            newly = []
+            # Seuls les trous du bitmap sont parcourus : un bloc SACK large
+            # recouvrant des chunks deja acquittes ne coute rien.
+            blocks = [(0, base)] + [(max(start, base, 0), end) for start, end in sack or []]
+            for start, end in blocks:
+                for lo, hi in self.acked.missing_ranges(start, stop=end):
+                    for idx in range(lo, hi):
+                        self.acked.set(idx)
+                        newly.append(idx)
+            if not newly:
+                return
+
+            self.last_progress = now
+            sample = None
+            for idx in newly:
+                entry = self._inflight.pop(idx, None)
+                if not entry:
+                    continue
+                if entry["sent_at"] > self._latest_acked_sent_at:
+                    self._latest_acked_sent_at = entry["sent_at"]
+                if not entry["retx"]:
+                    # Karn : pas d'echantillon RTT sur un chunk retransmis
+                    sample = now - entry["sent_at"]
+            if sample is not None:
+                self._rtt_sample(sample)
+            self.cc.on_ack(len(newly), sample, now)
+
+            # Detection de perte facon RACK : un chunk envoye avant un chunk
+            # deja acquitte (avec une marge de reordonnancement) est perdu.
+            reo_wnd = (self.srtt or INITIAL_RTO) / 4
+            for idx, entry in self._inflight.items():
+                if entry["sent_at"] + reo_wnd < self._latest_acked_sent_at and not entry.get("lost"):
+                    entry["lost"] = True
+                    self._lost.append(idx)
+            if self._lost:
+                self.cc.on_loss(now)
+
+    def _next_batch(self, now, limit):
+        """Chunks a (re)emettre maintenant (au plus `limit`) et prochaine echeance RTO."""
+        batch = []
+        while self._lost and len(batch) < limit:
+            idx = self._lost.pop(0)
+            if idx in self._inflight and not self.acked.has(idx):
+                batch.append(idx)
+
+        timed_out = False
+        next_deadline = None
+        for idx, entry in self._inflight.items():
+            deadline = entry["sent_at"] + self.rto
+            if deadline <= now:
+                if len(batch) < limit and idx not in batch:
+                    batch.append(idx)
+                    timed_out = True
+            elif next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        if timed_out:
+            self.rto = min(MAX_RTO, self.rto * 2)
+            self.cc.on_timeout()
+
+        while (
+            len(batch) < limit
+            and len(self._inflight) < self.cc.window()
+            and self._next_new < self.total
+        ):
+            idx = self.acked.first_missing(self._next_new)
+            if idx >= self.total:
+                self._next_new = idx
+                break
+            self._next_new = idx + 1
+            if idx in self._inflight:
+                continue  # deja en vol (plage ajoutee par extend)
+            batch.append(idx)
+            self._inflight[idx] = {"sent_at": now, "retx": False}
+
+        for idx in batch:
+            entry = self._inflight.get(idx)
+            if entry and entry["sent_at"] != now:
+                entry.update(sent_at=now, retx=True, lost=False)
+                self.retransmits += 1
+        return batch, next_deadline
+
+    def poll(self, now, budget):
+        """Prepare le prochain lot pour l'ordonnanceur.
+
+        Retourne (etat, lot, reveil) : etat vaut "done", "failed" ou "active" ;
+        reveil est l'instant de la prochaine echeance (pacing ou RTO), None si
+        l'emetteur attend seulement un ACK.
+        """
+        with self._lock:
+            if self.cancelled:
+                self.finished = True
+                return "failed", [], None
+            if self.done():
+                self.finished = True
+                return "done", [], None
+            if now - self.last_progress > IDLE_TIMEOUT:
+                self.finished = True
+                return "failed", [], None
+
+            interval = self.cc.pacing_interval()
+            if interval:
+                if self._next_send_at > now + MAX_BURST_CREDIT:
+                    return "active", [], self._next_send_at
+                allowed = int((now + MAX_BURST_CREDIT - self._next_send_at) / interval) + 1
+                budget = max(1, min(budget, allowed))
+
+            batch, deadline = self._next_batch(now, budget)
+            if interval and batch:
+                self._next_send_at = max(self._next_send_at, now - MAX_BURST_CREDIT)
+                self._next_send_at += interval * len(batch)
+            if batch:
+                return "active", batch, now
+            return "active", [], deadline
+
+    def send(self, batch):
+        for idx in batch:
+            self._send_chunk(idx)
+            self.sent += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "peer_id": self.peer_id,
+                "offer_id": self.offer_id,
+                "acked": self.acked.count,
+                "total_chunks": self.total,
+                "inflight": len(self._inflight),
+                "sent": self.sent,
+                "retransmits": self.retransmits,
+                "rto": self.rto,
+                **self.cc.stats(),
+            }
+
+
+class LegacySender:
+    """Envoi historique pour un pair ancien, servi par l'ordonnanceur.
+
+    Chaque chunk part une fois, dans l'ordre, sans fenetre ni ACK : le pair
+    ne sait ni acquitter ni redemander de plages. Meme interface que
+    `ChunkSender` (poll/send/cancel/stats), ce qui le soumet au tourniquet
+    et aux workers de l'ordonnanceur.
+    """
+
+    layout = None
+    compressor = None
+
+    def __init__(self, peer_id, offer_id, total_chunks, send_chunk):
+        self.peer_id = peer_id
+        self.offer_id = offer_id
+        self.total = total_chunks
+        self._send_chunk = send_chunk  # callable(index)
+        self._lock = threading.Lock()
+        self._next = 0
+        self.sent = 0
+        self.cancelled = False
+        self.finished = False
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+
+    def extend(self, ranges):
+        return False  # pas de complement : une nouvelle demande repart de zero
+
+    def on_ack(self, base, sack):
+        pass
+
+    def poll(self, now, budget):
+        with self._lock:
+            if self.cancelled:
+                self.finished = True
+                return "failed", [], None
+            if self._next >= self.total:
+                self.finished = True
+                return "done", [], None
+            end = min(self.total, self._next + max(1, budget))
+            batch = list(range(self._next, end))
+            self._next = end
+            return "active", batch, now
+
+    def send(self, batch):
+        for idx in batch:
+            self._send_chunk(idx)
+            self.sent += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "peer_id": self.peer_id,
+                "offer_id": self.offer_id,
+                "total_chunks": self.total,
+                "sent": self.sent,
+                "legacy": True,
+            }
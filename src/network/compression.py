@@ -0,0 +1,124 @@
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # dependance optionnelle : zlib (stdlib) reste toujours disponible
+    zstandard = None
+
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+DEFAULT_COMPRESSION = "auto"  # "auto" (zstd sinon zlib), "zstd", "zlib" ou "off"
+ZLIB_LEVEL = 1
+ZSTD_LEVEL = 3
+MAX_DECOMPRESSED = 65535  # aucune unite d'envoi ne depasse un datagramme
+SKIP_AFTER = 8  # chunks incompressibles d'affilee avant de ne plus essayer qu'en sondage
+PROBE_EVERY = 16  # ensuite, un essai tous les N chunks
+
+
+def supported_codecs(mode=DEFAULT_COMPRESSION):
+    """Codecs utilisables localement pour `mode`, du prefere au moins prefere."""
+    if mode == "off":
+        return []
+    available = ["zstd", "zlib"] if zstandard else ["zlib"]
+    if mode == "auto":
+        return available
+    if mode not in CODECS:
+        raise ValueError(f"Compression inconnue : {mode}")
+    return [mode] if mode in available else []
+
+
+def choose_codec(offered, mode=DEFAULT_COMPRESSION):
+    """Premier codec local accepte par le pair (liste recue dans file_get)."""
+    if not isinstance(offered, list):
+        return None
+    for name in supported_codecs(mode):
+        if name in offered:
+            return name
+    return None
+
+
+def decompress(codec, payload, limit=MAX_DECOMPRESSED):
+    """Decompresse une unite recue ; ValueError si corrompue ou plus grande que `limit`."""
+    if codec == CODEC_ZLIB:
+        d = zlib.decompressobj()
+        try:
+            data = d.decompress(payload, limit)
+        except zlib.error as e:
+            raise ValueError(f"Unite zlib invalide : {e}")
+        if d.unconsumed_tail or not d.eof:
+            raise ValueError("Unite zlib tronquee ou trop grande.")
+        return data
+    if codec == CODEC_ZSTD and zstandard:
+        try:
+            return zstandard.ZstdDecompressor().decompress(payload, max_output_size=limit)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Unite zstd invalide : {e}")
+    raise ValueError(f"Codec non supporte : {codec}")
+
+
+class ChunkCompressor:
+    """Compression des unites d'un envoi, avec statistiques (taux, cout CPU).
+
+    Une unite n'est envoyee compressee que si elle retrecit : les donnees
+    deja compressees (JPEG, PDF, archives) partent telles quelles. Apres
+    SKIP_AFTER echecs consecutifs, seule une unite sur PROBE_EVERY est
+    encore essayee pour ne pas payer la compression d'un fichier entier
+    incompressible.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.codec = CODECS[name]
+        self._lock = threading.Lock()
+        self._zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if self.codec == CODEC_ZSTD else None
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.compressed = 0
+        self.skipped = 0
+        self.cpu_time = 0.0
+        self._misses = 0
+        self._calls = 0
+
+    def pack(self, data):
+        """Renvoie (codec, octets a envoyer) pour une unite brute."""
+        with self._lock:
+            self._calls += 1
+            attempt = self._misses < SKIP_AFTER or self._calls % PROBE_EVERY == 0
+        packed = None
+        if attempt:
+            start = time.thread_time()
+            if self._zstd:
+                packed = self._zstd.compress(data)
+            else:
+                packed = zlib.compress(data, ZLIB_LEVEL)
+            elapsed = time.thread_time() - start
+        with self._lock:
+            if attempt:
+                self.cpu_time += elapsed
+            self.raw_bytes += len(data)
+            # Strictement plus petit : la trame compressee porte un octet de codec en plus.
+            if packed is not None and len(packed) < len(data):
+                self._misses = 0
+                self.compressed += 1
+                self.wire_bytes += len(packed)
+                return self.codec, packed
+            if attempt:
+                self._misses += 1
+            self.skipped += 1
+            self.wire_bytes += len(data)
+        return CODEC_NONE, data
+
+    def stats(self):
+        with self._lock:
+            return {
+                "codec": self.name,
+                "ratio": self.raw_bytes / self.wire_bytes if self.wire_bytes else 1.0,
+                "compressed": self.compressed,
+                "skipped": self.skipped,
+                "cpu_time": self.cpu_time,
+            }
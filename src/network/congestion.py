@@ -0,0 +1,127 @@
+import time
+
+
+TARGET_DELAY = 0.025  # retard de file d'attente vise (secondes), adapte au LAN
+GAIN = 1.0
+INIT_CWND = 16  # en chunks
+MIN_CWND = 2
+MAX_CWND = 4096
+BASE_HISTORY = 10  # nombre de tranches d'une minute pour le retard de base
+PACING_GAIN = 1.25
+LOSS_BACKOFF = 0.5  # perte de congestion
+RANDOM_LOSS_BACKOFF = 0.85  # perte sans file d'attente
+
+
+class LedbatController:
+    """Controle de congestion LEDBAT (RFC 6817) sur echantillons de RTT.
+
+    Le retard de file d'attente est estime par `rtt - base_rtt` ; la fenetre
+    grandit tant qu'il reste sous la cible et recule des qu'il la depasse,
+    ce qui laisse la place au trafic interactif (chat, autres applications).
+    Une perte accompagnee d'une file d'attente (retard > cible/2) divise la
+    fenetre par deux ; une perte sans file d'attente (perte radio Wi-Fi) ne la
+    reduit que legerement. Au plus une reduction par RTT.
+    """
+
+    def __init__(self, chunk_size, target=TARGET_DELAY, init_cwnd=INIT_CWND):
+        self.chunk_size = chunk_size
+        self.target = target
+        self.cwnd = float(init_cwnd)
+        self.srtt = None
+        self.last_rtt = None
+        self.slow_start = True
+        self._base_history = []  # [(minute, rtt_min)]
+        self._last_loss_at = 0.0
+        self._acked_bytes = 0
+        self._rate_window_start = time.time()
+        self.delivery_rate = 0.0  # octets/s effectivement acquittes
+
+    def base_rtt(self):
+        if not self._base_history:
+            return None
+        return min(rtt for _, rtt in self._base_history)
+
+    def queuing_delay(self):
+        base = self.base_rtt()
+        if base is None or self.last_rtt is None:
+            return 0.0
+        return max(0.0, self.last_rtt - base)
+
+    def _record_base(self, rtt, now):
+        minute = int(now // 60)
+        if self._base_history and self._base_history[-1][0] == minute:
+            if rtt < self._base_history[-1][1]:
+                self._base_history[-1] = (minute, rtt)
+        else:
+            self._base_history.append((minute, rtt))
+            del self._base_history[:-BASE_HISTORY]
+
+    def on_ack(self, acked, rtt=None, now=None):
+        now = now or time.time()
+        if acked <= 0:
+            return
+        self._acked_bytes += acked * self.chunk_size
+        span = now - self._rate_window_start
+        if span >= 0.25:
+            self.delivery_rate = self._acked_bytes / span
+            self._acked_bytes = 0
+            self._rate_window_start = now
+
+        if rtt is not None:
+            self.last_rtt = rtt
+            self.srtt = rtt if self.srtt is None else 0.875 * self.srtt + 0.125 * rtt
+            self._record_base(rtt, now)
+
+        delay = self.queuing_delay()
+        if self.slow_start:
+            if delay > self.target / 2:
+                self.slow_start = False
+            else:
+                self.cwnd += acked
+        if not self.slow_start:
+            off_target = (self.target - delay) / self.target
+            self.cwnd += GAIN * off_target * acked / self.cwnd
+        self.cwnd = min(MAX_CWND, max(MIN_CWND, self.cwnd))
+
+    def on_loss(self, now=None):
+        now = now or time.time()
+        if now - self._last_loss_at < (self.srtt or 0.1):
+            return
+        self._last_loss_at = now
+        self.slow_start = False
+        if self.queuing_delay() > self.target / 2:
+            factor = LOSS_BACKOFF
+        else:
+            factor = RANDOM_LOSS_BACKOFF
+        self.cwnd = max(MIN_CWND, self.cwnd * factor)
+
+    def on_timeout(self):
+        self.slow_start = False
+        self.cwnd = MIN_CWND
+
+    def window(self):
+        return int(self.cwnd)
+
+    def pacing_interval(self):
+        """Intervalle entre deux envois (secondes), 0 tant que le RTT est inconnu."""
+        if not self.srtt:
+            return 0.0
+        return self.srtt / (self.cwnd * PACING_GAIN)
+
+    def rate(self):
+        """Debit vise en octets/s (cwnd / srtt)."""
+        if not self.srtt:
+            return 0.0
+        return self.cwnd * self.chunk_size / self.srtt
+
+    def stats(self):
+        base = self.base_rtt()
+        return {
+            "cwnd": round(self.cwnd, 2),
+            "rate": round(self.rate()),
+            "delivery_rate": round(self.delivery_rate),
+            "srtt": self.srtt,
+            "base_rtt": base,
+            "queuing_delay": self.queuing_delay(),
+            "slow_start": self.slow_start,
+        }
@@ -6,6 +6,7 @@ from src.protocol.packet import TYPE_HELLO, pack_hello, unpack_packet
 
 MCAST_GRP = "239.255.42.99"
 MCAST_PORT = 6000
+HELLO_INTERVAL = 30  # secondes entre deux HELLO multicast
 
 
 def get_local_ip():
@@ -29,7 +30,11 @@ class Discovery:
         self._last_reply = {}  # ip -> timestamp
         self._dup_warned_ips = set()
 
-    def broadcast(self):
+    def _hello(self):
+        # On envoie l'ID et le port sécurisé (ID|PORT)
+        return pack_hello(f"{self.node_id}|{self.mcast_port + 1}")
+
+    def open_broadcast_socket(self):
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
@@ -42,17 +47,22 @@ class Discovery:
                 )
             except Exception:
                 pass
+        return sock
+
+    def beacon(self, sock):
+        """Un HELLO en multicast et en broadcast (toutes les HELLO_INTERVAL secondes)."""
+        try:
+            packet = self._hello()
+            sock.sendto(packet, (MCAST_GRP, self.mcast_port))
+            sock.sendto(packet, ("255.255.255.255", self.mcast_port))
+        except Exception as e:
+            print(f"Erreur envoi HELLO: {e}")
 
+    def broadcast(self):
+        sock = self.open_broadcast_socket()
         while self.running:
-            try:
-                # On envoie l'ID et le port sécurisé (ID|PORT)
-                msg = f"{self.node_id}|{self.mcast_port + 1}"
-                packet = pack_hello(msg)
-                sock.sendto(packet, (MCAST_GRP, self.mcast_port))
-                sock.sendto(packet, ("255.255.255.255", self.mcast_port))
-                time.sleep(30)
-            except Exception as e:
-                print(f"Erreur envoi HELLO: {e}")
+            self.beacon(sock)
+            time.sleep(HELLO_INTERVAL)
 
     def ping(self, ip):
         """Bootstrap direct P2P sans multicast: envoi un HELLO unicast vers une IP."""
@@ -63,12 +73,11 @@ class Discovery:
 
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         try:
-            msg = f"{self.node_id}|{self.mcast_port + 1}"
-            sock.sendto(pack_hello(msg), (ip, self.mcast_port))
+            sock.sendto(self._hello(), (ip, self.mcast_port))
         finally:
             sock.close()
 
-    def listen(self):
+    def open_listen_socket(self):
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         sock.bind(("", self.mcast_port))
@@ -79,35 +88,42 @@ class Discovery:
             sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
         except Exception as e:
             print(f"Multicast indisponible, mode UDP simple: {e}")
+        return sock
 
+    def listen(self):
+        sock = self.open_listen_socket()
         print(f"Ecoute discovery active sur {self.mcast_port}...")
         while self.running:
             try:
                 data, addr = sock.recvfrom(1024)
-                info = unpack_packet(data)
-                if info and info["type"] == TYPE_HELLO:
-                    payload = info["payload"].decode("utf-8")
-                    if "|" in payload:
-                        remote_id, remote_port = payload.split("|")
-                        remote_port = int(remote_port)
-                    else:
-                        remote_id = payload
-                        remote_port = self.mcast_port + 1 # Fallback
-
-                    if remote_id == self.node_id:
-                        continue
-
-                    now = time.time()
-                    prev = self._last_reply.get(addr[0], 0)
-                    self.peer_table.update(remote_id, addr[0], port=remote_port)
-                    # Ack unicast de courtoisie pour bootstrap bilateral sans serveur central.
-                    if now - prev > 10:
-                        msg = f"{self.node_id}|{self.mcast_port + 1}"
-                        sock.sendto(pack_hello(msg), (addr[0], self.mcast_port))
-                        self._last_reply[addr[0]] = now
+                self.on_datagram(data, addr, sock.sendto)
             except Exception as e:
                 if self.running:
                     print(f"Erreur reception HELLO: {e}")
 
+    def on_datagram(self, data, addr, reply):
+        """Traite un HELLO recu ; `reply(paquet, adresse)` emet l'ack unicast."""
+        info = unpack_packet(data)
+        if not info or info["type"] != TYPE_HELLO:
+            return
+        payload = bytes(info["payload"]).decode("utf-8")
+        if "|" in payload:
+            remote_id, remote_port = payload.split("|")
+            remote_port = int(remote_port)
+        else:
+            remote_id = payload
+            remote_port = self.mcast_port + 1 # Fallback
+
+        if remote_id == self.node_id:
+            return
+
+        now = time.time()
+        prev = self._last_reply.get(addr[0], 0)
+        self.peer_table.update(remote_id, addr[0], port=remote_port)
+        # Ack unicast de courtoisie pour bootstrap bilateral sans serveur central.
+        if now - prev > 10:
+            reply(self._hello(), (addr[0], self.mcast_port))
+            self._last_reply[addr[0]] = now
+
     def stop(self):
         self.running = False
@@ -0,0 +1,21 @@
+DEFAULT_FEC_GROUP = 0  # 0 : pas de FEC
+MIN_FEC_GROUP = 2
+MAX_FEC_GROUP = 64
+MAX_PARITY_GROUPS = 256  # paquets de parite gardes en attente par telechargement
+
+
+def group_units(group, n, total_units):
+    """Unites protegees par le paquet de parite `group` (groupes de n unites)."""
+    return range(group * n, min((group + 1) * n, total_units))
+
+
+def xor_blocks(blocks, size):
+    """XOR de blocs completes par des zeros a `size` octets.
+
+    Avec la parite d'un groupe et toutes ses unites sauf une, le resultat
+    est l'unite manquante (suivie de zeros de bourrage).
+    """
+    acc = 0
+    for block in blocks:
+        acc ^= int.from_bytes(bytes(block).ljust(size, b"\0"), "big")
+    return acc.to_bytes(size, "big")
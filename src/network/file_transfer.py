@@ -1,52 +1,154 @@
 import hashlib
+import json
 import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from src.file.chunker import assemble_file, build_manifest, read_chunk_at
+from src.file.bitmap import ChunkBitmap, coalesce_ranges
+from src.file.block_cache import DEFAULT_BLOCK_CACHE_MB, BlockCache
+from src.file.chunk_source import ChunkSourcePool
+from src.file.chunker import public_manifest
+from src.file.download_state import DownloadStateStore, atomic_write
+from src.file.manifest_cache import ManifestCache
+from src.file.merkle import (
+    BATCH_SIZE,
+    MerkleTree,
+    batch_count,
+    batch_level,
+    subtree_root,
+    verify_batch,
+)
+from src.file.part_file import PART_SUFFIX, PartFile
+from src.network.chunk_sender import ChunkSender, LegacySender
+from src.network.compression import (
+    CODEC_NONE,
+    DEFAULT_COMPRESSION,
+    ChunkCompressor,
+    choose_codec,
+    supported_codecs,
+)
+from src.network.fec import (
+    DEFAULT_FEC_GROUP,
+    MAX_FEC_GROUP,
+    MAX_PARITY_GROUPS,
+    MIN_FEC_GROUP,
+    group_units,
+    xor_blocks,
+)
+from src.network.segments import SegmentLayout
+from src.network.swarm import LOW_WATER_CHUNKS, SwarmPlanner, count_chunks
+from src.network.upload_scheduler import DEFAULT_UPLOAD_WORKERS, UploadScheduler
+
+
+ACK_EVERY = 2  # le recepteur acquitte au moins tous les N chunks (cf. delayed ACK TCP)
+MAX_SACK_BLOCKS = 64
+STALL_TIMEOUT = 2.0  # relance d'une source si plus rien n'arrive (secondes)
+STALLS_BEFORE_GET = 2  # apres N relances par ACK sans effet, on redemande les plages
+SOURCE_DEAD_STALLS = 3  # relances sans effet avant de redistribuer la part d'une source
+SOURCE_RETRY_DELAY = 30.0  # une source ecartee est reessayee apres ce delai (secondes)
+MAX_GET_RANGES = 256
+CHECKPOINT_INTERVAL = 5.0  # secondes entre deux sauvegardes du bitmap
+OFFERS_INDEX = "offers.json"
+MANIFEST_CACHE_DIRNAME = ".manifests"
+RESTORE_WORKERS = 1  # reconstructions d'offres locales (manifeste relu ou recalcule) en parallele
+HASH_LOOKAHEAD = 32  # lots de hash gardes d'avance apres le premier chunk manquant
+MAX_PENDING_HASHES = 8
+HASH_TIMEOUT = 1.0
+LEGACY_REGET_DELAY = 30.0  # un pair ancien renvoie tout le fichier : file_get repete au plus a ce rythme
+LEGACY_HASH_BYTES = 67  # un hash de chunk dans l'offre JSON historique : 64 hex, guillemets, virgule
+MAX_PARTIAL_CHUNKS = 2048  # chunks segmentes en cours de reassemblage par telechargement
+PARTIAL_TIMEOUT = 60.0  # un chunk incomplet sans nouveau segment est abandonne (secondes)
 
 
 class FileTransfer:
-    def __init__(self, node_id, secure_channel):
+    def __init__(
+        self,
+        node_id,
+        secure_channel,
+        share_dir="data/share",
+        download_dir="data/downloads",
+        upload_workers=DEFAULT_UPLOAD_WORKERS,
+        block_cache_mb=DEFAULT_BLOCK_CACHE_MB,
+        fec_group=DEFAULT_FEC_GROUP,
+        compression=DEFAULT_COMPRESSION,
+    ):
         self.node_id = node_id
         self.secure = secure_channel
+        self.scheduler = UploadScheduler(workers=upload_workers)
 
-        self.share_dir = "data/share"
-        self.download_dir = "data/downloads"
+        self.share_dir = share_dir
+        self.download_dir = download_dir
         os.makedirs(self.share_dir, exist_ok=True)
         os.makedirs(self.download_dir, exist_ok=True)
+        self.state = DownloadStateStore(self.download_dir)
+        self._offers_index_path = os.path.join(self.share_dir, OFFERS_INDEX)
+        self.manifests = ManifestCache(os.path.join(self.share_dir, MANIFEST_CACHE_DIRNAME))
+        # block_cache_mb=0 : pas de cache, chaque chunk est relu sur disque
+        self.block_cache = BlockCache(block_cache_mb * 1024 * 1024) if block_cache_mb > 0 else None
+        self.chunk_sources = ChunkSourcePool(cache=self.block_cache)
+        # FEC demandee aux sources : une parite XOR toutes les `fec_group` unites (0 = sans).
+        self.fec_group = fec_group
+        # Codecs annonces dans file_get et acceptes pour nos envois ("off" : aucun).
+        supported_codecs(compression)  # ValueError si le mode est inconnu
+        self.compression = compression
 
         self._lock = threading.Lock()
-        self.local_offers = {}  # offer_id -> {"manifest": dict, "file_path": str}
-        self.remote_offers = {}  # offer_id -> {"manifest": dict, "owner": str, "seen_at": int}
-        self.downloads = {}  # offer_id -> {"manifest": dict, "owner": str, "chunks": dict}
+        self.local_offers = {}  # offer_id -> {"manifest": dict, "file_path": str, "tree": MerkleTree}
+        self.remote_offers = {}  # offer_id -> {"manifest": dict, "owners": {peer_id: seen_at}, "owner": str, "seen_at": int}
+        self.downloads = {}  # offer_id -> {"manifest": dict, "swarm": SwarmPlanner, "part": PartFile, "received": ChunkBitmap}
+        self.uploads = {}  # (peer_id, offer_id) -> ChunkSender | LegacySender
+        self._restorer = ThreadPoolExecutor(max_workers=RESTORE_WORKERS, thread_name_prefix="offer-restore")
+        self._restoring = {}  # offer_id -> rappels en attente de la reconstruction
 
         self.secure.register_handler("file_offer", self._on_file_offer)
         self.secure.register_handler("file_get", self._on_file_get)
         self.secure.register_handler("file_chunk", self._on_file_chunk)
+        self.secure.register_handler("file_segment", self._on_file_segment)
+        self.secure.register_handler("file_parity", self._on_file_parity)
+        self.secure.register_handler("file_ack", self._on_file_ack)
+        self.secure.register_handler("file_hashes_get", self._on_file_hashes_get)
+        self.secure.register_handler("file_hashes", self._on_file_hashes)
 
     def offer_file(self, peer_id, file_path):
         abs_path = os.path.abspath(file_path)
-        manifest = build_manifest(abs_path)
+        manifest = self.manifests.build(abs_path)
         offer_id = manifest["offer_id"]
         with self._lock:
-            self.local_offers[offer_id] = {"manifest": manifest, "file_path": abs_path}
+            changed = offer_id not in self.local_offers
+        if changed:
+            self.chunk_sources.invalidate(abs_path)  # contenu nouveau ou modifie : blocs obsoletes
+        with self._lock:
+            self.local_offers[offer_id] = self._local_offer(manifest, abs_path)
+            self._save_offers_index()
 
-        self.secure.send_secure_object(
-            peer_id,
-            {
+        # L'offre ne porte que la racine de Merkle : taille constante quel que
+        # soit le fichier. Les hash de chunks sont servis a la demande.
+        msg = {"kind": "file_offer", "manifest": public_manifest(manifest)}
+        room = self.secure.fragment_size
+        if not self.secure.is_recent_peer(peer_id) and manifest["total_chunks"] * LEGACY_HASH_BYTES < room:
+            # Pair peut-etre ancien : il exige la liste complete des hash, dans
+            # une offre non fragmentee (il ne reassemble pas).
+            legacy = {
                 "kind": "file_offer",
-                "manifest": manifest,
-            },
-        )
+                "manifest": dict(msg["manifest"], chunk_hashes=manifest["chunk_hashes"]),
+            }
+            if len(json.dumps(legacy, separators=(",", ":"))) <= room:
+                msg = legacy
+        self.secure.send_secure_object(peer_id, msg)
         return manifest
 
+    def _local_offer(self, manifest, file_path):
+        tree = MerkleTree([bytes.fromhex(h) for h in manifest["chunk_hashes"]])
+        return {"manifest": public_manifest(manifest), "file_path": file_path, "tree": tree}
+
     def list_remote_offers(self):
         with self._lock:
             return [
                 {
                     "offer_id": oid,
                     "owner": info["owner"],
+                    "owners": list(info["owners"]),
                     "file_name": info["manifest"]["file_name"],
                     "file_size": info["manifest"]["file_size"],
                     "total_chunks": info["manifest"]["total_chunks"],
@@ -59,23 +161,314 @@ class FileTransfer:
             info = self.remote_offers.get(offer_id)
             if not info:
                 raise ValueError("offer_id inconnu")
-            owner = info["owner"]
+            if offer_id in self.downloads and not self.downloads[offer_id]["done"]:
+                raise ValueError("telechargement deja en cours")
+            owners = list(info["owners"])
             manifest = info["manifest"]
-            self.downloads[offer_id] = {
-                "manifest": manifest,
-                "owner": owner,
-                "chunks": {},
-                "started_at": int(time.time()),
-            }
+            final_path = self._output_path(manifest["file_name"])
+            part = PartFile(
+                final_path,
+                manifest["file_size"],
+                manifest["chunk_size"],
+                manifest["total_chunks"],
+            )
+            dl = self._new_download(manifest, owners, part)
+            self.downloads[offer_id] = dl
+        self._save_meta(offer_id, dl)
+        self._start_fetch(offer_id, dl)
 
+    def _save_meta(self, offer_id, dl):
+        with self._lock:
+            owners = list(dl["swarm"].sources)
+        self.state.save_meta(
+            offer_id,
+            {
+                "manifest": dl["manifest"],
+                "owners": owners,
+                "final_path": dl["part"].final_path,
+                "started_at": dl["started_at"],
+            },
+        )
+
+    def _new_download(self, manifest, owners, part, started_at=None):
+        leaves = {}
+        if "chunk_hashes" in manifest:
+            # Manifeste d'un ancien pair : tous les hash sont deja connus.
+            flat = [bytes.fromhex(h) for h in manifest["chunk_hashes"]]
+            for batch in range(batch_count(len(flat))):
+                leaves[batch] = flat[batch * BATCH_SIZE:(batch + 1) * BATCH_SIZE]
+        swarm = SwarmPlanner(part.received)
+        for peer_id in owners:
+            swarm.add_source(peer_id)
+        return {
+            "manifest": manifest,
+            "root": bytes.fromhex(manifest["merkle_root"]),
+            "leaves": leaves,  # lot -> hash de chunks verifies contre la racine
+            "pending_hashes": {},  # lot -> instant de la demande
+            "requested": False,
+            "swarm": swarm,
+            "layouts": {},  # peer_id -> SegmentLayout annonce par ses segments
+            "partials": {},  # chunk -> {"buf", "mask", "k", "at"} (segments deja recus)
+            "parity": {},  # (k, m, groupe) -> {"data", "at"} en attente d'une seule unite manquante
+            "fec_recovered": 0,
+            "part": part,
+            "received": part.received,
+            "checkpointed": part.received.count,
+            "last_checkpoint": time.time(),
+            "finalizing": False,  # renommage du .part en cours : `done` apres son succes
+            "done": False,
+            "started_at": started_at or int(time.time()),
+        }
+
+    def _start_fetch(self, offer_id, dl):
+        """Demarre les chunks si les premiers hash sont connus, sinon va les chercher."""
+        if dl["received"].complete():
+            self._finalize_download(offer_id)  # fichier vide ou deja complet
+            return
+        with self._lock:
+            first = dl["received"].first_missing() // BATCH_SIZE
+            ready = first in dl["leaves"]
+            if ready:
+                dl["requested"] = True
+        # Lots de hash demandes d'abord : ils precedent ainsi les premiers chunks.
+        self._fetch_hashes(offer_id, dl)
+        if ready:
+            self._request_missing(offer_id, dl)
+
+    def _batch_complete(self, dl, batch):
+        start = batch * BATCH_SIZE
+        end = min(start + BATCH_SIZE, dl["manifest"]["total_chunks"])
+        return dl["received"].first_missing(start) >= end
+
+    def _fetch_hashes(self, offer_id, dl):
+        """Demande les lots de hash a venir (fenetre glissante, demandes en vol bornees)."""
+        now = time.time()
+        with self._lock:
+            pending = dl["pending_hashes"]
+            for batch, asked_at in list(pending.items()):
+                if now - asked_at > HASH_TIMEOUT:
+                    del pending[batch]
+            n_batches = batch_count(dl["manifest"]["total_chunks"])
+            first = dl["received"].first_missing() // BATCH_SIZE
+            wanted = []
+            for batch in range(first, min(n_batches, first + HASH_LOOKAHEAD)):
+                if len(pending) + len(wanted) >= MAX_PENDING_HASHES:
+                    break
+                if batch in dl["leaves"] or batch in pending or self._batch_complete(dl, batch):
+                    continue
+                wanted.append(batch)
+            source = self._hash_source(dl, now)
+            if source is None:
+                return
+            for batch in wanted:
+                pending[batch] = now
+        for batch in wanted:
+            self.secure.send_secure_object(
+                source, {"kind": "file_hashes_get", "offer_id": offer_id, "batch": batch}
+            )
+
+    def _alive_sources(self, dl, now):
+        """Sources joignables et non ecartees (appele sous verrou)."""
+        return [
+            peer_id
+            for peer_id, src in dl["swarm"].sources.items()
+            if src["dead_until"] <= now and self.secure.peer_table.get_peer(peer_id)
+        ]
+
+    def _hash_source(self, dl, now):
+        """Source la plus rapide pour les lots de hash (appele sous verrou)."""
+        alive = self._alive_sources(dl, now)
+        if not alive:
+            return None
+        sources = dl["swarm"].sources
+        return max(alive, key=lambda peer_id: sources[peer_id]["rate"])
+
+    def _on_file_hashes_get(self, peer_id, obj):
+        offer_id = obj.get("offer_id")
+        batch = obj.get("batch")
+        if not offer_id or not isinstance(batch, int):
+            return
+        self._with_local_offer(offer_id, lambda local: self._send_hashes(peer_id, offer_id, local, batch))
+
+    def _send_hashes(self, peer_id, offer_id, local, batch):
+        tree = local["tree"]
+        if batch < 0 or batch >= max(batch_count(tree.n_leaves), 1):
+            return
+        proof = tree.proof(batch_level(tree.n_leaves), batch)
         self.secure.send_secure_object(
-            owner,
+            peer_id,
             {
-                "kind": "file_get",
+                "kind": "file_hashes",
                 "offer_id": offer_id,
+                "batch": batch,
+                "hashes": b"".join(tree.batch_leaves(batch)).hex(),
+                "proof": [h.hex() for h in proof],
             },
         )
 
+    def _on_file_hashes(self, peer_id, obj):
+        offer_id = obj.get("offer_id")
+        with self._lock:
+            dl = self.downloads.get(offer_id)
+        if not dl or peer_id not in dl["swarm"].sources or dl["done"]:
+            return
+        try:
+            batch = int(obj["batch"])
+            raw = bytes.fromhex(obj["hashes"])
+            proof = [bytes.fromhex(h) for h in obj["proof"]]
+        except (KeyError, TypeError, ValueError):
+            return
+        leaves = [raw[i:i + 32] for i in range(0, len(raw), 32)]
+        total = dl["manifest"]["total_chunks"]
+        if not verify_batch(dl["root"], total, batch, leaves, proof):
+            print(f"\n[FILE] Lot de hash {batch} invalide pour {offer_id}, ignore.")
+            return
+        with self._lock:
+            dl["pending_hashes"].pop(batch, None)
+            dl["leaves"][batch] = leaves
+            start = not dl["requested"]
+        self._flush_partials(offer_id, dl, batch)
+        if start:
+            self._start_fetch(offer_id, dl)
+        else:
+            self._fetch_hashes(offer_id, dl)
+
+    def _request_missing(self, offer_id, dl, peer_id=None, extend=False):
+        """Envoie a chaque source (ou a `peer_id`) un file_get limite a sa part.
+
+        Avec `extend`, seul le complement nouvellement attribue est demande et
+        l'emetteur distant l'ajoute a son envoi en cours au lieu de repartir
+        de zero.
+        """
+        requests = []
+        now = time.time()
+        with self._lock:
+            swarm = dl["swarm"]
+            targets = [peer_id] if peer_id else self._alive_sources(dl, now)
+            for target in targets:
+                if not self.secure.is_recent_peer(target):
+                    # Pair ancien : chaque file_get lui fait renvoyer tout le
+                    # fichier. Redemande seulement s'il est muet depuis un
+                    # moment (envoi precedent termine, chunks perdus).
+                    src = swarm.sources.get(target)
+                    if not src:
+                        continue
+                    asked = src.get("legacy_get_at")
+                    if asked is not None and (
+                        now - asked < LEGACY_REGET_DELAY or now - src["last_chunk"] <= STALL_TIMEOUT
+                    ):
+                        continue
+                    src["legacy_get_at"] = now
+                new = swarm.top_up(target)
+                ranges = new if extend else swarm.remaining(target)
+                if ranges:
+                    requests.append((target, coalesce_ranges(ranges, MAX_GET_RANGES)))
+        for target, ranges in requests:
+            msg = {"kind": "file_get", "offer_id": offer_id, "ranges": ranges}
+            if extend:
+                msg["extend"] = True
+            if self.secure.max_datagram:
+                # Plus grand datagramme accepte : l'emetteur le croise avec sa
+                # propre sonde du chemin pour choisir le decoupage.
+                msg["max_datagram"] = self.secure.max_datagram
+                if self.fec_group:
+                    msg["fec"] = self.fec_group
+            codecs = supported_codecs(self.compression)
+            if codecs:
+                msg["compress"] = codecs
+            self.secure.send_secure_object(target, msg)
+
+    def resume_downloads(self):
+        """Recharge les telechargements interrompus (a appeler au demarrage du noeud)."""
+        resumed = 0
+        for offer_id, meta, bitmap in self.state.load_all():
+            with self._lock:
+                if offer_id in self.downloads:
+                    continue
+            manifest = meta["manifest"]
+            if self._finalized_on_disk(meta, bitmap):
+                self.state.remove(offer_id)  # arret entre renommage et nettoyage
+                continue
+            owners = meta.get("owners") or []
+            if not owners:
+                print(f"\n[FILE] Reprise impossible pour {offer_id}: aucune source connue")
+                continue
+            try:
+                part = PartFile(
+                    meta["final_path"],
+                    manifest["file_size"],
+                    manifest["chunk_size"],
+                    manifest["total_chunks"],
+                    bitmap=bitmap,
+                )
+            except OSError as e:
+                print(f"\n[FILE] Reprise impossible pour {offer_id}: {e}")
+                continue
+            # Les plages seront redemandees par tick() des que les sources
+            # (qui ont pu redemarrer aussi) repondent.
+            dl = self._new_download(manifest, owners, part, meta.get("started_at"))
+            with self._lock:
+                self.downloads[offer_id] = dl
+                now = int(time.time())
+                self.remote_offers.setdefault(
+                    offer_id,
+                    {
+                        "manifest": manifest,
+                        "owners": {peer_id: now for peer_id in owners},
+                        "owner": owners[-1],
+                        "seen_at": now,
+                    },
+                )
+            resumed += 1
+            print(
+                f"\n[FILE] Reprise {offer_id}: {part.received.count}/{manifest['total_chunks']} chunks deja recus"
+            )
+            if part.received.complete():
+                self._finalize_download(offer_id)
+        return resumed
+
+    @staticmethod
+    def _finalized_on_disk(meta, bitmap):
+        """Vrai si le .part complet a deja ete renomme mais l'etat pas encore supprime."""
+        final_path = meta["final_path"]
+        if bitmap is None or os.path.exists(final_path + PART_SUFFIX):
+            return False
+        if not os.path.exists(final_path):
+            return False
+        try:
+            return ChunkBitmap(meta["manifest"]["total_chunks"], bitmap).complete()
+        except ValueError:
+            return False
+
+    def _save_offers_index(self):
+        index = {oid: info["file_path"] for oid, info in self.local_offers.items()}
+        atomic_write(self._offers_index_path, json.dumps(index).encode("utf-8"))
+
+    def _restore_local_offer(self, offer_id):
+        """Recharge une offre locale d'une session precedente (reprise apres redemarrage)."""
+        try:
+            with open(self._offers_index_path, "r", encoding="utf-8") as f:
+                file_path = json.load(f).get(offer_id)
+        except (OSError, ValueError):
+            return None
+        if not file_path or not os.path.exists(file_path):
+            return None
+        manifest = self.manifests.build(file_path)
+        if manifest["offer_id"] != offer_id:
+            return None  # fichier modifie depuis l'offre
+        local = self._local_offer(manifest, file_path)
+        with self._lock:
+            self.local_offers.setdefault(offer_id, local)
+            return self.local_offers[offer_id]
+
+    def _output_path(self, file_name):
+        out_name = os.path.basename(file_name)
+        out_path = os.path.join(self.download_dir, out_name)
+        if os.path.exists(out_path) or os.path.exists(out_path + PART_SUFFIX):
+            stamp = int(time.time())
+            out_path = os.path.join(self.download_dir, f"{stamp}_{out_name}")
+        return out_path
+
     def _on_file_offer(self, peer_id, obj):
         manifest = obj.get("manifest", {})
         offer_id = manifest.get("offer_id")
@@ -87,49 +480,425 @@ class FileTransfer:
             "chunk_size",
             "total_chunks",
             "file_hash",
-            "chunk_hashes",
         ]
         for key in required:
             if key not in manifest:
                 return
-        if len(manifest["chunk_hashes"]) != manifest["total_chunks"]:
+        if "chunk_hashes" in manifest:
+            # Ancien format (liste complete) : on en deduit la racine.
+            if len(manifest["chunk_hashes"]) != manifest["total_chunks"]:
+                return
+            try:
+                leaves = [bytes.fromhex(h) for h in manifest["chunk_hashes"]]
+            except (TypeError, ValueError):
+                return
+            manifest["merkle_root"] = subtree_root(leaves).hex()
+        try:
+            if len(bytes.fromhex(manifest["merkle_root"])) != 32:
+                return
+        except (KeyError, TypeError, ValueError):
             return
 
+        now = int(time.time())
         with self._lock:
-            self.remote_offers[offer_id] = {
-                "manifest": manifest,
-                "owner": peer_id,
-                "seen_at": int(time.time()),
-            }
+            info = self.remote_offers.get(offer_id)
+            if info and info["manifest"]["merkle_root"] == manifest["merkle_root"]:
+                # Meme fichier chez un autre pair : source supplementaire.
+                info["owners"][peer_id] = now
+                info["owner"] = peer_id
+                info["seen_at"] = now
+            else:
+                self.remote_offers[offer_id] = {
+                    "manifest": manifest,
+                    "owners": {peer_id: now},
+                    "owner": peer_id,
+                    "seen_at": now,
+                }
+            dl = self.downloads.get(offer_id)
+            new_source = (
+                dl is not None
+                and not dl["done"]
+                and dl["root"].hex() == manifest["merkle_root"]
+                and peer_id not in dl["swarm"].sources
+            )
+            if new_source:
+                dl["swarm"].add_source(peer_id)
         print(
             f"\n[FILE] Offre recu {offer_id}: {manifest['file_name']} "
             f"({manifest['file_size']} octets) de {peer_id[:10]}..."
         )
+        if new_source:
+            print(f"\n[FILE] Nouvelle source pour {offer_id}: {peer_id[:10]}...")
+            self._save_meta(offer_id, dl)
+            if dl["requested"]:
+                self._request_missing(offer_id, dl, peer_id, extend=True)
 
     def _on_file_get(self, peer_id, obj):
         offer_id = obj.get("offer_id")
         if not offer_id:
             return
+        ranges = obj.get("ranges")
+        if ranges is not None:
+            try:
+                ranges = [(int(start), int(end)) for start, end in ranges]
+            except (TypeError, ValueError):
+                return
+        extend = bool(obj.get("extend")) and ranges is not None
+        try:
+            max_datagram = int(obj.get("max_datagram") or 0)
+            fec_group = int(obj.get("fec") or 0)
+        except (TypeError, ValueError):
+            return
+        if not MIN_FEC_GROUP <= fec_group <= MAX_FEC_GROUP:
+            fec_group = 0
+        codec = choose_codec(obj.get("compress"), self.compression)
+        if ranges is None:
+            # Pair ancien : ni plages ni ACK, tout le fichier en un seul envoi.
+            self._with_local_offer(offer_id, lambda local: self._start_legacy(peer_id, offer_id, local))
+            return
+        self._with_local_offer(
+            offer_id,
+            lambda local: self._start_upload(
+                peer_id, offer_id, local, ranges, extend, max_datagram, fec_group, codec
+            ),
+        )
+
+    def _with_local_offer(self, offer_id, callback):
         with self._lock:
             local = self.local_offers.get(offer_id)
-        if not local:
+        if local:
+            callback(local)
             return
 
+        # Hors du thread de reception : reconstruire le manifeste peut etre long.
+        # Une seule reconstruction par offre, sur un pool borne ; les demandes
+        # qui arrivent entre-temps attendent son resultat.
+        with self._lock:
+            pending = self._restoring.get(offer_id)
+            if pending is not None:
+                pending.append(callback)
+                return
+            self._restoring[offer_id] = [callback]
+
+        def restore():
+            local = None
+            try:
+                local = self._restore_local_offer(offer_id)
+            except Exception as e:
+                print(f"\n[FILE] Offre locale {offer_id} non restauree : {e}")
+            with self._lock:
+                callbacks = self._restoring.pop(offer_id, [])
+            if local:
+                for cb in callbacks:
+                    try:
+                        cb(local)
+                    except Exception as e:
+                        print(f"\n[FILE] Erreur envoi {offer_id}: {e}")
+
+        self._restorer.submit(restore)
+
+    def _start_legacy(self, peer_id, offer_id, local):
+        """Envoi historique : chaque chunk une fois, dans l'ordre, sans attendre d'ACK."""
+        manifest = local["manifest"]
+        total = manifest["total_chunks"]
+        chunk_size = manifest["chunk_size"]
+        tree = local["tree"]
+        file_path = local["file_path"]
+
+        def send_chunk(idx):
+            self.secure.send_secure_file_chunk(
+                peer_id=peer_id,
+                offer_id=offer_id,
+                index=idx,
+                total_chunks=total,
+                chunk_hash_hex=tree.leaf(idx).hex(),
+                chunk_bytes=self.chunk_sources.read(file_path, idx, chunk_size),
+            )
+
+        sender = LegacySender(peer_id, offer_id, total, send_chunk)
+        with self._lock:
+            previous = self.uploads.get((peer_id, offer_id))
+            self.uploads[(peer_id, offer_id)] = sender
+        if previous:
+            # Une demande repetee remplace l'envoi en cours au lieu de s'y ajouter.
+            previous.cancel()
+            self.scheduler.wake(previous)
+        self.scheduler.submit(sender, on_done=self._on_upload_done)
+
+    def _start_upload(
+        self,
+        peer_id,
+        offer_id,
+        local,
+        ranges=None,
+        extend=False,
+        max_datagram=0,
+        fec_group=0,
+        codec=None,
+    ):
         manifest = local["manifest"]
         file_path = local["file_path"]
+        tree = local["tree"]
         total = manifest["total_chunks"]
         chunk_size = manifest["chunk_size"]
-        for idx in range(total):
-            chunk = read_chunk_at(file_path, idx, chunk_size)
+        compressor = ChunkCompressor(codec) if codec else None
+
+        def read_chunk(idx):
+            return self.chunk_sources.read(file_path, idx, chunk_size)
+
+        def pack(data):
+            # Les hash (et la parite FEC) portent toujours sur les octets bruts.
+            return compressor.pack(data) if compressor else (CODEC_NONE, data)
+
+        def send_chunk(idx):
+            codec_id, data = pack(read_chunk(idx))
             self.secure.send_secure_file_chunk(
                 peer_id=peer_id,
                 offer_id=offer_id,
                 index=idx,
                 total_chunks=total,
-                chunk_hash_hex=manifest["chunk_hashes"][idx],
-                chunk_bytes=chunk,
+                chunk_hash_hex=tree.leaf(idx).hex(),
+                chunk_bytes=data,
+                codec=codec_id,
+            )
+
+        with self._lock:
+            previous = self.uploads.get((peer_id, offer_id))
+        if extend and previous:
+            # Le complement suit le decoupage de l'envoi en cours.
+            layout = previous.layout
+            if previous.extend(layout.unit_ranges(ranges) if layout else ranges):
+                self.scheduler.wake(previous)
+                return
+
+        layout = None
+        if max_datagram:
+            # Pair recent : unites d'envoi a la taille du chemin, sans fragmentation IP.
+            room = self.secure.segment_room(peer_id, max_datagram)
+            layout = SegmentLayout.for_payload(chunk_size, total, room)
+        if layout:
+            protected = set()  # groupes dont la parite est partie (premiere emission seulement)
+
+            def send_unit(unit):
+                codec_id, data = pack(layout.read_unit(unit, read_chunk))
+                self.secure.send_secure_file_segment(
+                    peer_id, offer_id, unit, layout.k, layout.m, data, codec_id
+                )
+                if not fec_group:
+                    return
+                group = unit // fec_group
+                units = group_units(group, fec_group, layout.total_units)
+                # Parite apres la derniere unite demandee du groupe.
+                if group in protected or (unit != units[-1] and not sender.acked.has(unit + 1)):
+                    return
+                protected.add(group)
+                parity = xor_blocks((layout.read_unit(u, read_chunk) for u in units), layout.unit_bytes)
+                self.secure.send_secure_file_parity(
+                    peer_id, offer_id, group, layout.k, layout.m, fec_group, parity
+                )
+
+            send, units, unit_bytes = send_unit, layout.total_units, layout.unit_bytes
+            if ranges is not None:
+                ranges = layout.unit_ranges(ranges)
+        else:
+            send, units, unit_bytes = send_chunk, total, chunk_size
+
+        # Une nouvelle demande du meme pair reprend l'etat de congestion acquis
+        # (si la taille des unites n'a pas change).
+        cc = getattr(previous, "cc", None)  # un envoi historique n'a pas de controleur
+        controller = cc if cc and cc.chunk_size == unit_bytes else None
+        sender = ChunkSender(
+            peer_id, offer_id, units, send, unit_bytes, controller=controller, ranges=ranges
+        )
+        sender.layout = layout
+        sender.compressor = compressor
+        with self._lock:
+            previous = self.uploads.get((peer_id, offer_id))
+            self.uploads[(peer_id, offer_id)] = sender
+        if previous:
+            previous.cancel()
+            self.scheduler.wake(previous)
+        self.scheduler.submit(sender, on_done=self._on_upload_done)
+
+    def _on_upload_done(self, sender, ok):
+        with self._lock:
+            if self.uploads.get((sender.peer_id, sender.offer_id)) is sender:
+                del self.uploads[(sender.peer_id, sender.offer_id)]
+        if ok:
+            detail = ""
+            if sender.compressor:
+                c = sender.compressor.stats()
+                detail = f" ({c['codec']} x{c['ratio']:.2f}, {c['cpu_time'] * 1000:.0f} ms CPU)"
+            print(f"\n[FILE] Envoi termine pour {sender.offer_id} vers {sender.peer_id[:10]}...{detail}")
+        elif not sender.cancelled:
+            print(f"\n[FILE] Envoi abandonne pour {sender.offer_id} vers {sender.peer_id[:10]}...")
+
+    def _on_file_ack(self, peer_id, obj):
+        offer_id = obj.get("offer_id")
+        with self._lock:
+            sender = self.uploads.get((peer_id, offer_id))
+        if not sender:
+            return
+        if obj.get("unit") != (sender.layout.key() if sender.layout else None):
+            return  # ACK d'un envoi precedent avec un autre decoupage
+        try:
+            base = int(obj.get("base", 0))
+            sack = [(int(s), int(e)) for s, e in obj.get("sack", [])]
+        except (TypeError, ValueError):
+            return
+        sender.on_ack(base, sack)
+        self.scheduler.wake(sender)
+
+    def _send_ack(self, offer_id, dl, peer_id):
+        """Acquitte une source et lui attribue un complement si sa part s'epuise."""
+        with self._lock:
+            swarm = dl["swarm"]
+            src = swarm.sources.get(peer_id)
+            if not src:
+                return
+            src["since_ack"] = 0
+            if not self.secure.is_recent_peer(peer_id):
+                return  # pair ancien : ni ACK ni complement, il envoie tout d'un bloc
+            layout = dl["layouts"].get(peer_id)
+            if layout:
+                partial = {
+                    chunk: entry["mask"]
+                    for chunk, entry in dl["partials"].items()
+                    if entry["k"] == layout.k
+                }
+                base, sack = layout.ack(swarm.remaining(peer_id), partial, MAX_SACK_BLOCKS)
+            else:
+                base, sack = swarm.ack_for(peer_id, MAX_SACK_BLOCKS)
+            low = (
+                dl["requested"]
+                and not dl["done"]
+                and count_chunks(src["ranges"]) < LOW_WATER_CHUNKS
+                and src["dead_until"] <= time.time()
             )
-        print(f"\n[FILE] Envoi termine pour {offer_id} vers {peer_id[:10]}...")
+        msg = {"kind": "file_ack", "offer_id": offer_id, "base": base, "sack": sack}
+        if layout:
+            msg["unit"] = layout.key()
+        self.secure.send_secure_object(peer_id, msg)
+        if low:
+            self._request_missing(offer_id, dl, peer_id, extend=True)
+
+    def list_downloads(self):
+        with self._lock:
+            return [
+                {
+                    "offer_id": oid,
+                    "file_name": dl["manifest"]["file_name"],
+                    "received": dl["received"].count,
+                    "total_chunks": dl["manifest"]["total_chunks"],
+                    "sources": dl["swarm"].stats(),
+                    "fec_recovered": dl["fec_recovered"],
+                    "finalizing": dl["finalizing"],
+                }
+                for oid, dl in self.downloads.items()
+                if not dl["done"]
+            ]
+
+    def cache_stats(self):
+        return self.block_cache.stats() if self.block_cache else None
+
+    def list_uploads(self):
+        with self._lock:
+            senders = list(self.uploads.values())
+        uploads = []
+        for sender in senders:
+            stats = sender.stats()
+            stats["compression"] = sender.compressor.stats() if sender.compressor else None
+            uploads.append(stats)
+        return uploads
+
+    def stop(self):
+        self.scheduler.stop()
+        self._restorer.shutdown(wait=False)
+        self.chunk_sources.close_all()
+        self.checkpoint(force=True)
+
+    def checkpoint(self, force=False):
+        """Sauvegarde le bitmap des telechargements qui ont progresse."""
+        now = time.time()
+        with self._lock:
+            active = [(oid, dl) for oid, dl in self.downloads.items() if not dl["done"]]
+        for offer_id, dl in active:
+            if not force and now - dl["last_checkpoint"] < CHECKPOINT_INTERVAL:
+                continue
+            with self._lock:
+                if dl["received"].count == dl["checkpointed"]:
+                    continue
+                count = dl["received"].count
+                snapshot = dl["received"].to_bytes()
+            try:
+                # fsync d'abord : le bitmap ne doit jamais annoncer un chunk
+                # qui ne serait pas encore sur disque.
+                dl["part"].sync()
+                self.state.save_bitmap(offer_id, snapshot)
+            except (OSError, ValueError) as e:
+                print(f"\n[FILE] Checkpoint impossible pour {offer_id}: {e}")
+                continue
+            dl["checkpointed"] = count
+            dl["last_checkpoint"] = now
+
+    def tick(self):
+        """Relance les sources bloquees, reequilibre l'essaim et checkpointe."""
+        now = time.time()
+        with self._lock:
+            active = [(oid, dl) for oid, dl in self.downloads.items() if not dl["done"]]
+        for offer_id, dl in active:
+            try:
+                self._tick_download(offer_id, dl, now)
+            except Exception as e:
+                print(f"\n[FILE] Relance impossible pour {offer_id}: {e}")
+        self.chunk_sources.close_idle(now)
+        self.checkpoint()
+
+    def _tick_download(self, offer_id, dl, now):
+        if dl["received"].complete():
+            self._finalize_download(offer_id)  # finalisation precedente en echec : on retente
+            return
+        if not dl["requested"]:
+            self._start_fetch(offer_id, dl)  # premier lot de hash pas encore recu
+            return
+        actions = []
+        with self._lock:
+            partials = dl["partials"]
+            for idx in [c for c, entry in partials.items() if now - entry["at"] > PARTIAL_TIMEOUT]:
+                del partials[idx]  # segments perdus : la source les renverra sur file_get
+            parity = dl["parity"]
+            for key in [g for g, entry in parity.items() if now - entry["at"] > PARTIAL_TIMEOUT]:
+                del parity[key]
+            swarm = dl["swarm"]
+            alive = self._alive_sources(dl, now)
+            for peer_id, src in swarm.sources.items():
+                if not swarm.remaining(peer_id):
+                    if peer_id in alive:
+                        actions.append(("top_up", peer_id))  # source inactive
+                    continue
+                if now - src["last_chunk"] <= STALL_TIMEOUT:
+                    continue
+                src["last_chunk"] = now
+                src["stalls"] += 1
+                if src["stalls"] >= SOURCE_DEAD_STALLS and any(p != peer_id for p in alive):
+                    swarm.release(peer_id)
+                    src["dead_until"] = now + SOURCE_RETRY_DELAY
+                    actions.append(("dead", peer_id))
+                elif peer_id not in alive:
+                    continue  # source pas (encore) rediscouverte
+                elif src["stalls"] % STALLS_BEFORE_GET:
+                    actions.append(("ack", peer_id))
+                else:
+                    actions.append(("get", peer_id))
+        for action, peer_id in actions:
+            if action == "dead":
+                print(f"\n[FILE] Source {peer_id[:10]}... muette sur {offer_id}, part redistribuee.")
+            elif action == "ack":
+                self._send_ack(offer_id, dl, peer_id)
+            elif action == "get":
+                self._request_missing(offer_id, dl, peer_id)
+            else:
+                self._request_missing(offer_id, dl, peer_id, extend=True)
 
     def _on_file_chunk(self, peer_id, obj):
         offer_id = obj.get("offer_id")
@@ -138,55 +907,310 @@ class FileTransfer:
 
         with self._lock:
             dl = self.downloads.get(offer_id)
-        if not dl:
-            return
-        if dl["owner"] != peer_id:
-            return
+            if not dl or peer_id not in dl["swarm"].sources:
+                return
 
         idx = obj.get("index")
-        expected_hash = obj.get("chunk_hash")
         chunk = obj.get("data")
-        if idx is None or chunk is None or expected_hash is None:
+        if idx is None or chunk is None:
             return
         if idx < 0 or idx >= dl["manifest"]["total_chunks"]:
             return
-        manifest_hash = dl["manifest"]["chunk_hashes"][idx]
-        if expected_hash != manifest_hash:
+        status = self._accept_chunk(offer_id, dl, idx, chunk)
+        # Hash inconnu ou chunk corrompu : pas d'ACK, le chunk sera retransmis.
+        if status in ("new", "duplicate"):
+            added = 1 if status == "new" else 0
+            self._on_unit(offer_id, dl, peer_id, idx, len(chunk), added > 0, added)
+
+    def _on_file_segment(self, peer_id, obj):
+        """Unite d'une offre segmentee : fragment de chunk ou groupe de chunks."""
+        offer_id = obj.get("offer_id")
+        with self._lock:
+            dl = self.downloads.get(offer_id)
+            if not dl or dl["done"] or dl["finalizing"] or peer_id not in dl["swarm"].sources:
+                return
+            layout = self._source_layout(dl, peer_id, obj["k"], obj["m"])
+        unit = obj["unit"]
+        if not layout or unit >= layout.total_units:
             return
-        got_hash = hashlib.sha256(chunk).hexdigest()
-        if got_hash != expected_hash:
-            print(f"\n[FILE] Chunk corrompu {idx} sur {offer_id}, ignore.")
+        self._on_segment_unit(offer_id, dl, peer_id, layout, unit, obj["data"])
+        if self.fec_group:
+            self._try_recover(offer_id, dl, peer_id, layout, unit // self.fec_group)
+
+    def _source_layout(self, dl, peer_id, k, m):
+        """Decoupage utilise par une source, d'apres ses trames (appele sous verrou)."""
+        layout = dl["layouts"].get(peer_id)
+        if layout and layout.key() == [k, m]:
+            return layout
+        manifest = dl["manifest"]
+        try:
+            layout = SegmentLayout(manifest["chunk_size"], manifest["total_chunks"], k, m)
+        except ValueError:
+            return None
+        dl["layouts"][peer_id] = layout
+        return layout
+
+    def _on_segment_unit(self, offer_id, dl, peer_id, layout, unit, data):
+        if layout.k > 1:
+            status, chunk = self._add_segment(dl, layout, unit, data)
+            if status is None:
+                return
+            added = 0
+            if chunk:
+                accepted = self._accept_chunk(offer_id, dl, *chunk)
+                if accepted == "unverified":
+                    self._hold_chunk(dl, layout, *chunk)  # segments deja acquittes
+                added = 1 if accepted == "new" else 0
+            self._on_unit(offer_id, dl, peer_id, unit, len(data), status == "stored", added)
             return
 
+        first, end = layout.chunks_of(unit)
+        if len(data) != self._unit_length(dl, layout, unit):
+            return
+        statuses = []
+        for idx in range(first, end):
+            offset = (idx - first) * layout.chunk_size
+            statuses.append(self._accept_chunk(offer_id, dl, idx, data[offset:offset + layout.chunk_size]))
+        added = statuses.count("new")
+        if added or "duplicate" in statuses:
+            # Un chunk rejete garde l'unite non acquittee : elle sera retransmise.
+            self._on_unit(offer_id, dl, peer_id, unit, len(data), added > 0, added)
+
+    def _on_file_parity(self, peer_id, obj):
+        offer_id = obj.get("offer_id")
+        if obj["n"] != self.fec_group:
+            return  # parite non demandee (ou d'une configuration precedente)
         with self._lock:
-            chunks = dl["chunks"]
-            if idx in chunks:
+            dl = self.downloads.get(offer_id)
+            if not dl or dl["done"] or dl["finalizing"] or peer_id not in dl["swarm"].sources:
+                return
+            layout = self._source_layout(dl, peer_id, obj["k"], obj["m"])
+            if not layout or obj["group"] * self.fec_group >= layout.total_units:
                 return
-            chunks[idx] = chunk
-            have = len(chunks)
-            total = dl["manifest"]["total_chunks"]
+            parity = dl["parity"]
+            if len(parity) >= MAX_PARITY_GROUPS:
+                del parity[min(parity, key=lambda key: parity[key]["at"])]
+            parity[(layout.k, layout.m, obj["group"])] = {"data": obj["data"], "at": time.time()}
+        self._try_recover(offer_id, dl, peer_id, layout, obj["group"])
 
-        if have % 25 == 0 or have == total:
-            print(f"\n[FILE] Progression {offer_id}: {have}/{total} chunks")
+    def _try_recover(self, offer_id, dl, peer_id, layout, group):
+        """Reconstruit l'unique unite manquante d'un groupe dont la parite est connue."""
+        key = (layout.k, layout.m, group)
+        units = group_units(group, self.fec_group, layout.total_units)
+        with self._lock:
+            entry = dl["parity"].get(key)
+            if not entry:
+                return
+            missing = [unit for unit in units if not self._has_unit(dl, layout, unit)]
+            if len(missing) > 1:
+                return  # on attend une retransmission
+            del dl["parity"][key]
+        if not missing:
+            return
+        lost = missing[0]
+        try:
+            others = [self._read_unit(dl, layout, unit) for unit in units if unit != lost]
+        except (OSError, ValueError):
+            return
+        data = xor_blocks([entry["data"]] + others, len(entry["data"]))
+        data = data[:self._unit_length(dl, layout, lost)]
+        with self._lock:
+            dl["fec_recovered"] += 1
+        # Le chunk reconstruit passe par la verification de hash habituelle.
+        self._on_segment_unit(offer_id, dl, peer_id, layout, lost, data)
+
+    def _has_unit(self, dl, layout, unit):
+        """Appele sous verrou."""
+        first, end = layout.chunks_of(unit)
+        if layout.k == 1:
+            return dl["received"].first_missing(first) >= end
+        if dl["received"].has(first):
+            return True
+        entry = dl["partials"].get(first)
+        return bool(entry and entry["k"] == layout.k and entry["mask"] >> (unit % layout.k) & 1)
+
+    def _read_unit(self, dl, layout, unit):
+        """Relit une unite deja recue (tampon de segments ou fichier partiel)."""
+        if layout.k > 1:
+            idx = unit // layout.k
+            offset = (unit % layout.k) * layout.seg_size
+            with self._lock:
+                entry = dl["partials"].get(idx)
+                if entry and not dl["received"].has(idx):
+                    return bytes(entry["buf"][offset:offset + layout.seg_size])
+        return layout.read_unit(unit, dl["part"].read_chunk)
+
+    def _unit_length(self, dl, layout, unit):
+        first, end = layout.chunks_of(unit)
+        if layout.k == 1:
+            return sum(self._chunk_length(dl, idx) for idx in range(first, end))
+        offset = (unit % layout.k) * layout.seg_size
+        return max(0, min(layout.seg_size, self._chunk_length(dl, first) - offset))
+
+    def _chunk_length(self, dl, idx):
+        manifest = dl["manifest"]
+        return min(manifest["chunk_size"], manifest["file_size"] - idx * manifest["chunk_size"])
+
+    def _add_segment(self, dl, layout, unit, data):
+        """Range un segment dans le tampon de son chunk.
+
+        Retourne (statut, chunk) : statut vaut None (segment invalide),
+        "duplicate", "stored" ; chunk vaut (index, octets) quand le dernier
+        segment manquant vient d'arriver.
+        """
+        idx, seg = divmod(unit, layout.k)
+        length = self._chunk_length(dl, idx)
+        offset = seg * layout.seg_size
+        if len(data) != self._unit_length(dl, layout, unit):
+            return None, None
+        now = time.time()
+        with self._lock:
+            if dl["received"].has(idx):
+                return "duplicate", None
+            partials = dl["partials"]
+            entry = partials.get(idx)
+            if entry is None or entry["k"] != layout.k:
+                if len(partials) >= MAX_PARTIAL_CHUNKS:
+                    oldest = min(partials, key=lambda c: partials[c]["at"])
+                    del partials[oldest]
+                entry = {"buf": bytearray(length), "mask": 0, "k": layout.k, "at": now}
+                partials[idx] = entry
+            bit = 1 << seg
+            if entry["mask"] & bit:
+                return "duplicate", None
+            entry["buf"][offset:offset + len(data)] = data
+            entry["mask"] |= bit
+            entry["at"] = now
+            if entry["mask"] != (1 << layout.k) - 1:
+                return "stored", None
+            del partials[idx]
+        return "stored", (idx, bytes(entry["buf"]))
+
+    def _hold_chunk(self, dl, layout, idx, chunk):
+        """Garde un chunk complet dont le lot de hash n'est pas encore verifie."""
+        with self._lock:
+            dl["partials"][idx] = {
+                "buf": chunk,
+                "mask": (1 << layout.k) - 1,
+                "k": layout.k,
+                "at": time.time(),
+            }
+
+    def _flush_partials(self, offer_id, dl, batch):
+        """Ecrit les chunks en attente du lot de hash `batch` qui vient d'arriver."""
+        start, end = batch * BATCH_SIZE, (batch + 1) * BATCH_SIZE
+        with self._lock:
+            held = [
+                (idx, entry)
+                for idx, entry in dl["partials"].items()
+                if start <= idx < end and entry["mask"] == (1 << entry["k"]) - 1
+            ]
+            for idx, _ in held:
+                del dl["partials"][idx]
+        for idx, entry in held:
+            if self._accept_chunk(offer_id, dl, idx, bytes(entry["buf"])) == "new":
+                self._after_chunks(offer_id, dl, 1)
+
+    def _accept_chunk(self, offer_id, dl, idx, chunk):
+        """Verifie un chunk contre son hash et l'ecrit.
+
+        Retourne "new", "duplicate", "unverified" (lot de hash pas encore
+        recu) ou None (chunk corrompu ou ecriture impossible).
+        """
+        batch = idx // BATCH_SIZE
+        received = dl["received"]
+        with self._lock:
+            # Un doublon n'est pas reverifie : son lot de hash a pu etre libere.
+            if received.has(idx):
+                return "duplicate"
+            leaves = dl["leaves"].get(batch)
+        if leaves is None:
+            self._fetch_hashes(offer_id, dl)
+            return "unverified"
+        if hashlib.sha256(chunk).digest() != leaves[idx % BATCH_SIZE]:
+            print(f"\n[FILE] Chunk corrompu {idx} sur {offer_id}, ignore.")
+            return None
+
+        try:
+            dl["part"].write_chunk(idx, chunk)
+        except (OSError, ValueError) as e:
+            print(f"\n[FILE] Ecriture impossible chunk {idx} sur {offer_id}: {e}")
+            return None
+
+        with self._lock:
+            if not received.set(idx):
+                return "duplicate"
+            batch_done = self._batch_complete(dl, batch)
+            if batch_done:
+                dl["leaves"].pop(batch, None)  # memoire bornee : lot termine
+            more = not received.complete()
+        if batch_done and more:
+            self._fetch_hashes(offer_id, dl)
+        return "new"
 
+    def _on_unit(self, offer_id, dl, peer_id, position, size, fresh, added):
+        """Suite commune a toute unite recue d'une source : debit, ACK, progression.
+
+        `fresh` : l'unite apportait des donnees nouvelles ; `added` : nombre de
+        chunks qu'elle a completes.
+        """
+        with self._lock:
+            swarm = dl["swarm"]
+            src = swarm.sources[peer_id]
+            in_order = swarm.on_chunk(peer_id, position, size, time.time())
+            if fresh:
+                src["since_ack"] += 1
+            complete = added and dl["received"].complete()
+            need_ack = not fresh or not in_order or src["since_ack"] >= ACK_EVERY
+            # Fichier complet : toutes les sources sont acquittees pour clore leur envoi.
+            ack_to = list(swarm.sources) if complete else []
+
+        if need_ack and peer_id not in ack_to:
+            self._send_ack(offer_id, dl, peer_id)
+        for source in ack_to:
+            self._send_ack(offer_id, dl, source)
+        if added:
+            self._after_chunks(offer_id, dl, added)
+
+    def _after_chunks(self, offer_id, dl, added):
+        with self._lock:
+            have = dl["received"].count
+        total = dl["manifest"]["total_chunks"]
+        if have % 25 < added or have == total:
+            print(f"\n[FILE] Progression {offer_id}: {have}/{total} chunks")
         if have == total:
             self._finalize_download(offer_id)
 
     def _finalize_download(self, offer_id):
+        """Renomme le .part complet vers sa cible ; `done` n'est pose qu'ensuite.
+
+        En cas d'echec, le telechargement reste actif et tick() (ou la
+        reprise au demarrage) retente la finalisation.
+        """
         with self._lock:
             dl = self.downloads.get(offer_id)
-            if not dl:
+            if not dl or dl["done"] or dl["finalizing"]:
                 return
-            manifest = dl["manifest"]
-            chunks = dict(dl["chunks"])
+            dl["finalizing"] = True
+            snapshot = dl["received"].to_bytes()
 
-        out_name = manifest["file_name"]
-        out_path = os.path.join(self.download_dir, out_name)
-        if os.path.exists(out_path):
-            stamp = int(time.time())
-            out_path = os.path.join(self.download_dir, f"{stamp}_{out_name}")
+        # Chaque chunk a ete verifie contre le manifeste (lui-meme controle
+        # par sa racine) : pas de second passage de hash sur le fichier.
         try:
-            assemble_file(manifest, chunks, out_path)
-            print(f"\n[FILE] Telechargement complete: {out_path}")
+            # Bitmap complet sur disque avant le renommage : apres un arret entre
+            # les deux, la reprise reconnait le fichier final (_finalized_on_disk).
+            dl["part"].sync()
+            self.state.save_bitmap(offer_id, snapshot)
+            out_path = dl["part"].finalize()
+            self.state.remove(offer_id)
         except Exception as e:
-            print(f"\n[FILE] Echec assemblage {offer_id}: {e}")
+            with self._lock:
+                dl["finalizing"] = False
+            print(f"\n[FILE] Echec finalisation {offer_id}: {e}")
+            return
+        with self._lock:
+            dl["done"] = True
+            dl["finalizing"] = False
+            dl["partials"].clear()
+            dl["parity"].clear()
+        print(f"\n[FILE] Telechargement complete: {out_path}")
@@ -0,0 +1,182 @@
+import struct
+import time
+
+from src.file.bitmap import ChunkBitmap
+
+
+FRAGMENT_MAGIC = b"FRG1"
+FRAGMENT_HEADER = "!4sIIIII"  # magic, msg_id, index, count, total_len, offset
+FRAGMENT_HEADER_SIZE = struct.calcsize(FRAGMENT_HEADER)
+FRAG_ACK_MAGIC = b"FRA1"
+FRAG_ACK_HEADER = "!4sIIH"  # magic, msg_id, base, nb de blocs SACK
+FRAG_ACK_HEADER_SIZE = struct.calcsize(FRAG_ACK_HEADER)
+FRAG_ACK_BLOCK = "!II"
+FRAG_ACK_BLOCK_SIZE = struct.calcsize(FRAG_ACK_BLOCK)
+MAX_ACK_BLOCKS = 32
+
+DEFAULT_FRAGMENT_SIZE = 16 * 1024
+MIN_FRAGMENT_SIZE = 512  # plancher de l'emetteur : borne le nombre de fragments d'un message
+MAX_OBJECT_SIZE = 64 * 1024 * 1024  # taille max d'un objet reassemble
+MAX_REASSEMBLY_BYTES = 128 * 1024 * 1024  # memoire totale des reassemblages en cours
+REASSEMBLY_TIMEOUT = 30.0  # abandon d'un message sans nouveau fragment (secondes)
+COMPLETED_TTL = 60.0  # duree pendant laquelle un message termine reste acquittable
+ACK_EVERY = 2
+
+
+def split_fragments(msg_id, plaintext, fragment_size):
+    total = len(plaintext)
+    count = max(1, (total + fragment_size - 1) // fragment_size)
+    view = memoryview(plaintext)
+    frags = []
+    for index in range(count):
+        offset = index * fragment_size
+        header = struct.pack(
+            FRAGMENT_HEADER, FRAGMENT_MAGIC, msg_id, index, count, total, offset
+        )
+        frags.append(header + view[offset:offset + fragment_size])
+    return frags
+
+
+def fragment_size_of(index, count, total, offset, length):
+    """Taille de fragment de l'emetteur deduite d'un fragment, ou None s'il est incoherent.
+
+    count, offset et longueur sont fixes par le pair : ils doivent decrire
+    exactement le decoupage de split_fragments, sans quoi un seul fragment
+    ferait allouer une bitmap de `count` bits hors de tout budget.
+    """
+    if index >= count:
+        return None
+    if count == 1:
+        return total if offset == 0 and length == total else None
+    if index == 0:
+        size = length
+    elif offset % index:
+        return None
+    else:
+        size = offset // index
+    if size < MIN_FRAGMENT_SIZE or total > MAX_OBJECT_SIZE:
+        return None
+    if (total + size - 1) // size != count or offset != index * size:
+        return None
+    if length != min(size, total - offset):
+        return None
+    return size
+
+
+def parse_fragment(plaintext):
+    if len(plaintext) < FRAGMENT_HEADER_SIZE or plaintext[:4] != FRAGMENT_MAGIC:
+        return None
+    _, msg_id, index, count, total, offset = struct.unpack_from(FRAGMENT_HEADER, plaintext)
+    data = plaintext[FRAGMENT_HEADER_SIZE:]
+    if fragment_size_of(index, count, total, offset, len(data)) is None:
+        return None
+    return msg_id, index, count, total, offset, data
+
+
+def pack_frag_ack(msg_id, base, sack):
+    sack = sack[:MAX_ACK_BLOCKS]
+    parts = [struct.pack(FRAG_ACK_HEADER, FRAG_ACK_MAGIC, msg_id, base, len(sack))]
+    for start, end in sack:
+        parts.append(struct.pack(FRAG_ACK_BLOCK, start, end))
+    return b"".join(parts)
+
+
+def parse_frag_ack(plaintext):
+    if len(plaintext) < FRAG_ACK_HEADER_SIZE or plaintext[:4] != FRAG_ACK_MAGIC:
+        return None
+    _, msg_id, base, n_blocks = struct.unpack_from(FRAG_ACK_HEADER, plaintext)
+    if len(plaintext) != FRAG_ACK_HEADER_SIZE + n_blocks * FRAG_ACK_BLOCK_SIZE:
+        return None
+    sack = []
+    for i in range(n_blocks):
+        pos = FRAG_ACK_HEADER_SIZE + i * FRAG_ACK_BLOCK_SIZE
+        sack.append(struct.unpack_from(FRAG_ACK_BLOCK, plaintext, pos))
+    return msg_id, base, sack
+
+
+class Reassembler:
+    """Reassemblage des messages fragmentes, a memoire et duree bornees.
+
+    Non thread-safe : l'appelant protege les acces par son propre verrou.
+    """
+
+    def __init__(self, max_bytes=MAX_REASSEMBLY_BYTES, timeout=REASSEMBLY_TIMEOUT):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._partial = {}  # (peer_id, msg_id) -> etat
+        self._completed = {}  # (peer_id, msg_id) -> (instant, nb de fragments)
+        self._bytes = 0
+        self.dropped = 0
+
+    def _purge(self, now):
+        for key, st in list(self._partial.items()):
+            if now - st["updated"] > self.timeout:
+                self._bytes -= st["cost"]
+                del self._partial[key]
+                self.dropped += 1
+        for key, (done_at, _) in list(self._completed.items()):
+            if now - done_at > COMPLETED_TTL:
+                del self._completed[key]
+
+    def add(self, peer_id, msg_id, index, count, total, offset, data):
+        """Ajoute un fragment.
+
+        Retourne (message complet ou None, ack a envoyer ou None), l'ack etant
+        un tuple (base, sack).
+        """
+        now = time.time()
+        key = (peer_id, msg_id)
+        if key in self._completed:
+            _, n = self._completed[key]
+            return None, (n, [])  # doublon d'un message deja livre
+
+        size = fragment_size_of(index, count, total, offset, len(data))
+        if size is None:
+            self.dropped += 1
+            return None, None
+        st = self._partial.get(key)
+        if st is None:
+            self._purge(now)
+            cost = total + (count + 7) // 8  # tampon et bitmap
+            if total > MAX_OBJECT_SIZE or self._bytes + cost > self.max_bytes:
+                self.dropped += 1
+                return None, None
+            st = {
+                "buf": bytearray(total),
+                "bitmap": ChunkBitmap(count),
+                "total": total,
+                "size": size,
+                "cost": cost,
+                "since_ack": 0,
+                "updated": now,
+            }
+            self._partial[key] = st
+            self._bytes += cost
+        elif st["bitmap"].total != count or st["total"] != total or st["size"] != size:
+            return None, None
+
+        bitmap = st["bitmap"]
+        st["updated"] = now
+        in_order = index == bitmap.first_missing()
+        if not bitmap.set(index):
+            return None, self._ack(st)
+        st["buf"][offset:offset + len(data)] = data
+        st["since_ack"] += 1
+
+        if bitmap.complete():
+            del self._partial[key]
+            self._bytes -= st["cost"]
+            self._completed[key] = (now, count)
+            return bytes(st["buf"]), (count, [])
+        if not in_order or st["since_ack"] >= ACK_EVERY:
+            return None, self._ack(st)
+        return None, None
+
+    def _ack(self, st):
+        st["since_ack"] = 0
+        bitmap = st["bitmap"]
+        base = bitmap.first_missing()
+        return base, bitmap.received_ranges(base, limit=MAX_ACK_BLOCKS)
+
+    def stats(self):
+        return {"partial": len(self._partial), "bytes": self._bytes, "dropped": self.dropped}
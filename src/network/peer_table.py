@@ -4,14 +4,35 @@ import time
 
 class PeerTable:
     def __init__(self):
-        self.peers = {}  # {node_id: {"ip": str, "port": int, "last_seen": float}}
+        self.peers = {}  # {node_id: {"ip": str, "port": int, "last_seen": float, "verified": bool}}
         self._lock = threading.Lock()
+        # Incremente a chaque ajout, depart ou changement d'adresse ; une adresse
+        # verifiee ne change que sur paquet authentifie ou apres expiration.
+        self.version = 0
 
-    def update(self, node_id, ip, port=6001):
+    def update(self, node_id, ip, port=6001, verified=False):
+        """Enregistre ou rafraichit un pair.
+
+        verified=True : adresse d'un paquet authentifie (canal securise). Un
+        HELLO, lui, n'est pas authentifie : il ne deplace pas un pair dont
+        l'adresse est verifiee, ni ne le rafraichit depuis une autre adresse ;
+        l'entree expire alors normalement et redevient modifiable.
+        """
         with self._lock:
-            if node_id not in self.peers:
+            known = self.peers.get(node_id)
+            moved = not known or known["ip"] != ip or known["port"] != port
+            if known and moved and known.get("verified") and not verified:
+                return
+            if not known:
                 print(f"\n[+] Nouveau voisin : {node_id[:10]}... @ {ip}:{port}")
-            self.peers[node_id] = {"ip": ip, "port": port, "last_seen": time.time()}
+            if moved:
+                self.version += 1
+            self.peers[node_id] = {
+                "ip": ip,
+                "port": port,
+                "last_seen": time.time(),
+                "verified": verified or bool(known and not moved and known.get("verified")),
+            }
 
     def clean(self):
         now = time.time()
@@ -24,6 +45,8 @@ class PeerTable:
             for nid in expired:
                 print(f"\n[-] Pair perdu : {nid[:10]}...")
                 del self.peers[nid]
+            if expired:
+                self.version += 1
 
     def display(self):
         with self._lock:
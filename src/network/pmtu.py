@@ -0,0 +1,99 @@
+import os
+import socket
+import struct
+import sys
+import time
+
+from src.protocol.packet import HEADER_SIZE, TYPE_MTU_ACK, TYPE_MTU_PROBE, pack_packet, unpack_packet
+
+
+UDP_IPV4_OVERHEAD = 28  # en-tetes IPv4 (20) et UDP (8)
+DEFAULT_DATAGRAM = 1472  # charge utile UDP sous une MTU Ethernet de 1500 octets
+MAX_DATAGRAM = 65507  # charge utile UDP maximale en IPv4
+# Paliers sondes, du plus grand au plus petit : boucle locale, jumbo frames
+# (MTU 9000), Ethernet, puis le minimum garanti par IPv6 (1280).
+PROBE_SIZES = (MAX_DATAGRAM, 8972, DEFAULT_DATAGRAM, 1252)
+PROBE_ATTEMPTS = 2
+PROBE_TIMEOUT = 0.25
+PROBE_HEADER = "!8sI"  # nonce, taille sondee
+PROBE_HEADER_SIZE = struct.calcsize(PROBE_HEADER)
+# Constantes Linux (<linux/in.h>) absentes de certains builds de Python.
+IP_MTU_DISCOVER = getattr(socket, "IP_MTU_DISCOVER", 10 if sys.platform.startswith("linux") else None)
+IP_PMTUDISC_PROBE = getattr(socket, "IP_PMTUDISC_PROBE", 3)
+IP_MTU = getattr(socket, "IP_MTU", 14 if sys.platform.startswith("linux") else None)
+
+
+def probe_supported():
+    return IP_MTU_DISCOVER is not None
+
+
+def probe_reply(payload):
+    """Reponse a une sonde : on ne renvoie que son en-tete (pas d'amplification)."""
+    if len(payload) < PROBE_HEADER_SIZE:
+        return None
+    return pack_packet(TYPE_MTU_ACK, payload[:PROBE_HEADER_SIZE])
+
+
+def _route_mtu(sock):
+    """MTU connue du noyau pour la route du socket connecte (None si indisponible)."""
+    if IP_MTU is None:
+        return None
+    try:
+        return sock.getsockopt(socket.IPPROTO_IP, IP_MTU)
+    except OSError:
+        return None
+
+
+def _wait_ack(sock, nonce):
+    deadline = time.time() + PROBE_TIMEOUT
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        sock.settimeout(remaining)
+        try:
+            data = sock.recv(2048)
+        except socket.timeout:
+            return False
+        packet = unpack_packet(data)
+        if packet and packet["type"] == TYPE_MTU_ACK and packet["payload"][:8] == nonce:
+            return True
+
+
+def probe_path(addr, sizes=PROBE_SIZES):
+    """Plus grande charge utile UDP qui atteint `addr` sans fragmentation IP.
+
+    Les sondes partent d'un socket dedie avec le bit DF force : un datagramme
+    plus grand que la MTU locale echoue des l'envoi (EMSGSIZE) et la MTU de la
+    route devient le palier suivant ; un goulot plus loin sur le chemin se
+    traduit par une sonde sans reponse. Retourne None si le systeme ne permet
+    pas de forcer DF ou si aucune sonde n'aboutit.
+    """
+    if not probe_supported():
+        return None
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_PROBE)
+        sock.connect(addr)
+        sizes = sorted(set(sizes), reverse=True)
+        while sizes:
+            size = sizes.pop(0)
+            nonce = os.urandom(8)
+            payload = struct.pack(PROBE_HEADER, nonce, size).ljust(size - HEADER_SIZE, b"\0")
+            packet = pack_packet(TYPE_MTU_PROBE, payload)
+            for _ in range(PROBE_ATTEMPTS):
+                try:
+                    sock.send(packet)
+                except OSError:
+                    # Plus grand que la MTU de l'interface : on essaie celle-ci.
+                    mtu = _route_mtu(sock)
+                    if mtu and HEADER_SIZE + PROBE_HEADER_SIZE < mtu - UDP_IPV4_OVERHEAD < size:
+                        sizes = sorted(set(sizes) | {mtu - UDP_IPV4_OVERHEAD}, reverse=True)
+                    break
+                if _wait_ack(sock, nonce):
+                    return size
+        return None
+    except OSError:
+        return None
+    finally:
+        sock.close()
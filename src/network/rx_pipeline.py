@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+
+
+DEFAULT_RX_WORKERS = min(4, os.cpu_count() or 1)
+RX_QUEUE_SIZE = 4096
+
+
+class ReceivePipeline:
+    """Pipeline de reception : lecteur -> workers -> distributeur ordonne.
+
+    Le lecteur numerote chaque datagramme et le pousse dans la file des
+    workers. Les workers dechiffrent/verifient en parallele (AES-GCM de
+    pycryptodome, HMAC et SHA-256 de hashlib relachent le GIL) et rendent
+    soit un objet de controle a distribuer, soit None (chunk deja traite,
+    paquet invalide). Le distributeur libere les objets de controle dans
+    l'ordre d'arrivee, ce qui preserve l'ordre par pair.
+    """
+
+    def __init__(self, process, dispatch, workers=DEFAULT_RX_WORKERS):
+        self.workers = max(1, int(workers))
+        self._process = process  # callable(payload, addr) -> (peer_id, obj) | None
+        self._dispatch = dispatch  # callable(peer_id, obj)
+        self._inbox = queue.Queue(maxsize=RX_QUEUE_SIZE)
+        self._cond = threading.Condition()
+        self._done = {}  # seq -> resultat
+        self._next_seq = 0
+        self._next_release = 0
+        self.dropped = 0  # datagrammes ecartes, file pleine
+        self.running = True
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"rx-{i}", daemon=True)
+            self._threads.append(t)
+            t.start()
+        t = threading.Thread(target=self._dispatcher, name="rx-dispatch", daemon=True)
+        self._threads.append(t)
+        t.start()
+
+    def stop(self):
+        self.running = False
+        for _ in range(self.workers):
+            try:
+                self._inbox.put_nowait(None)
+            except queue.Full:
+                pass
+        with self._cond:
+            self._cond.notify_all()
+
+    def submit(self, payload, addr, release=None):
+        """Appele par le lecteur uniquement (thread de listen ou boucle asyncio).
+
+        Ne bloque jamais : file pleine, le datagramme est ecarte (compte dans
+        `dropped`) comme le noyau le ferait, et submit retourne False ; le
+        tampon reste alors a l'appelant. Sinon `release()`, s'il est fourni,
+        est appele des que `payload` (une vue sur un tampon de reception)
+        n'est plus lu.
+        """
+        seq = self._next_seq
+        try:
+            self._inbox.put_nowait((seq, payload, addr, release))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self._next_seq += 1  # numero consomme seulement si le datagramme entre
+        return True
+
+    def _worker(self):
+        while self.running:
+            item = self._inbox.get()
+            if item is None:
+                return
+            seq, payload, addr, release = item
+            try:
+                result = self._process(payload, addr)
+            except Exception as e:
+                print(f"Erreur secure worker: {e}")
+                result = None
+            finally:
+                if release:
+                    release()
+            with self._cond:
+                self._done[seq] = result
+                if seq == self._next_release:
+                    self._cond.notify()
+
+    def _dispatcher(self):
+        while self.running:
+            with self._cond:
+                while self.running and self._next_release not in self._done:
+                    self._cond.wait(timeout=0.5)
+                if not self.running:
+                    return
+                ready = []
+                while self._next_release in self._done:
+                    ready.append(self._done.pop(self._next_release))
+                    self._next_release += 1
+            for result in ready:
+                if result is not None:
+                    self._dispatch(*result)
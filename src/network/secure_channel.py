@@ -1,33 +1,98 @@
+import itertools
 import json
+import os
 import socket
 import struct
 import threading
 import time
 
+from src.network.buffer_pool import BufferPool
+from src.network.chunk_sender import ChunkSender
+from src.network.compression import CODEC_NONE, decompress
+from src.network.fragmentation import (
+    DEFAULT_FRAGMENT_SIZE,
+    FRAGMENT_HEADER_SIZE,
+    MAX_OBJECT_SIZE,
+    MIN_FRAGMENT_SIZE,
+    Reassembler,
+    pack_frag_ack,
+    parse_frag_ack,
+    parse_fragment,
+    split_fragments,
+)
+from src.network.pmtu import DEFAULT_DATAGRAM, MAX_DATAGRAM, PROBE_SIZES, probe_path, probe_reply
+from src.network.rx_pipeline import DEFAULT_RX_WORKERS, ReceivePipeline
+from src.network.upload_scheduler import UploadScheduler
+from src.protocol.codec import CODEC_VERSION, decode, decode_object, encode, encode_object
 from src.protocol.packet import (
+    HEADER_FORMAT,
+    HEADER_SIZE,
+    MAGIC,
+    VERSION,
+    TYPE_HANDSHAKE_COOKIE,
     TYPE_HANDSHAKE_INIT,
     TYPE_HANDSHAKE_RESP,
+    TYPE_MTU_PROBE,
     TYPE_SECURE_MSG,
     pack_packet,
     unpack_packet,
 )
+from src.security.handshake_guard import ADMIT, SEND_COOKIE, HandshakeGuard
 from src.security.session import (
-    decrypt_payload,
+    DEFAULT_SUITES,
+    NONCE_SIZE,
+    REKEY_AFTER_MESSAGES,
+    SUITE_LEGACY,
+    TAG_SIZE,
+    derive_early_keys,
     derive_session_keys,
-    encrypt_payload,
     generate_ephemeral_keypair,
+    negotiate_suite,
+    open_sealed,
+    seal,
+    ticket_id,
 )
 
 
 SECURE_PORT = 6001
-SECURE_HEADER_SIZE = 64 + 12 + 16 + 32
+SECURE_HEADER_SIZE = 64 + 12 + 16 + 32  # suite historique, la plus lourde : sert de borne
+MIN_SECURE_PAYLOAD = 64 + NONCE_SIZE + TAG_SIZE
 FILE_CHUNK_MAGIC = b"FCH1"
 FILE_CHUNK_HEADER = "!4s16sII32sH"
 FILE_CHUNK_HEADER_SIZE = struct.calcsize(FILE_CHUNK_HEADER)
+FILE_CHUNK_Z_MAGIC = b"FCZ1"  # chunk compresse : meme en-tete suivi de l'octet de codec
+FILE_CHUNK_Z_HEADER = FILE_CHUNK_HEADER + "B"
+FILE_CHUNK_Z_HEADER_SIZE = struct.calcsize(FILE_CHUNK_Z_HEADER)
+FILE_SEGMENT_MAGIC = b"FSG1"
+FILE_SEGMENT_HEADER = "!4s16sIHH"  # magic, offer_id, unite, segments par chunk, chunks par unite
+FILE_SEGMENT_HEADER_SIZE = struct.calcsize(FILE_SEGMENT_HEADER)
+FILE_SEGMENT_Z_MAGIC = b"FSZ1"
+FILE_SEGMENT_Z_HEADER = FILE_SEGMENT_HEADER + "B"
+FILE_SEGMENT_Z_HEADER_SIZE = struct.calcsize(FILE_SEGMENT_Z_HEADER)
+FILE_PARITY_MAGIC = b"FPR1"
+FILE_PARITY_HEADER = "!4s16sIHHH"  # magic, offer_id, groupe, k, m, unites par groupe
+FILE_PARITY_HEADER_SIZE = struct.calcsize(FILE_PARITY_HEADER)
+HANDSHAKE_TIMEOUT = 5.0
+INIT_RETRY = 0.25  # premier renvoi d'un HS_INIT sans reponse, double ensuite (secondes)
+MAX_EARLY_PACKETS = 64  # paquets 0-RTT gardes pour etre renvoyes si la reprise est refusee
+REKEY_RETRY = 1.0  # HS_INIT de renegociation renvoye au plus une fois par intervalle (secondes)
 
 
 class SecureChannel:
-    def __init__(self, node_id, peer_table, trust_store, secure_port=SECURE_PORT):
+    def __init__(
+        self,
+        node_id,
+        peer_table,
+        trust_store,
+        secure_port=SECURE_PORT,
+        rx_workers=DEFAULT_RX_WORKERS,
+        fragment_size=DEFAULT_FRAGMENT_SIZE,
+        max_datagram=MAX_DATAGRAM,
+        cipher_suites=None,
+        rekey_after=REKEY_AFTER_MESSAGES,
+        resumption=None,
+        handshake_guard=None,
+    ):
         self.node_id = node_id
         self.peer_table = peer_table
         self.trust_store = trust_store
@@ -43,13 +108,76 @@ class SecureChannel:
         self._lock = threading.Lock()
         self._handlers = {}
         self._sessions = {}
-        self._pending = {}
+        # Contextes d'envoi resolus par pair (adresse, cles, decision TOFU) : les
+        # envois en rafale ne paient plus que le chiffrement et le sendto. Retires
+        # a chaque changement de session, perimes si la table des pairs ou le
+        # trust store changent (compteurs `version`). Ceux-ci ne bougent que sur
+        # paquet authentifie, nouveau pair ou expiration : un datagramme usurpe
+        # ne force pas de reconstruction.
+        self._send_contexts = {}
+        self._sender_id = node_id.encode("ascii")
+        self._secure_prefix = struct.pack(HEADER_FORMAT, MAGIC, VERSION, TYPE_SECURE_MSG, 0)[:-2]
+        # Handshakes en cours, un par pair : les appelants concurrents attendent
+        # le meme evenement au lieu d'en lancer chacun un.
+        self._handshakes = {}  # peer_id -> {"priv", "packet", "addr", "done": Event, ...}
+        self._handshake_stats = {
+            "started": 0,
+            "joined": 0,
+            "retransmits": 0,
+            "timeouts": 0,
+            "resumed": 0,
+            "early_rejected": 0,
+            "cookies": 0,
+        }
+        # Cookies sous charge et debit par IP, avant tout travail couteux d'un HS_INIT.
+        self.handshake_guard = handshake_guard or HandshakeGuard()
+        # Tickets de reprise (ResumptionStore) : handshake suivant en 0-RTT. None : desactive.
+        self.resumption = resumption
+        # Suites de chiffrement acceptees, par ordre de preference (annoncees dans HS_INIT).
+        self.cipher_suites = list(cipher_suites or DEFAULT_SUITES)
+        # Suites AEAD : nouvelle session apres `rekey_after` paquets emis ; la
+        # precedente reste acceptee en reception le temps de la bascule.
+        self.rekey_after = rekey_after
+        self._rekeys = 0
+        self._replays = 0
+        # Pairs qui lisent le codec binaire (annonce "codec" au handshake, ou
+        # handshake deja binaire) ; les autres recoivent du JSON.
+        self._binary_peers = set()
+        # rx_workers=0 : tout le traitement se fait dans le thread de listen
+        self._pipeline = None
+        if rx_workers > 0:
+            self._pipeline = self._make_pipeline(rx_workers)
+        # Tampons de recvfrom_into : un datagramme n'est copie qu'au dechiffrement.
+        self._rx_buffers = BufferPool()
+
+        # Objets plus grands qu'un datagramme : fragments numerotes, envoyes
+        # en selective-repeat par un ordonnanceur dedie, reassembles a la reception.
+        self.fragment_size = fragment_size
+        self._frag_lock = threading.Lock()
+        self._msg_ids = itertools.count(int.from_bytes(os.urandom(4), "big"))
+        self._outgoing = {}  # (peer_id, msg_id) -> ChunkSender
+        self._frag_scheduler = UploadScheduler(workers=1)
+        # Taches de fond ponctuelles (sondes PMTU) ; le mode asyncio les confie a son pool.
+        self._spawn = lambda fn: threading.Thread(target=fn, daemon=True).start()
+        # Handshakes (X25519, HKDF, tickets et confiance ecrits sur disque) :
+        # traites sur place ; le mode asyncio les sort de la boucle.
+        self._run_handshake = lambda handler, payload, addr: handler(payload, addr)
+        self._reassembler = Reassembler()
+
+        # Taille de datagramme par pair, sondee (PMTUD) apres chaque handshake.
+        # max_datagram=0 : pas de sonde ni de segmentation des chunks.
+        self.max_datagram = max_datagram
+        self._path_mtu = {}  # peer_id -> charge utile UDP max sans fragmentation IP
+        self._probing = set()
 
     def register_handler(self, kind, handler):
         self._handlers[kind] = handler
 
     def stop(self):
         self.running = False
+        if self._pipeline:
+            self._pipeline.stop()
+        self._frag_scheduler.stop()
         try:
             self._socket.close()
         except Exception:
@@ -72,170 +200,713 @@ class SecureChannel:
     def _peer_entry(self, peer_id):
         return self.peer_table.get_peer(peer_id)
 
-    def _send_handshake_init(self, peer_id, ip):
+    def _live_handshake(self, peer_id, now):
+        """Handshake en cours vers un pair (sous self._lock) ; un handshake perime est oublie."""
+        hs = self._handshakes.get(peer_id)
+        if hs and now - hs["started"] >= HANDSHAKE_TIMEOUT:
+            del self._handshakes[peer_id]
+            hs = None
+        return hs
+
+    def _begin_handshake(self, peer_id, ip):
+        """Lance un handshake vers un pair ou rejoint celui en cours.
+
+        Retourne (etat, nouveau) ; l'etat porte l'evenement `done`, leve a
+        l'installation de la session.
+        """
+        now = time.time()
+        with self._lock:
+            hs = self._live_handshake(peer_id, now)
+            if hs:
+                self._handshake_stats["joined"] += 1
+                return hs, False
+
         # On récupère le port distant depuis la peer_table
         peer = self._peer_entry(peer_id)
         remote_port = peer.get("port", self.secure_port) if peer else self.secure_port
 
         eph_priv, eph_pub = generate_ephemeral_keypair()
-        payload = json.dumps({"from_id": self.node_id, "eph_pub": eph_pub.hex()}).encode(
-            "utf-8"
-        )
+        msg = {
+            "from_id": self.node_id,
+            "eph_pub": eph_pub.hex(),
+            "suites": self.cipher_suites,
+            "codec": CODEC_VERSION,
+        }
+        early = None
+        ticket = self.resumption.get(peer_id) if self.resumption else None
+        if ticket and ticket["suite"] in self.cipher_suites:
+            # Reprise : cles 0-RTT utilisables des l'envoi du HS_INIT, sans
+            # attendre la reponse ; l'echange ephemere suit dans le meme aller-retour.
+            nonce = os.urandom(16)
+            msg["ticket"] = ticket["id"]
+            msg["nonce"] = nonce.hex()
+            early = derive_early_keys(
+                ticket["secret"], nonce + eph_pub, ticket["suite"], first=self.node_id <= peer_id
+            )
+            early["early"] = []  # clairs emis en 0-RTT, renvoyes si la reprise est refusee
+        hs = {
+            "priv": eph_priv,
+            "init": msg,
+            "packet": pack_packet(TYPE_HANDSHAKE_INIT, json.dumps(msg).encode("utf-8")),
+            "addr": (ip, remote_port),
+            "done": threading.Event(),
+            "waiters": [],  # rappels sans argument (mode asyncio), appeles avec `done`
+            "started": now,
+            "backoff": INIT_RETRY,
+            "retry_at": now + INIT_RETRY,
+            "early": early,
+        }
+        with self._lock:
+            current = self._live_handshake(peer_id, now)
+            if current:
+                self._handshake_stats["joined"] += 1
+                return current, False
+            self._handshakes[peer_id] = hs
+            self._handshake_stats["started"] += 1
+        if early:
+            # Avant l'envoi : la reponse ne doit pas pouvoir etre installee avant elles.
+            self._install_session(peer_id, early, finish=False)
+            self._wake_handshake(hs)
+        # Binaire vers un pair qui l'a deja parle ; les renvois restent en JSON,
+        # lisibles meme si le pair est revenu a une version sans codec.
+        first = hs["packet"]
+        if peer_id in self._binary_peers:
+            first = pack_packet(TYPE_HANDSHAKE_INIT, encode("hs_init", msg))
+        self._socket.sendto(first, hs["addr"])
+        return hs, True
+
+    def _check_early(self, peer_id, ip, keys):
+        """Session 0-RTT pas encore confirmee : renvoie HS_INIT, ou l'abandonne apres le delai."""
+        now = time.time()
+        resend = expired = False
+        with self._lock:
+            hs = self._handshakes.get(peer_id)
+            if hs and hs["early"] is keys and now - hs["started"] < HANDSHAKE_TIMEOUT:
+                resend = now >= hs["retry_at"]
+                if resend:
+                    hs["backoff"] *= 2
+                    hs["retry_at"] = now + hs["backoff"]
+                    self._handshake_stats["retransmits"] += 1
+            elif keys.get("early") is not None:
+                expired = True
+                sent = keys.pop("early", None) or []
+                if self._sessions.get(peer_id) is keys:
+                    del self._sessions[peer_id]
+                    self._send_contexts.pop(peer_id, None)
+                if hs and hs["early"] is keys:
+                    del self._handshakes[peer_id]
+                self._handshake_stats["timeouts"] += 1
+        if resend:
+            self._socket.sendto(hs["packet"], hs["addr"])
+        if not expired:
+            return keys
+        # Reprise jamais confirmee : ticket ecarte, handshake complet, 0-RTT renvoye.
+        self.resumption.discard(peer_id)
+        for plaintext in sent:
+            self._send_datagram(peer_id, ip, plaintext)
+        self._ensure_session(peer_id, ip)
+        with self._lock:
+            return self._sessions[peer_id]
+
+    def _await_handshake(self, peer_id, hs):
+        """Attend la fin d'un handshake en renvoyant HS_INIT avec backoff ; False si expire."""
+        while True:
+            wake = self._handshake_tick(peer_id, hs)
+            if wake is None:
+                return hs["done"].is_set()
+            hs["done"].wait(wake - time.time())
+
+    def _handshake_tick(self, peer_id, hs):
+        """Un pas d'attente : renvoie HS_INIT si l'echeance est passee.
+
+        Retourne l'heure du prochain pas, ou None quand le handshake est
+        termine ou expire (partage par l'attente bloquante et asyncio).
+        """
+        if hs["done"].is_set():
+            return None
+        now = time.time()
+        deadline = hs["started"] + HANDSHAKE_TIMEOUT
+        if now >= deadline:
+            with self._lock:
+                if self._handshakes.get(peer_id) is hs:
+                    del self._handshakes[peer_id]
+                    self._handshake_stats["timeouts"] += 1
+            return None
         with self._lock:
-            self._pending[peer_id] = eph_priv
-        self._socket.sendto(pack_packet(TYPE_HANDSHAKE_INIT, payload), (ip, remote_port))
+            # Un seul des appelants en attente renvoie, a chaque echeance.
+            resend = now >= hs["retry_at"]
+            if resend:
+                hs["backoff"] *= 2
+                hs["retry_at"] = now + hs["backoff"]
+                self._handshake_stats["retransmits"] += 1
+            wake = min(hs["retry_at"], deadline)
+        if resend:
+            self._socket.sendto(hs["packet"], hs["addr"])
+        return wake
+
+    def _wake_handshake(self, hs):
+        hs["done"].set()  # reveille tous les appelants en attente
+        for notify in list(hs["waiters"]):
+            notify()
 
     def _ensure_session(self, peer_id, ip):
         with self._lock:
             has_session = peer_id in self._sessions
         if has_session:
             return
-        self._send_handshake_init(peer_id, ip)
-        deadline = time.time() + 5
-        while time.time() < deadline:
+        hs, _ = self._begin_handshake(peer_id, ip)
+        if not self._await_handshake(peer_id, hs):
+            raise TimeoutError("Handshake timeout.")
+
+    def _install_session(self, peer_id, keys, finish=True):
+        """Active une session ; l'ancienne ne sert plus qu'a dechiffrer les paquets en vol.
+
+        `finish=False` (cles 0-RTT) laisse le handshake en cours : sa reponse
+        apportera les cles definitives.
+        """
+        if "replay" in keys:
+            keys["rekey_after"] = self.rekey_after
+            keys["reject_after"] = 2 * self.rekey_after
+        secret = keys.pop("resumption", None)
+        with self._lock:
+            previous = self._sessions.get(peer_id)
+            if previous:
+                if previous.get("zero_rtt"):
+                    # Cles 0-RTT puis definitives : une seule renegociation, et la
+                    # session d'avant reste dechiffrable derriere les cles 0-RTT.
+                    pass
+                else:
+                    previous.pop("previous", None)
+                    self._rekeys += 1
+                keys["previous"] = previous
+            self._sessions[peer_id] = keys
+            self._send_contexts.pop(peer_id, None)
+            hs = self._handshakes.pop(peer_id, None) if finish else None
+        if hs:
+            self._wake_handshake(hs)
+        if secret and self.resumption:
+            self.resumption.save(peer_id, ticket_id(secret), secret, keys["suite"])
+
+    def _start_rekey(self, peer_id, ip, keys):
+        now = time.time()
+        with self._lock:
+            if now - keys.get("rekey_sent", 0) < REKEY_RETRY:
+                return
+            keys["rekey_sent"] = now
+        hs, started = self._begin_handshake(peer_id, ip)
+        if not started:
+            self._socket.sendto(hs["packet"], hs["addr"])
+
+    def _wait_rekey(self, peer_id, ip, keys):
+        """Session epuisee avant la fin de la renegociation : attend la suivante."""
+        with self._lock:
+            current = self._sessions.get(peer_id)
+        if current is keys:
+            hs, _ = self._begin_handshake(peer_id, ip)
+            if not self._await_handshake(peer_id, hs):
+                raise TimeoutError("Renegociation de session expiree.")
             with self._lock:
-                if peer_id in self._sessions:
-                    return
-            time.sleep(0.02)
-        raise TimeoutError("Handshake timeout.")
+                current = self._sessions.get(peer_id)
+        return current
+
+    def session_stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "rekeys": self._rekeys,
+                "replays_dropped": self._replays,
+                "handshakes": dict(self._handshake_stats),
+                "handshake_guard": self.handshake_guard.stats(),
+                "rx_buffers": self._rx_buffers.stats(),
+                "binary_peers": len(self._binary_peers),
+                "rx_dropped": self._pipeline.dropped if self._pipeline else 0,
+            }
 
-    def _pack_secure_payload(self, nonce, tag, mac, ciphertext):
+    def _make_pipeline(self, workers):
+        return ReceivePipeline(self._open_secure_msg, self._dispatch_secure_object, workers=workers)
+
+    def _pack_secure_payload(self, keys, plaintext):
+        # L'identifiant en clair sert de donnees associees (suites AEAD).
         node_id_bytes = self.node_id.encode("ascii")
         if len(node_id_bytes) != 64:
             raise ValueError("Node ID invalide (attendu: 64 chars hex).")
-        return node_id_bytes + nonce + tag + mac + ciphertext
+        return node_id_bytes + seal(keys, node_id_bytes, plaintext)
 
-    def _unpack_secure_payload(self, payload):
-        if len(payload) < SECURE_HEADER_SIZE:
-            return None
-        peer_id = payload[:64].decode("ascii", errors="ignore")
-        nonce = payload[64:76]
-        tag = payload[76:92]
-        mac = payload[92:124]
-        ciphertext = payload[124:]
-        return peer_id, nonce, tag, mac, ciphertext
-
-    def _send_encrypted_payload(self, peer_id, ip, plaintext_bytes):
+    def _send_datagram(self, peer_id, ip, plaintext_bytes):
         self._ensure_session(peer_id, ip)
         with self._lock:
             keys = self._sessions[peer_id]
+        if keys.get("early") is not None:
+            keys = self._check_early(peer_id, ip, keys)
+        if keys.get("rekey"):
+            self._start_rekey(peer_id, ip, keys)
         
         # Récupération du port distant
         peer = self._peer_entry(peer_id)
         remote_port = peer.get("port", self.secure_port) if peer else self.secure_port
 
-        nonce, ciphertext, tag, mac = encrypt_payload(
-            keys["enc_key"], keys["mac_key"], plaintext_bytes
-        )
-        payload = self._pack_secure_payload(nonce, tag, mac, ciphertext)
+        try:
+            payload = self._pack_secure_payload(keys, plaintext_bytes)
+        except ValueError:
+            if not keys.get("rekey"):
+                raise
+            keys = self._wait_rekey(peer_id, ip, keys)
+            payload = self._pack_secure_payload(keys, plaintext_bytes)
+        early = keys.get("early")
+        if early is not None and len(early) < MAX_EARLY_PACKETS:
+            early.append(plaintext_bytes)
         self._socket.sendto(pack_packet(TYPE_SECURE_MSG, payload), (ip, remote_port))
 
-    def send_secure_object(self, peer_id, obj):
-        peer = self._peer_entry(peer_id)
-        if not peer:
-            raise ValueError("Pair introuvable. Utilise 'peers' d'abord.")
-        ip = peer["ip"]
+    def datagram_size(self, peer_id):
+        """Charge utile UDP utilisable vers un pair (chemin sonde, borne par max_datagram)."""
+        with self._lock:
+            size = self._path_mtu.get(peer_id) or DEFAULT_DATAGRAM
+        return min(size, self.max_datagram) if self.max_datagram else size
 
-        trusted_ok, _ = self.trust_store.check_or_trust_first_use(peer_id)
-        if not trusted_ok:
-            raise ValueError("Pair non fiable selon TOFU.")
+    def segment_room(self, peer_id, max_datagram=0):
+        """Octets de donnees qu'un segment de fichier peut porter vers ce pair.
+
+        `max_datagram` : plus grand datagramme annonce par le pair (0 : pas de borne).
+        """
+        size = self.datagram_size(peer_id)
+        if max_datagram:
+            size = min(size, max_datagram)
+        # Une unite doit tenir aussi bien dans un segment (brut ou compresse) que dans une parite.
+        frame_header = max(FILE_SEGMENT_Z_HEADER_SIZE, FILE_PARITY_HEADER_SIZE)
+        return size - HEADER_SIZE - SECURE_HEADER_SIZE - frame_header
+
+    def _start_mtu_probe(self, peer_id, addr):
+        if not self.max_datagram:
+            return
+        with self._lock:
+            if peer_id in self._path_mtu or peer_id in self._probing:
+                return
+            self._probing.add(peer_id)
+        sizes = [size for size in PROBE_SIZES if size <= self.max_datagram] or [self.max_datagram]
+
+        def probe():
+            size = probe_path(addr, sizes)
+            with self._lock:
+                self._probing.discard(peer_id)
+                self._path_mtu[peer_id] = size or DEFAULT_DATAGRAM
+
+        self._spawn(probe)
+
+    def _send_fragmented(self, peer_id, ip, plaintext_bytes):
+        """Decoupe un objet en fragments et confie leur envoi a l'ordonnanceur.
+
+        Retourne sans attendre : le recepteur acquitte les fragments (base +
+        blocs SACK) et seuls les fragments manquants sont retransmis.
+        """
+        if len(plaintext_bytes) > MAX_OBJECT_SIZE:
+            raise ValueError(f"Objet trop grand ({len(plaintext_bytes)} octets).")
+        self._ensure_session(peer_id, ip)
+        msg_id = next(self._msg_ids) & 0xFFFFFFFF
+        # Fragments dimensionnes pour ne jamais etre fragmentes par IP.
+        room = self.datagram_size(peer_id) - HEADER_SIZE - SECURE_HEADER_SIZE - FRAGMENT_HEADER_SIZE
+        fragment_size = max(MIN_FRAGMENT_SIZE, min(self.fragment_size, room))
+        frags = split_fragments(msg_id, plaintext_bytes, fragment_size)
+
+        def send_fragment(idx):
+            self._send_datagram(peer_id, ip, frags[idx])
+
+        sender = ChunkSender(peer_id, f"msg-{msg_id:08x}", len(frags), send_fragment, fragment_size)
+        sender.msg_id = msg_id
+        with self._frag_lock:
+            self._outgoing[(peer_id, msg_id)] = sender
+        self._frag_scheduler.submit(sender, on_done=self._on_fragmented_done)
 
-        plaintext = json.dumps(obj, separators=(",", ":")).encode("utf-8")
-        self._send_encrypted_payload(peer_id, ip, plaintext)
+    def _on_fragmented_done(self, sender, ok):
+        with self._frag_lock:
+            self._outgoing.pop((sender.peer_id, sender.msg_id), None)
+        if not ok:
+            print(f"\n[WARN] Message fragmente {sender.offer_id} non acquitte par {sender.peer_id[:10]}...")
+
+    def _on_frag_ack(self, peer_id, msg_id, base, sack):
+        with self._frag_lock:
+            sender = self._outgoing.get((peer_id, msg_id))
+        if sender:
+            sender.on_ack(base, sack)
+            self._frag_scheduler.wake(sender)
+
+    def _on_fragment(self, peer_id, addr, fragment):
+        """Ajoute un fragment ; retourne le message complet ou None."""
+        msg_id, index, count, total, offset, data = fragment
+        with self._frag_lock:
+            message, ack = self._reassembler.add(peer_id, msg_id, index, count, total, offset, data)
+        if ack:
+            base, sack = ack
+            try:
+                self._send_datagram(peer_id, addr[0], pack_frag_ack(msg_id, base, sack))
+            except Exception as e:
+                if self.running:
+                    print(f"\n[WARN] ACK de fragment impossible vers {peer_id[:10]}... : {e}")
+        return message
+
+    def fragment_stats(self):
+        with self._frag_lock:
+            return {"outgoing": len(self._outgoing), **self._reassembler.stats()}
+
+    def is_recent_peer(self, peer_id):
+        """Vrai si le pair a annonce le codec binaire au handshake (version recente)."""
+        return peer_id in self._binary_peers
+
+    def send_secure_object(self, peer_id, obj):
+        plaintext = encode_object(obj, binary=peer_id in self._binary_peers)
+        self.send_secure_bytes(peer_id, plaintext)
 
     def send_secure_message(self, peer_id, message):
         self.send_secure_object(peer_id, {"kind": "chat", "text": str(message)})
 
     def send_secure_file_chunk(
-        self, peer_id, offer_id, index, total_chunks, chunk_hash_hex, chunk_bytes
+        self, peer_id, offer_id, index, total_chunks, chunk_hash_hex, chunk_bytes, codec=CODEC_NONE
     ):
+        """Envoie un chunk entier ; `codec` indique si `chunk_bytes` est compresse."""
         if len(offer_id) != 16:
             raise ValueError("offer_id doit faire 16 caracteres.")
         if len(chunk_bytes) > 65535:
             raise ValueError("chunk trop grand (max 65535 octets).")
-        header = struct.pack(
-            FILE_CHUNK_HEADER,
-            FILE_CHUNK_MAGIC,
+        fields = (
             offer_id.encode("ascii"),
             int(index),
             int(total_chunks),
             bytes.fromhex(chunk_hash_hex),
             len(chunk_bytes),
         )
+        if codec == CODEC_NONE:
+            header = struct.pack(FILE_CHUNK_HEADER, FILE_CHUNK_MAGIC, *fields)
+        else:
+            header = struct.pack(FILE_CHUNK_Z_HEADER, FILE_CHUNK_Z_MAGIC, *fields, codec)
         self.send_secure_bytes(peer_id, header + chunk_bytes)
 
+    def send_secure_file_segment(self, peer_id, offer_id, unit, k, m, data, codec=CODEC_NONE):
+        """Envoie une unite d'une offre segmentee (cf. SegmentLayout) en un datagramme."""
+        if len(offer_id) != 16:
+            raise ValueError("offer_id doit faire 16 caracteres.")
+        fields = (offer_id.encode("ascii"), int(unit), k, m)
+        if codec == CODEC_NONE:
+            header = struct.pack(FILE_SEGMENT_HEADER, FILE_SEGMENT_MAGIC, *fields)
+        else:
+            header = struct.pack(FILE_SEGMENT_Z_HEADER, FILE_SEGMENT_Z_MAGIC, *fields, codec)
+        self._send_file_frame(peer_id, header + data)
+
+    def send_secure_file_parity(self, peer_id, offer_id, group, k, m, n, parity):
+        """Envoie la parite XOR d'un groupe de n unites d'une offre segmentee."""
+        if len(offer_id) != 16:
+            raise ValueError("offer_id doit faire 16 caracteres.")
+        header = struct.pack(
+            FILE_PARITY_HEADER, FILE_PARITY_MAGIC, offer_id.encode("ascii"), int(group), k, m, n
+        )
+        self._send_file_frame(peer_id, header + parity)
+
+    def _send_file_frame(self, peer_id, frame):
+        """Trame dimensionnee pour un datagramme : jamais fragmentee par la couche objet."""
+        self._send_with_context(self._send_context(peer_id), frame)
+
     def send_secure_bytes(self, peer_id, payload_bytes):
+        ctx = self._send_context(peer_id)
+        if len(payload_bytes) > self.fragment_size:
+            self._send_fragmented(peer_id, ctx["ip"], payload_bytes)
+        else:
+            self._send_with_context(ctx, payload_bytes)
+
+    def _send_context(self, peer_id):
+        """Contexte d'envoi vers un pair, resolu au premier envoi puis reutilise."""
+        stamp = (self.peer_table.version, self.trust_store.version)
+        with self._lock:
+            ctx = self._send_contexts.get(peer_id)
+        if ctx and ctx["stamp"] == stamp:
+            return ctx
         peer = self._peer_entry(peer_id)
         if not peer:
             raise ValueError("Pair introuvable. Utilise 'peers' d'abord.")
-        ip = peer["ip"]
         trusted_ok, _ = self.trust_store.check_or_trust_first_use(peer_id)
         if not trusted_ok:
             raise ValueError("Pair non fiable selon TOFU.")
-        self._send_encrypted_payload(peer_id, ip, payload_bytes)
+        if len(self._sender_id) != 64:
+            raise ValueError("Node ID invalide (attendu: 64 chars hex).")
+        ip = peer["ip"]
+        self._ensure_session(peer_id, ip)
+        with self._lock:
+            keys = self._sessions.get(peer_id)
+            ctx = {
+                "peer_id": peer_id,
+                "ip": ip,
+                "addr": (ip, peer.get("port", self.secure_port)),
+                "keys": keys,
+                # Lu apres la resolution : un changement pendant celle-ci la rendra perimee.
+                "stamp": stamp,
+            }
+            if keys is not None:
+                self._send_contexts[peer_id] = ctx
+        return ctx
+
+    def _send_with_context(self, ctx, plaintext_bytes):
+        keys = ctx["keys"]
+        if keys is None or keys.get("early") is not None or keys.get("rekey"):
+            # 0-RTT non confirme, renegociation : chemin complet.
+            self._send_datagram(ctx["peer_id"], ctx["ip"], plaintext_bytes)
+            return
+        try:
+            sealed = seal(keys, self._sender_id, plaintext_bytes)
+        except ValueError:
+            self._send_datagram(ctx["peer_id"], ctx["ip"], plaintext_bytes)
+            return
+        size = (len(self._sender_id) + len(sealed)).to_bytes(2, "big")
+        self._socket.sendto(
+            b"".join((self._secure_prefix, size, self._sender_id, sealed)), ctx["addr"]
+        )
 
     def listen(self):
         print(f"Canal securise actif sur le port {self.secure_port}...")
+        if self._pipeline:
+            self._pipeline.start()
+        pool = self._rx_buffers
         while self.running:
+            buffer = pool.acquire()
+            release = None
             try:
-                data, addr = self._socket.recvfrom(65535)
-                packet = unpack_packet(data)
-                if not packet:
-                    continue
-                ptype = packet["type"]
-                if ptype == TYPE_HANDSHAKE_INIT:
-                    self._on_handshake_init(packet["payload"], addr)
-                elif ptype == TYPE_HANDSHAKE_RESP:
-                    self._on_handshake_resp(packet["payload"], addr)
-                elif ptype == TYPE_SECURE_MSG:
-                    self._on_secure_msg(packet["payload"], addr)
+                if buffer is None:
+                    data, addr = self._socket.recvfrom(65535)  # tous les tampons sont pretes
+                else:
+                    size, addr = self._socket.recvfrom_into(buffer)
+                    data = memoryview(buffer)[:size]
+                    release = lambda b=buffer: pool.release(b)
+                if self._on_datagram(data, addr, release):
+                    continue  # le pipeline rendra le tampon apres dechiffrement
             except OSError:
+                if buffer is not None:
+                    pool.release(buffer)
                 break
             except Exception as e:
                 if self.running:
                     print(f"Erreur secure listen: {e}")
+            if buffer is not None:
+                pool.release(buffer)
+
+    def _on_datagram(self, data, addr, release=None):
+        """Traite un datagramme recu (thread de listen, ou boucle asyncio).
+
+        Retourne True si le datagramme est confie au pipeline : `release()`
+        sera alors appele une fois le paquet dechiffre, sinon c'est a
+        l'appelant de rendre le tampon au retour.
+        """
+        packet = unpack_packet(data)
+        if not packet:
+            return False
+        ptype = packet["type"]
+        payload = packet["payload"]
+        if ptype == TYPE_SECURE_MSG:
+            if self._pipeline:
+                return self._pipeline.submit(payload, addr, release)
+            self._on_secure_msg(payload, addr)
+        elif ptype == TYPE_MTU_PROBE:
+            reply = probe_reply(payload)
+            if reply:
+                self._socket.sendto(reply, addr)
+        elif ptype == TYPE_HANDSHAKE_INIT:
+            self._run_handshake(self._on_handshake_init, bytes(payload), addr)
+        elif ptype == TYPE_HANDSHAKE_RESP:
+            self._run_handshake(self._on_handshake_resp, bytes(payload), addr)
+        elif ptype == TYPE_HANDSHAKE_COOKIE:
+            self._run_handshake(self._on_handshake_cookie, bytes(payload), addr)
+        return False
+
+    def _read_handshake(self, payload, kind):
+        """Message de handshake, JSON ou binaire : retourne (msg, binaire) ou (None, False).
+
+        Le pair est note comme lecteur du codec binaire s'il l'emploie ou
+        l'annonce, oublie sinon (retour a une version anterieure).
+        """
+        try:
+            got, msg = decode(payload)
+        except ValueError:
+            return None, False
+        binary = got is not None
+        if binary and got != kind:
+            return None, False
+        peer_id = msg.get("from_id")
+        if not isinstance(peer_id, str):
+            return None, False
+        with self._lock:
+            codec = msg.get("codec")
+            if binary or (type(codec) is int and codec >= 1):
+                self._binary_peers.add(peer_id)
+            else:
+                self._binary_peers.discard(peer_id)
+        return msg, binary
 
     def _on_handshake_init(self, payload, addr):
-        msg = json.loads(payload.decode("utf-8"))
+        msg, binary = self._read_handshake(payload, "hs_init")
+        if msg is None:
+            return
         peer_id = msg["from_id"]
         peer_pub = bytes.fromhex(msg["eph_pub"])
+        with self._lock:
+            current = self._sessions.get(peer_id)
+            if current and current.get("init_pub") == peer_pub:
+                resend = current["resp_packet"]  # HS_INIT renvoye : meme reponse, meme session
+            else:
+                resend = None
+                # Ouverture simultanee : le plus petit identifiant garde son
+                # propre handshake, l'autre y repondra.
+                ours = self._live_handshake(peer_id, time.time())
+                if ours and self.node_id < peer_id:
+                    return
+        if resend:
+            self._socket.sendto(resend, addr)
+            return
+        verdict = self.handshake_guard.admit(addr, msg.get("cookie"))
+        if verdict == SEND_COOKIE:
+            # Une reponse courte, sans etat : seul un emetteur joignable a
+            # cette adresse pourra la renvoyer.
+            reply = {
+                "from_id": self.node_id,
+                "eph_pub": msg["eph_pub"],
+                "cookie": self.handshake_guard.cookie(addr).hex(),
+            }
+            # Meme format que le HS_INIT recu : un initiateur ancien ne lit que JSON.
+            if binary:
+                reply = encode("hs_cookie", reply)
+            else:
+                reply = json.dumps(reply).encode("utf-8")
+            self._socket.sendto(pack_packet(TYPE_HANDSHAKE_COOKIE, reply), addr)
+            return
+        if verdict != ADMIT:
+            return
+        suite = negotiate_suite(msg.get("suites"), self.cipher_suites)
+        if not suite:
+            print(f"\n[SECURITY] Aucune suite de chiffrement commune avec {peer_id[:10]}...")
+            return
+        early = self._accept_ticket(peer_id, msg, peer_pub)
 
+        eph_priv, eph_pub = generate_ephemeral_keypair()
+        transcript = self._build_transcript(peer_id, eph_pub, peer_pub)
+        keys = derive_session_keys(
+            eph_priv, peer_pub, transcript, suite, first=self.node_id <= peer_id
+        )
+        # HS_INIT admis (cookie sous charge) et session derivee : seulement
+        # maintenant le pair est enregistre, a l'adresse d'emission du HS_INIT.
         self.trust_store.check_or_trust_first_use(peer_id)
         self.trust_store.mark_seen(peer_id)
-        self.peer_table.update(peer_id, addr[0])
+        self.peer_table.update(peer_id, addr[0], port=addr[1], verified=True)
 
-        eph_priv, eph_pub = generate_ephemeral_keypair()
-        transcript = self._build_transcript(peer_id, eph_pub, peer_pub)
-        enc_key, mac_key = derive_session_keys(eph_priv, peer_pub, transcript)
-        with self._lock:
-            self._sessions[peer_id] = {"enc_key": enc_key, "mac_key": mac_key}
+        resp = {"from_id": self.node_id, "eph_pub": eph_pub.hex(), "codec": CODEC_VERSION}
+        if "suites" in msg:
+            resp["suite"] = suite  # un initiateur ancien n'attend pas ce champ
+        if early:
+            resp["resumed"] = True
+        if peer_id in self._binary_peers:
+            resp = pack_packet(TYPE_HANDSHAKE_RESP, encode("hs_resp", resp))
+        else:
+            resp = pack_packet(TYPE_HANDSHAKE_RESP, json.dumps(resp).encode("utf-8"))
+        keys["init_pub"] = peer_pub
+        keys["resp_packet"] = resp
+        # Reponse avant activation : nos paquets sous la nouvelle cle la suivent.
+        self._socket.sendto(resp, addr)
+        if early:
+            # Les paquets 0-RTT de l'initiateur restent dechiffrables via "previous".
+            self._install_session(peer_id, early, finish=False)
+        # Notre propre HS_INIT, s'il est parti juste avant celui du pair, sera
+        # quand meme traite par un pair plus grand : sa reponse fixera la cle
+        # des deux cotes. Un pair plus petit l'ignore : on clot alors le notre.
+        self._install_session(peer_id, keys, finish=peer_id < self.node_id)
+        self._start_mtu_probe(peer_id, addr)
 
-        resp = json.dumps({"from_id": self.node_id, "eph_pub": eph_pub.hex()}).encode(
-            "utf-8"
+    def _accept_ticket(self, peer_id, msg, peer_pub):
+        """Cles 0-RTT d'un HS_INIT de reprise, si son ticket est connu (et consomme)."""
+        if not (self.resumption and msg.get("ticket")):
+            return None
+        ticket = self.resumption.take(peer_id, msg["ticket"])
+        try:
+            nonce = bytes.fromhex(msg.get("nonce") or "")
+        except (TypeError, ValueError):
+            return None
+        offered = msg.get("suites") or []
+        if (
+            not ticket
+            or len(nonce) != 16
+            or ticket["suite"] not in self.cipher_suites
+            or ticket["suite"] not in offered
+        ):
+            return None
+        with self._lock:
+            self._handshake_stats["resumed"] += 1
+        return derive_early_keys(
+            ticket["secret"], nonce + peer_pub, ticket["suite"], first=self.node_id <= peer_id
         )
-        self._socket.sendto(pack_packet(TYPE_HANDSHAKE_RESP, resp), addr)
+
+    def _on_handshake_cookie(self, payload, addr):
+        """Repondeur sous charge : renvoie HS_INIT, identique, avec son cookie."""
+        msg, binary = self._read_handshake(payload, "hs_cookie")
+        if msg is None:
+            return
+        peer_id = msg["from_id"]
+        with self._lock:
+            hs = self._live_handshake(peer_id, time.time())
+            # Le cookie doit repondre a notre HS_INIT en cours, depuis son adresse.
+            if not hs or hs["addr"] != addr or msg.get("eph_pub") != hs["init"]["eph_pub"]:
+                return
+            hs["init"] = dict(hs["init"], cookie=msg.get("cookie"))
+            hs["packet"] = pack_packet(
+                TYPE_HANDSHAKE_INIT, json.dumps(hs["init"]).encode("utf-8")
+            )
+            self._handshake_stats["cookies"] += 1
+        packet = hs["packet"]
+        if binary:
+            packet = pack_packet(TYPE_HANDSHAKE_INIT, encode("hs_init", hs["init"]))
+        self._socket.sendto(packet, hs["addr"])
 
     def _on_handshake_resp(self, payload, addr):
-        msg = json.loads(payload.decode("utf-8"))
+        msg, _ = self._read_handshake(payload, "hs_resp")
+        if msg is None:
+            return
         peer_id = msg["from_id"]
         peer_pub = bytes.fromhex(msg["eph_pub"])
 
+        suite = msg.get("suite", SUITE_LEGACY)  # repondeur ancien : format historique
+        if suite not in self.cipher_suites:
+            print(f"\n[SECURITY] Suite {suite} refusee pour {peer_id[:10]}...")
+            return
+        sent = []
+        with self._lock:
+            hs = self._live_handshake(peer_id, time.time())
+            if hs is None:
+                return  # reponse en double ou handshake abandonne
+            # Reclame tout de suite : deriver deux fois la meme cle repartirait
+            # d'un compteur de nonce a zero.
+            del self._handshakes[peer_id]
+            early = hs["early"]
+            if early is not None:
+                # Session 0-RTT confirmee des maintenant : _check_early ne l'abandonne plus.
+                sent = early.pop("early", None) or []
+        # Reponse a notre handshake en cours : le pair est enregistre avant
+        # le reveil des appelants, qui resolvent son adresse.
         self.trust_store.check_or_trust_first_use(peer_id)
         self.trust_store.mark_seen(peer_id)
-        self.peer_table.update(peer_id, addr[0])
-
-        with self._lock:
-            local_priv = self._pending.pop(peer_id, None)
-        if local_priv is None:
-            return
+        self.peer_table.update(peer_id, addr[0], port=addr[1], verified=True)
+        local_priv = hs["priv"]
 
         from nacl.public import PrivateKey
 
         local_pub = bytes(PrivateKey(local_priv).public_key)
         transcript = self._build_transcript(peer_id, local_pub, peer_pub)
-        enc_key, mac_key = derive_session_keys(local_priv, peer_pub, transcript)
-        with self._lock:
-            self._sessions[peer_id] = {"enc_key": enc_key, "mac_key": mac_key}
+        keys = derive_session_keys(
+            local_priv, peer_pub, transcript, suite, first=self.node_id <= peer_id
+        )
+        self._install_session(peer_id, keys)
+        self._wake_handshake(hs)
+        if early is not None:
+            resumed = bool(msg.get("resumed"))
+            with self._lock:
+                self._handshake_stats["resumed" if resumed else "early_rejected"] += 1
+            if not resumed:
+                # Ticket refuse : le repondeur n'a rien pu dechiffrer du 0-RTT.
+                # (Ticket accepte apres un cookie : le 0-RTT arrive avant les cles
+                # a pu etre perdu, comme sur le reseau ; le renvoyer le doublerait.)
+                for plaintext in sent:
+                    self._send_datagram(peer_id, addr[0], plaintext)
+        self._start_mtu_probe(peer_id, addr)
 
     def _dispatch_secure_object(self, peer_id, obj):
         kind = obj.get("kind")
@@ -260,18 +931,22 @@ class SecureChannel:
             print(f"\n[ERROR] Handler '{kind}' en echec: {e}")
 
     def _try_parse_file_chunk(self, plaintext):
-        if len(plaintext) < FILE_CHUNK_HEADER_SIZE:
-            return None
         magic = plaintext[:4]
-        if magic != FILE_CHUNK_MAGIC:
+        if magic == FILE_CHUNK_MAGIC:
+            fmt, size = FILE_CHUNK_HEADER, FILE_CHUNK_HEADER_SIZE
+        elif magic == FILE_CHUNK_Z_MAGIC:
+            fmt, size = FILE_CHUNK_Z_HEADER, FILE_CHUNK_Z_HEADER_SIZE
+        else:
             return None
-        header = plaintext[:FILE_CHUNK_HEADER_SIZE]
-        body = plaintext[FILE_CHUNK_HEADER_SIZE:]
-        _, offer_id_bytes, idx, total, chunk_hash_raw, data_len = struct.unpack(
-            FILE_CHUNK_HEADER, header
-        )
+        if len(plaintext) < size:
+            return None
+        fields = struct.unpack_from(fmt, plaintext)
+        _, offer_id_bytes, idx, total, chunk_hash_raw, data_len = fields[:6]
+        body = plaintext[size:]
         if data_len != len(body):
             return None
+        if magic == FILE_CHUNK_Z_MAGIC:
+            body = decompress(fields[6], body)
         return {
             "kind": "file_chunk",
             "offer_id": offer_id_bytes.decode("ascii"),
@@ -281,34 +956,112 @@ class SecureChannel:
             "data": body,
         }
 
-    def _on_secure_msg(self, payload, addr):
-        parsed = self._unpack_secure_payload(payload)
-        if not parsed:
-            return
-        peer_id, nonce, tag, mac, ciphertext = parsed
+    def _try_parse_file_segment(self, plaintext):
+        magic = plaintext[:4]
+        if magic == FILE_SEGMENT_MAGIC:
+            fmt, size = FILE_SEGMENT_HEADER, FILE_SEGMENT_HEADER_SIZE
+        elif magic == FILE_SEGMENT_Z_MAGIC:
+            fmt, size = FILE_SEGMENT_Z_HEADER, FILE_SEGMENT_Z_HEADER_SIZE
+        else:
+            return None
+        if len(plaintext) < size:
+            return None
+        fields = struct.unpack_from(fmt, plaintext)
+        _, offer_id_bytes, unit, k, m = fields[:5]
+        data = plaintext[size:]
+        if magic == FILE_SEGMENT_Z_MAGIC:
+            data = decompress(fields[5], data)
+        return {
+            "kind": "file_segment",
+            "offer_id": offer_id_bytes.decode("ascii", errors="ignore"),
+            "unit": unit,
+            "k": k,
+            "m": m,
+            "data": data,
+        }
 
-        self.trust_store.check_or_trust_first_use(peer_id)
-        self.trust_store.mark_seen(peer_id)
-        self.peer_table.update(peer_id, addr[0])
+    def _try_parse_file_parity(self, plaintext):
+        if len(plaintext) < FILE_PARITY_HEADER_SIZE or plaintext[:4] != FILE_PARITY_MAGIC:
+            return None
+        _, offer_id_bytes, group, k, m, n = struct.unpack_from(FILE_PARITY_HEADER, plaintext)
+        return {
+            "kind": "file_parity",
+            "offer_id": offer_id_bytes.decode("ascii", errors="ignore"),
+            "group": group,
+            "k": k,
+            "m": m,
+            "n": n,
+            "data": plaintext[FILE_PARITY_HEADER_SIZE:],
+        }
+
+    def _open_secure_msg(self, payload, addr):
+        """Dechiffre un message securise.
+
+        Les chunks de fichier sont remis directement au handler (ils peuvent
+        etre traites en parallele) ; les autres objets sont retournes sous la
+        forme (peer_id, obj) pour une distribution ordonnee.
+        """
+        if len(payload) < MIN_SECURE_PAYLOAD:
+            return None
+        sender_id = bytes(payload[:64])
+        peer_id = sender_id.decode("ascii", errors="ignore")
 
         with self._lock:
             keys = self._sessions.get(peer_id)
         if not keys:
-            return
+            return None
         try:
-            plaintext = decrypt_payload(
-                keys["enc_key"], keys["mac_key"], nonce, ciphertext, tag, mac
+            plaintext = self._open_session(keys, sender_id, payload[64:])
+            if plaintext is None:
+                with self._lock:
+                    self._replays += 1  # rejeu ecarte par la fenetre
+                return None
+            # Authentifie : un datagramme usurpe ne deplace plus le pair ni ne le
+            # marque vu (et n'invalide pas les contextes d'envoi).
+            self.trust_store.check_or_trust_first_use(peer_id)
+            self.trust_store.mark_seen(peer_id)
+            self.peer_table.update(peer_id, addr[0], port=addr[1], verified=True)
+            # Seule copie du chemin : le dechiffrement. Les trames sont decoupees en vues.
+            view = memoryview(plaintext)
+            chunk_obj = (
+                self._try_parse_file_chunk(view)
+                or self._try_parse_file_segment(view)
+                or self._try_parse_file_parity(view)
             )
-            chunk_obj = self._try_parse_file_chunk(plaintext)
             if chunk_obj:
-                handler = self._handlers.get("file_chunk")
+                handler = self._handlers.get(chunk_obj["kind"])
                 if handler:
                     handler(peer_id, chunk_obj)
-                return
+                return None
+            frag_ack = parse_frag_ack(view)
+            if frag_ack:
+                self._on_frag_ack(peer_id, *frag_ack)
+                return None
+            fragment = parse_fragment(view)
+            if fragment:
+                plaintext = self._on_fragment(peer_id, addr, fragment)
+                if plaintext is None:
+                    return None
             try:
-                obj = json.loads(plaintext.decode("utf-8"))
+                obj = decode_object(plaintext)  # binaire ou JSON (pair ancien)
             except Exception:
                 obj = {"kind": "chat", "text": plaintext.decode("utf-8")}
-            self._dispatch_secure_object(peer_id, obj)
+            return peer_id, obj
         except Exception as e:
             print(f"\n[SECURITY] Message invalide de {peer_id[:10]}... : {e}")
+            return None
+
+    def _open_session(self, keys, sender_id, sealed):
+        try:
+            return open_sealed(keys, sender_id, sealed)
+        except ValueError:
+            previous = keys.get("previous")
+            if not previous:
+                raise
+            # Paquet emis avant la renegociation (eventuellement avant les cles 0-RTT).
+            return self._open_session(previous, sender_id, sealed)
+
+    def _on_secure_msg(self, payload, addr):
+        result = self._open_secure_msg(payload, addr)
+        if result:
+            self._dispatch_secure_object(*result)
@@ -0,0 +1,103 @@
+MAX_UNIT_CHUNKS = 64  # chunks regroupes au plus dans une unite d'envoi
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+class SegmentLayout:
+    """Decoupage d'une offre en unites d'envoi tenant chacune dans un datagramme.
+
+    Le chunk reste l'unite de hash, de stockage et d'attribution ; l'unite
+    d'envoi (celle que l'emetteur numerote, acquitte et retransmet) est soit
+    un segment de chunk (k segments par chunk, lien a MTU Ethernet), soit un
+    groupe de m chunks consecutifs (boucle locale, jumbo frames).
+    """
+
+    def __init__(self, chunk_size, total_chunks, k=1, m=1):
+        if k < 1 or m < 1 or (k > 1 and m > 1) or k > 0xFFFF or m > 0xFFFF:
+            raise ValueError(f"Decoupage invalide (k={k}, m={m}).")
+        self.chunk_size = chunk_size
+        self.total_chunks = total_chunks
+        self.k = k
+        self.m = m
+        self.seg_size = _ceil_div(chunk_size, k)
+        if k > 1:
+            self.total_units = total_chunks * k
+            self.unit_bytes = self.seg_size
+        else:
+            self.total_units = _ceil_div(total_chunks, m)
+            self.unit_bytes = chunk_size * m
+
+    @classmethod
+    def for_payload(cls, chunk_size, total_chunks, room):
+        """Plus grand decoupage dont chaque unite tient dans `room` octets."""
+        if room >= chunk_size:
+            return cls(chunk_size, total_chunks, m=min(room // chunk_size, MAX_UNIT_CHUNKS))
+        return cls(chunk_size, total_chunks, k=_ceil_div(chunk_size, max(1, room)))
+
+    def key(self):
+        return [self.k, self.m]
+
+    def unit_ranges(self, chunk_ranges):
+        """Plages d'unites couvrant des plages de chunks triees."""
+        units = []
+        for start, end in chunk_ranges:
+            if self.k > 1:
+                first, last = start * self.k, end * self.k
+            else:
+                first, last = start // self.m, _ceil_div(end, self.m)
+            if units and first <= units[-1][1]:
+                units[-1][1] = max(units[-1][1], last)
+            elif first < last:
+                units.append([first, last])
+        return units
+
+    def chunks_of(self, unit):
+        """Chunks [debut, fin) portes (en tout ou partie) par une unite."""
+        if self.k > 1:
+            chunk = unit // self.k
+            return chunk, chunk + 1
+        first = unit * self.m
+        return first, min(first + self.m, self.total_chunks)
+
+    def read_unit(self, unit, read_chunk):
+        if self.k > 1:
+            offset = (unit % self.k) * self.seg_size
+            return read_chunk(unit // self.k)[offset:offset + self.seg_size]
+        first, end = self.chunks_of(unit)
+        if end - first == 1:
+            return read_chunk(first)
+        return b"".join(read_chunk(idx) for idx in range(first, end))
+
+    def ack(self, missing, partial, limit):
+        """(base, sack) en unites pour une source.
+
+        `missing` : plages de chunks encore attendues de cette source (triees) ;
+        `partial` : chunk -> masque des segments deja recus. Les unites entre
+        deux plages attendues sont acquittees (chunks recus ou confies a une
+        autre source) ; au-dela de la derniere, rien n'est annonce.
+        """
+        pending = []
+        for first, last in self.unit_ranges(missing):
+            cursor = first
+            if self.k > 1:
+                for chunk in sorted(c for c in partial if first <= c * self.k < last):
+                    mask = partial[chunk]
+                    for seg in range(self.k):
+                        if mask >> seg & 1:
+                            unit = chunk * self.k + seg
+                            if cursor < unit:
+                                pending.append([cursor, unit])
+                            cursor = unit + 1
+            if cursor < last:
+                pending.append([cursor, last])
+        if not pending:
+            return self.total_units, []
+        sack = []
+        for prev, nxt in zip(pending, pending[1:]):
+            if prev[1] < nxt[0]:
+                sack.append([prev[1], nxt[0]])
+                if len(sack) >= limit:
+                    break
+        return pending[0][0], sack
@@ -0,0 +1,175 @@
+import time
+
+
+BLOCK_CHUNKS = 256  # granularite d'attribution, alignee sur les lots de hash
+SOURCE_WINDOW_BLOCKS = 4  # blocs attribues d'avance a chaque source
+LOW_WATER_CHUNKS = 2 * BLOCK_CHUNKS  # sous ce reste, la source recoit un complement
+MIN_STEAL_CHUNKS = 32
+RATE_WINDOW = 0.5  # secondes entre deux mises a jour du debit d'une source
+RATE_ALPHA = 0.3
+
+
+def count_chunks(ranges):
+    return sum(end - start for start, end in ranges)
+
+
+def _split(ranges, keep):
+    """Coupe une liste de plages apres `keep` chunks : (debut, fin)."""
+    head, tail = [], []
+    for start, end in ranges:
+        if keep <= 0:
+            tail.append([start, end])
+        elif end - start <= keep:
+            head.append([start, end])
+            keep -= end - start
+        else:
+            head.append([start, start + keep])
+            tail.append([start + keep, end])
+            keep = 0
+    return head, tail
+
+
+class SwarmPlanner:
+    """Repartition des chunks d'un telechargement entre plusieurs sources.
+
+    Chaque source recoit des plages disjointes, bloc par bloc et a la demande :
+    une source rapide vide sa part plus vite et en redemande, si bien que le
+    debit se repartit selon la vitesse de chaque pair. En fin de fichier, une
+    source inactive reprend la moitie de la plus grosse part restante ; une
+    source muette rend la sienne, redistribuee aux autres.
+
+    Non thread-safe : l'appelant protege les acces par son propre verrou.
+    """
+
+    def __init__(self, received, block_chunks=BLOCK_CHUNKS):
+        self.received = received  # ChunkBitmap partage du telechargement
+        self.block_chunks = block_chunks
+        self.sources = {}  # peer_id -> etat de la source
+        self._free = []  # plages rendues par des sources defaillantes
+        self._next = received.first_missing()
+
+    def add_source(self, peer_id):
+        if peer_id not in self.sources:
+            now = time.time()
+            self.sources[peer_id] = {
+                "ranges": [],
+                "next_expected": None,
+                "since_ack": 0,
+                "stalls": 0,
+                "last_chunk": now,
+                "dead_until": 0.0,
+                "bytes": 0,
+                "rate": 0.0,
+                "rate_at": now,
+                "rate_bytes": 0,
+            }
+        return self.sources[peer_id]
+
+    def remaining(self, peer_id):
+        """Plages encore manquantes de la part d'une source (compactees au passage)."""
+        src = self.sources[peer_id]
+        ranges = []
+        for start, end in src["ranges"]:
+            ranges.extend(self.received.missing_ranges(start, stop=end))
+        src["ranges"] = ranges
+        return ranges
+
+    def _take_free(self, want):
+        taken = []
+        while self._free and want > 0:
+            start, end = self._free.pop(0)
+            missing = self.received.missing_ranges(start, stop=end)
+            head, tail = _split(missing, want)
+            taken.extend(head)
+            want -= count_chunks(head)
+            self._free[:0] = tail
+        return taken
+
+    def _take_new(self, want):
+        taken = []
+        total = self.received.total
+        while want > 0 and self._next < total:
+            start = self.received.first_missing(self._next)
+            end = min((start // self.block_chunks + 1) * self.block_chunks, total)
+            self._next = end
+            missing = self.received.missing_ranges(start, stop=end)
+            taken.extend(missing)
+            want -= count_chunks(missing)
+        return taken
+
+    def _steal(self, thief):
+        victim, best = None, []
+        for peer_id in self.sources:
+            if peer_id == thief:
+                continue
+            rem = self.remaining(peer_id)
+            if count_chunks(rem) > count_chunks(best):
+                victim, best = peer_id, rem
+        n = count_chunks(best)
+        if n < 2 * MIN_STEAL_CHUNKS:
+            return []
+        # La victime garde le debut de sa part, ou elle est en train d'envoyer.
+        kept, stolen = _split(best, n // 2)
+        self.sources[victim]["ranges"] = kept
+        return stolen
+
+    def top_up(self, peer_id):
+        """Complete la part d'une source ; retourne les plages nouvellement attribuees."""
+        src = self.sources[peer_id]
+        rem = self.remaining(peer_id)
+        have = count_chunks(rem)
+        if have >= LOW_WATER_CHUNKS:
+            return []
+        want = SOURCE_WINDOW_BLOCKS * self.block_chunks - have
+        new = self._take_free(want)
+        new += self._take_new(want - count_chunks(new))
+        if not new and not rem:
+            new = self._steal(peer_id)
+        if new and not rem:
+            src["last_chunk"] = time.time()  # delai de blocage compte a partir d'ici
+            src["stalls"] = 0
+        src["ranges"] = sorted(rem + new)
+        return new
+
+    def release(self, peer_id):
+        """Rend la part d'une source defaillante au pot commun."""
+        src = self.sources[peer_id]
+        self._free = sorted(self._free + self.remaining(peer_id))
+        src["ranges"] = []
+
+    def ack_for(self, peer_id, limit):
+        """(base, sack) vu par une source : base = premier chunk manquant de sa part."""
+        rem = self.remaining(peer_id)
+        if not rem:
+            return self.received.total, []
+        base = rem[0][0]
+        return base, self.received.received_ranges(base, limit=limit)
+
+    def on_chunk(self, peer_id, index, size, now):
+        """Enregistre l'arrivee d'un chunk ; retourne True s'il suit le precedent."""
+        src = self.sources[peer_id]
+        in_order = src["next_expected"] in (None, index)
+        src["next_expected"] = index + 1
+        src["last_chunk"] = now
+        src["stalls"] = 0
+        src["bytes"] += size
+        src["rate_bytes"] += size
+        elapsed = now - src["rate_at"]
+        if elapsed >= RATE_WINDOW:
+            sample = src["rate_bytes"] / elapsed
+            src["rate"] = sample if not src["rate"] else (1 - RATE_ALPHA) * src["rate"] + RATE_ALPHA * sample
+            src["rate_at"] = now
+            src["rate_bytes"] = 0
+        return in_order
+
+    def stats(self):
+        return [
+            {
+                "peer_id": peer_id,
+                "remaining": count_chunks(src["ranges"]),
+                "bytes": src["bytes"],
+                "rate": src["rate"],
+                "stalls": src["stalls"],
+            }
+            for peer_id, src in self.sources.items()
+        ]
@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+
+DEFAULT_UPLOAD_WORKERS = 2
+DEFAULT_QUANTUM = 8  # chunks envoyes par tour avant de passer au transfert suivant
+MAX_IDLE_WAIT = 1.0
+
+
+class UploadScheduler:
+    """Ordonnanceur des envois de fichiers, hors du thread de reception.
+
+    Un petit pool de workers sert les `ChunkSender` actifs a tour de role
+    (round-robin par quantum de chunks), ce qui entrelace equitablement les
+    envois vers plusieurs pairs. Un emetteur n'est jamais traite par deux
+    workers a la fois ; ceux qui attendent un ACK ou une echeance de pacing
+    dorment dans un tas de minuteries et sont reveilles par `wake`.
+    """
+
+    def __init__(self, workers=DEFAULT_UPLOAD_WORKERS, quantum=DEFAULT_QUANTUM):
+        self.workers = max(1, int(workers))
+        self.quantum = quantum
+        self.running = True
+
+        self._cond = threading.Condition()
+        self._ready = deque()
+        self._timers = []  # heap (reveil, seq, sender, generation)
+        self._seq = itertools.count()
+        self._state = {}  # sender -> {"status": str, "gen": int, "wake": bool, "on_done": callable}
+        self._threads = []
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"upload-{i}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def submit(self, sender, on_done=None):
+        with self._cond:
+            self._ensure_started()
+            self._state[sender] = {"status": "ready", "gen": 0, "wake": False, "on_done": on_done}
+            self._ready.append(sender)
+            self._cond.notify()
+
+    def wake(self, sender):
+        """A appeler quand l'etat d'un emetteur change (ACK recu, annulation)."""
+        with self._cond:
+            st = self._state.get(sender)
+            if not st:
+                return
+            if st["status"] == "waiting":
+                st["status"] = "ready"
+                st["gen"] += 1
+                self._ready.append(sender)
+                self._cond.notify()
+            elif st["status"] == "running":
+                st["wake"] = True
+
+    def active(self):
+        with self._cond:
+            return list(self._state.keys())
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+    def _next_sender(self):
+        """Bloque jusqu'a ce qu'un emetteur soit pret (appele sous verrou)."""
+        while self.running:
+            now = time.time()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, sender, gen = heapq.heappop(self._timers)
+                st = self._state.get(sender)
+                if st and st["status"] == "waiting" and st["gen"] == gen:
+                    st["status"] = "ready"
+                    self._ready.append(sender)
+            if self._ready:
+                sender = self._ready.popleft()
+                self._state[sender]["status"] = "running"
+                return sender
+            timeout = MAX_IDLE_WAIT
+            if self._timers:
+                timeout = min(timeout, max(0.0, self._timers[0][0] - now))
+            self._cond.wait(timeout=timeout)
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                sender = self._next_sender()
+            if sender is None:
+                return
+
+            try:
+                status, batch, wake_at = sender.poll(time.time(), self.quantum)
+                if batch:
+                    sender.send(batch)
+            except Exception as e:
+                print(f"\n[FILE] Erreur envoi {sender.offer_id}: {e}")
+                status, wake_at = "failed", None
+
+            on_done = None
+            with self._cond:
+                st = self._state[sender]
+                if status != "active":
+                    on_done = st["on_done"]
+                    del self._state[sender]
+                elif batch or st["wake"]:
+                    st["status"] = "ready"
+                    st["wake"] = False
+                    self._ready.append(sender)
+                else:
+                    st["status"] = "waiting"
+                    st["gen"] += 1
+                    when = wake_at if wake_at is not None else time.time() + MAX_IDLE_WAIT
+                    heapq.heappush(self._timers, (when, next(self._seq), sender, st["gen"]))
+                self._cond.notify()
+            if on_done:
+                on_done(sender, status == "done")
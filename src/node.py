@@ -1,15 +1,33 @@
+import asyncio
 import threading
 import time
 from src.crypto.keys import get_node_id
-from src.network.discovery import Discovery
+from src.network.aio import AsyncSecureChannel, every, serve_channel, serve_discovery
+from src.network.compression import DEFAULT_COMPRESSION
+from src.network.discovery import HELLO_INTERVAL, Discovery
+from src.network.fec import DEFAULT_FEC_GROUP
 from src.network.peer_table import PeerTable
+from src.network.pmtu import MAX_DATAGRAM
+from src.network.rx_pipeline import DEFAULT_RX_WORKERS
 from src.network.secure_channel import SecureChannel
+from src.security.resumption import ResumptionStore
 from src.security.trust_store import TrustStore
 from src.network.file_transfer import FileTransfer
+from src.file.block_cache import DEFAULT_BLOCK_CACHE_MB
 from src.security.gemini_client import GeminiClient
 
 class ArchipelNode:
-    def __init__(self, port=6000, no_ai=False):
+    def __init__(
+        self,
+        port=6000,
+        no_ai=False,
+        upload_workers=2,
+        rx_workers=DEFAULT_RX_WORKERS,
+        block_cache_mb=DEFAULT_BLOCK_CACHE_MB,
+        max_datagram=MAX_DATAGRAM,
+        fec_group=DEFAULT_FEC_GROUP,
+        compression=DEFAULT_COMPRESSION,
+    ):
         self.my_id = get_node_id()
         self.mcast_port = port
         self.secure_port = port + 1
@@ -17,12 +35,32 @@ class ArchipelNode:
         self.table = PeerTable()
         self.trust_store = TrustStore()
         self.disco = Discovery(self.my_id, self.table, mcast_port=self.mcast_port)
-        self.secure = SecureChannel(self.my_id, self.table, self.trust_store, secure_port=self.secure_port)
-        self.transfer = FileTransfer(self.my_id, self.secure)
+        self.secure = SecureChannel(
+            self.my_id,
+            self.table,
+            self.trust_store,
+            secure_port=self.secure_port,
+            rx_workers=rx_workers,
+            max_datagram=max_datagram,
+            resumption=ResumptionStore(),
+        )
+        self.transfer = FileTransfer(
+            self.my_id,
+            self.secure,
+            upload_workers=upload_workers,
+            block_cache_mb=block_cache_mb,
+            fec_group=fec_group,
+            compression=compression,
+        )
         self.gemini = GeminiClient(enabled=not no_ai)
         
         self.running = {"run": True}
         self.threads = []
+        # Mode asyncio (start_async) : transports et taches periodiques de la boucle.
+        self.aio = None
+        self._loop = None
+        self._transports = []
+        self._tasks = []
         self.messages = [] 
         self.logs = []
         self.start_time = time.time()
@@ -58,19 +96,68 @@ class ArchipelNode:
             threading.Thread(target=self.disco.listen, daemon=True),
             threading.Thread(target=self.secure.listen, daemon=True),
             threading.Thread(target=self._maintenance_loop, daemon=True),
+            threading.Thread(target=self._transfer_loop, daemon=True),
         ]
         for t in self.threads: t.start()
         self.log("Services réseau démarrés.")
+        resumed = self.transfer.resume_downloads()
+        if resumed:
+            self.log(f"{resumed} téléchargement(s) repris.")
+
+    async def start_async(self):
+        """Demarre le noeud sur la boucle asyncio courante, sans threads d'ecoute.
+
+        Decouverte et canal securise deviennent des DatagramProtocol ; les
+        balises HELLO, l'expiration des pairs et les relances de transfert
+        sont des taches de la boucle. Les API synchrones restent utilisables
+        depuis d'autres threads.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._transports = [await serve_channel(self.secure), *await serve_discovery(self.disco)]
+        self.aio = AsyncSecureChannel(self.secure)
+        beacon = self._transports[-1]
+        self._tasks = [
+            asyncio.create_task(every(HELLO_INTERVAL, lambda: self.disco.beacon(beacon))),
+            asyncio.create_task(every(5, self.table.clean)),
+            # tick() peut attendre un handshake : hors de la boucle qui le recoit.
+            asyncio.create_task(every(1, self.transfer.tick, executor=True)),
+        ]
+        self.log("Services réseau démarrés (asyncio).")
+        resumed = await self._loop.run_in_executor(None, self.transfer.resume_downloads)
+        if resumed:
+            self.log(f"{resumed} téléchargement(s) repris.")
+
+    async def send_secure_object(self, peer_id, obj):
+        await self.aio.send_secure_object(peer_id, obj)
+
+    async def send_message(self, peer_id, text):
+        await self.aio.send_secure_message(peer_id, text)
+        self.add_message(self.my_id, text, target=peer_id)
+
+    async def send_file(self, peer_id, path):
+        """Propose un fichier (hachage et manifeste hors de la boucle) ; retourne l'offre."""
+        return await self._loop.run_in_executor(None, self.transfer.offer_file, peer_id, path)
 
     def _maintenance_loop(self):
         while self.running["run"]:
             self.table.clean()
             time.sleep(5)
 
+    def _transfer_loop(self):
+        while self.running["run"]:
+            self.transfer.tick()
+            time.sleep(1)
+
     def stop(self):
         self.running["run"] = False
+        for task in self._tasks:
+            self._loop.call_soon_threadsafe(task.cancel)
+        for transport in self._transports[1:]:  # le premier se ferme avec le canal
+            self._loop.call_soon_threadsafe(transport.close)
         self.disco.stop()
         self.secure.stop()
+        self.transfer.stop()
+        self.trust_store.flush()
         self.log("Arrêt du nœud.")
 
     def get_status(self):
@@ -83,5 +170,8 @@ class ArchipelNode:
             "trusted_count": len([p for p in self.table.list_peers() if self.trust_store.is_trusted(p['id'])]),
             "ai_enabled": self.gemini.is_available(),
             "uptime": uptime,
-            "transfers_active": len(self.transfer.downloads)
+            "transfers_active": len(self.transfer.downloads),
+            "uploads_active": len(self.transfer.uploads),
+            "block_cache": self.transfer.cache_stats(),
+            "sessions": self.secure.session_stats(),
         }
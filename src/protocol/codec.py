@@ -0,0 +1,349 @@
+import json
+import struct
+
+CODEC_VERSION = 1
+BINARY_MARK = 0xB1  # premier octet d'un message binaire ; un objet JSON commence par "{"
+MARK_BYTE = bytes((BINARY_MARK,))
+HEADER_FORMAT = "!BBB"  # marque, version, type de message
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FIELD_FORMAT = "!BH"  # tag, longueur de la valeur
+FIELD_STRUCT = struct.Struct(FIELD_FORMAT)
+FIELD_SIZE = FIELD_STRUCT.size
+TAG_JSON = 0  # champs hors schema (extensions, valeurs atypiques) : objet JSON
+MAX_VALUE = 0xFFFF
+
+# Types de valeur : chaque encodeur retourne None si la valeur ne s'y prete
+# pas (type, borne, hex non canonique) ; le champ part alors dans TAG_JSON,
+# ce qui garantit un aller-retour identique a JSON.
+HEX = "hex"  # chaine hexadecimale minuscule <-> octets bruts
+HEXES = "hexes"  # liste de hash de 32 octets en hexadecimal
+STR = "str"
+STRS = "strs"  # liste de chaines courtes (<= 255 octets)
+UINT = "uint"  # entier >= 0, big-endian sur 1 a 8 octets
+UINTS = "uints"  # liste d'entiers sur 32 bits
+PAIRS = "pairs"  # liste de plages [debut, fin] sur 32 bits
+BOOL = "bool"
+
+HANDSHAKE_FIELDS = {
+    "from_id": (1, HEX),
+    "eph_pub": (2, HEX),
+    "suites": (3, STRS),
+    "suite": (4, STR),
+    "ticket": (5, HEX),
+    "nonce": (6, HEX),
+    "cookie": (7, HEX),
+    "resumed": (8, BOOL),
+    "codec": (9, UINT),
+}
+MANIFEST_FIELDS = {
+    "offer_id": (1, HEX),
+    "file_name": (2, STR),
+    "file_size": (3, UINT),
+    "chunk_size": (4, UINT),
+    "total_chunks": (5, UINT),
+    "file_hash": (6, HEX),
+    "merkle_root": (7, HEX),
+}
+
+# kind -> (identifiant, champs) ; un champ dont le type est un dict porte un sous-schema.
+MESSAGES = {
+    "hs_init": (0x01, HANDSHAKE_FIELDS),
+    "hs_resp": (0x02, HANDSHAKE_FIELDS),
+    "hs_cookie": (0x03, HANDSHAKE_FIELDS),
+    "chat": (0x10, {"text": (1, STR)}),
+    "file_offer": (0x11, {"manifest": (1, MANIFEST_FIELDS)}),
+    "file_get": (
+        0x12,
+        {
+            "offer_id": (1, HEX),
+            "ranges": (2, PAIRS),
+            "extend": (3, BOOL),
+            "max_datagram": (4, UINT),
+            "fec": (5, UINT),
+            "compress": (6, STRS),
+        },
+    ),
+    "file_ack": (
+        0x13,
+        {"offer_id": (1, HEX), "base": (2, UINT), "sack": (3, PAIRS), "unit": (4, UINTS)},
+    ),
+    "file_hashes_get": (0x14, {"offer_id": (1, HEX), "batch": (2, UINT)}),
+    "file_hashes": (
+        0x15,
+        {"offer_id": (1, HEX), "batch": (2, UINT), "hashes": (3, HEX), "proof": (4, HEXES)},
+    ),
+}
+
+
+def _is_uint(value, limit):
+    return type(value) is int and 0 <= value < limit
+
+
+def _pack_hex(value):
+    if not isinstance(value, str) or len(value) % 2:
+        return None
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        return None
+    return raw if raw.hex() == value else None  # majuscules, espaces : JSON
+
+
+def _pack_hexes(value):
+    if not isinstance(value, list):
+        return None
+    parts = [_pack_hex(item) for item in value]
+    if any(part is None or len(part) != 32 for part in parts):
+        return None
+    return b"".join(parts)
+
+
+def _pack_str(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return value.encode("utf-8")
+    except UnicodeEncodeError:
+        return None
+
+
+def _pack_strs(value):
+    if not isinstance(value, list):
+        return None
+    parts = []
+    for item in value:
+        raw = _pack_str(item)
+        if raw is None or len(raw) > 255:
+            return None
+        parts.append(bytes((len(raw),)) + raw)
+    return b"".join(parts)
+
+
+def _pack_uint(value):
+    if not _is_uint(value, 1 << 64):
+        return None
+    return value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big")
+
+
+def _pack_uints(value):
+    if not isinstance(value, list) or not all(_is_uint(v, 1 << 32) for v in value):
+        return None
+    return struct.pack(f"!{len(value)}I", *value)
+
+
+def _pack_pairs(value):
+    if not isinstance(value, (list, tuple)):
+        return None
+    flat = []
+    for pair in value:
+        if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+            return None
+        flat.extend(pair)
+    if not all(_is_uint(v, 1 << 32) for v in flat):
+        return None
+    return struct.pack(f"!{len(flat)}I", *flat)
+
+
+def _pack_bool(value):
+    return (b"\1" if value else b"\0") if type(value) is bool else None
+
+
+def _unpack_hexes(raw):
+    if len(raw) % 32:
+        raise ValueError("Liste de hash tronquee")
+    return [raw[i : i + 32].hex() for i in range(0, len(raw), 32)]
+
+
+def _unpack_strs(raw):
+    items, pos = [], 0
+    while pos < len(raw):
+        size = raw[pos]
+        end = pos + 1 + size
+        if end > len(raw):
+            raise ValueError("Liste de chaines tronquee")
+        items.append(raw[pos + 1 : end].decode("utf-8"))
+        pos = end
+    return items
+
+
+def _unpack_ints(raw):
+    if len(raw) % 4:
+        raise ValueError("Liste d'entiers tronquee")
+    return list(struct.unpack(f"!{len(raw) // 4}I", raw))
+
+
+def _unpack_pairs(raw):
+    flat = _unpack_ints(raw)
+    if len(flat) % 2:
+        raise ValueError("Plage incomplete")
+    return [[flat[i], flat[i + 1]] for i in range(0, len(flat), 2)]
+
+
+def _unpack_bool(raw):
+    if len(raw) != 1:
+        raise ValueError("Booleen invalide")
+    return raw[0] != 0
+
+
+PACKERS = {
+    HEX: _pack_hex,
+    HEXES: _pack_hexes,
+    STR: _pack_str,
+    STRS: _pack_strs,
+    UINT: _pack_uint,
+    UINTS: _pack_uints,
+    PAIRS: _pack_pairs,
+    BOOL: _pack_bool,
+}
+UNPACKERS = {
+    HEX: bytes.hex,
+    HEXES: _unpack_hexes,
+    STR: lambda raw: raw.decode("utf-8"),
+    STRS: _unpack_strs,
+    UINT: lambda raw: int.from_bytes(raw, "big"),
+    UINTS: _unpack_ints,
+    PAIRS: _unpack_pairs,
+    BOOL: _unpack_bool,
+}
+
+
+def _encoder(fields):
+    """Table nom -> (tag, fonction d'encodage) d'un schema."""
+    table = {}
+    for name, (tag, kind) in fields.items():
+        if isinstance(kind, dict):
+            sub = _encoder(kind)
+            table[name] = (tag, lambda value, sub=sub: _pack_record(value, sub))
+        else:
+            table[name] = (tag, PACKERS[kind])
+    return table
+
+
+def _pack_record(value, table):
+    return _pack_fields(value, table) if isinstance(value, dict) else None
+
+
+def _pack_fields(obj, table, skip=None):
+    parts = []
+    extra = {}
+    pack_field = FIELD_STRUCT.pack
+    for name, value in obj.items():
+        spec = table.get(name)
+        if spec:
+            tag, pack = spec
+            raw = pack(value)
+            if raw is not None and len(raw) <= MAX_VALUE:
+                parts.append(pack_field(tag, len(raw)))
+                parts.append(raw)
+                continue
+        if name != skip:
+            extra[name] = value
+    if extra:
+        raw = json.dumps(extra, separators=(",", ":")).encode("utf-8")
+        if len(raw) > MAX_VALUE:
+            raise ValueError("Extensions trop grandes pour le codec binaire")
+        parts.append(pack_field(TAG_JSON, len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def _decoder(fields):
+    """Table tag -> (nom, fonction de decodage) d'un schema."""
+    table = {}
+    for name, (tag, kind) in fields.items():
+        if isinstance(kind, dict):
+            table[tag] = (name, lambda raw, sub=_decoder(kind): _unpack_fields(raw, sub))
+        else:
+            table[tag] = (name, UNPACKERS[kind])
+    return table
+
+
+def _unpack_fields(data, table):
+    obj = {}
+    pos = 0
+    end = len(data)
+    unpack_field = FIELD_STRUCT.unpack_from
+    while pos < end:
+        if pos + FIELD_SIZE > end:
+            raise ValueError("Champ tronque")
+        tag, size = unpack_field(data, pos)
+        pos += FIELD_SIZE
+        raw = data[pos : pos + size]
+        if len(raw) != size:
+            raise ValueError("Valeur tronquee")
+        pos += size
+        spec = table.get(tag)
+        if spec:
+            name, unpack = spec
+            obj[name] = unpack(raw)
+        elif tag == TAG_JSON:
+            extra = json.loads(raw.decode("utf-8"))
+            if not isinstance(extra, dict):
+                raise ValueError("Extensions invalides")
+            obj.update(extra)
+        # autre tag : champ d'une version plus recente, ignore
+    return obj
+
+
+ENCODERS = {
+    kind: (bytes((BINARY_MARK, CODEC_VERSION, kind_id)), _encoder(fields))
+    for kind, (kind_id, fields) in MESSAGES.items()
+}
+DECODERS = {kind_id: (kind, _decoder(fields)) for kind, (kind_id, fields) in MESSAGES.items()}
+
+
+def encode(kind, obj):
+    """Message binaire : en-tete (marque, version, type) puis champs TLV.
+
+    Les champs du schema de `kind` sont codes nativement (identifiants et
+    cles en octets bruts, entiers compacts) ; les autres voyagent dans un
+    champ JSON. La cle "kind" de `obj`, redondante avec l'en-tete, est omise.
+    """
+    header, table = ENCODERS[kind]
+    return header + _pack_fields(obj, table, skip="kind")
+
+
+def decode(data):
+    """Inverse de encode ; accepte aussi un objet JSON. Retourne (kind, obj).
+
+    ValueError si le message est tronque, d'une version inconnue, ou si
+    l'objet JSON n'est pas un dictionnaire.
+    """
+    data = bytes(data)  # message court : une copie, puis des tranches d'octets
+    if data[:1] == MARK_BYTE:
+        if len(data) < HEADER_SIZE:
+            raise ValueError("En-tete binaire tronque")
+        _, version, kind_id = struct.unpack_from(HEADER_FORMAT, data)
+        if version != CODEC_VERSION:
+            raise ValueError(f"Version de codec non supportee : {version}")
+        decoder = DECODERS.get(kind_id)
+        if decoder is None:
+            raise ValueError(f"Type de message inconnu : {kind_id}")
+        kind, table = decoder
+        return kind, _unpack_fields(data[HEADER_SIZE:], table)
+    obj = json.loads(data.decode("utf-8"))
+    if not isinstance(obj, dict):
+        raise ValueError("Message JSON invalide")
+    return obj.get("kind"), obj
+
+
+def encode_object(obj, binary=True):
+    """Objet de controle ("kind") : binaire si `binary` et si son type est connu, JSON sinon.
+
+    Un objet trop grand pour les longueurs sur 16 bits (long message
+    fragmente) part lui aussi en JSON ; decode accepte les deux formes.
+    """
+    kind = obj.get("kind")
+    if binary and kind in MESSAGES:
+        try:
+            return encode(kind, obj)
+        except ValueError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def decode_object(data):
+    kind, obj = decode(data)
+    if kind is not None:
+        obj["kind"] = kind
+    return obj
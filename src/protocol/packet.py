@@ -7,6 +7,12 @@ TYPE_HELLO = 0x01
 TYPE_HANDSHAKE_INIT = 0x02
 TYPE_HANDSHAKE_RESP = 0x03
 TYPE_SECURE_MSG = 0x04
+TYPE_HANDSHAKE_COOKIE = 0x05  # repondeur sous charge : HS_INIT a renvoyer avec ce cookie
+TYPE_MTU_PROBE = 0x06
+TYPE_MTU_ACK = 0x07
+
+HEADER_FORMAT = "!4s B B H"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
 
 
 def pack_hello(node_id):
@@ -17,21 +23,24 @@ def pack_hello(node_id):
 
 def pack_packet(packet_type, payload):
     """Construit un paquet Archipel generique."""
-    header = struct.pack("!4s B B H", MAGIC, VERSION, packet_type, len(payload))
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, packet_type, len(payload))
     return header + payload
 
 
 def unpack_packet(data):
-    """Decode un paquet recu."""
-    header_size = struct.calcsize("!4s B B H")
-    if len(data) < header_size:
+    """Decode un paquet recu.
+
+    Le payload est une vue (memoryview) sur `data`, sans copie : il n'est
+    valable que tant que le tampon de reception n'est pas reutilise.
+    """
+    if len(data) < HEADER_SIZE:
         return None
 
-    magic, ver, m_type, p_len = struct.unpack("!4s B B H", data[:header_size])
+    magic, ver, m_type, p_len = struct.unpack_from(HEADER_FORMAT, data)
     if magic != MAGIC or ver != VERSION:
         return None
 
-    payload = data[header_size : header_size + p_len]
+    payload = memoryview(data)[HEADER_SIZE : HEADER_SIZE + p_len]
     if len(payload) != p_len:
         return None
     return {"type": m_type, "payload": payload}
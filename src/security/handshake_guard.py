@@ -0,0 +1,137 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+
+HANDSHAKE_LOAD_THRESHOLD = 50  # HS_INIT recus par seconde au-dela desquels un cookie est exige
+IP_HANDSHAKE_RATE = 10.0  # handshakes complets par seconde et par adresse IP
+IP_HANDSHAKE_BURST = 40  # rafale toleree par adresse (redemarrage, renegociations)
+COOKIE_SECRET_LIFETIME = 120.0  # rotation du secret ; le precedent reste valide un cycle
+COOKIE_SIZE = 16
+MAX_TRACKED_IPS = 4096
+
+ADMIT = "admit"
+SEND_COOKIE = "cookie"
+DROP = "drop"
+
+
+class HandshakeGuard:
+    """Filtre les HS_INIT avant le travail couteux (X25519, HKDF, trust store).
+
+    Sous charge, un HS_INIT doit renvoyer le cookie recu pour son adresse
+    source (cf. WireGuard) : un emetteur a l'adresse usurpee ne le recoit
+    jamais. Le cookie est un HMAC de l'adresse, sans etat cote repondeur.
+    Chaque IP a en plus un debit borne de handshakes complets.
+    """
+
+    def __init__(
+        self,
+        load_threshold=HANDSHAKE_LOAD_THRESHOLD,
+        ip_rate=IP_HANDSHAKE_RATE,
+        ip_burst=IP_HANDSHAKE_BURST,
+    ):
+        self.load_threshold = load_threshold
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self._lock = threading.Lock()
+        self._secret = os.urandom(32)
+        self._previous_secret = self._secret
+        self._rotated = time.time()
+        self._window = 0  # seconde courante (entier) du comptage de charge
+        self._window_count = 0
+        self._last_count = 0
+        self._buckets = {}  # ip -> [jetons, dernier remplissage]
+        self._stats = {
+            "inits": 0,
+            "cookies_sent": 0,
+            "cookies_valid": 0,
+            "cookies_invalid": 0,
+            "rate_limited": 0,
+        }
+
+    def admit(self, addr, cookie_hex=None):
+        """Decision pour un HS_INIT venu de `addr` : ADMIT, SEND_COOKIE ou DROP."""
+        now = time.time()
+        with self._lock:
+            self._stats["inits"] += 1
+            loaded = self._count_load(now)
+            if cookie_hex is not None:
+                if self._valid_cookie(addr, cookie_hex, now):
+                    self._stats["cookies_valid"] += 1
+                else:
+                    self._stats["cookies_invalid"] += 1
+                    if loaded:
+                        self._stats["cookies_sent"] += 1
+                        return SEND_COOKIE
+            elif loaded:
+                self._stats["cookies_sent"] += 1
+                return SEND_COOKIE
+            if not self._take_token(addr[0], now):
+                self._stats["rate_limited"] += 1
+                return DROP
+            return ADMIT
+
+    def cookie(self, addr):
+        """Cookie attendu de `addr` (bytes)."""
+        with self._lock:
+            self._rotate(time.time())
+            return self._mac(self._secret, addr)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "under_load": self._last_count > self.load_threshold}
+
+    def _count_load(self, now):
+        second = int(now)
+        if second != self._window:
+            self._last_count = self._window_count if second == self._window + 1 else 0
+            self._window = second
+            self._window_count = 0
+        self._window_count += 1
+        return max(self._window_count, self._last_count) > self.load_threshold
+
+    def _valid_cookie(self, addr, cookie_hex, now):
+        try:
+            cookie = bytes.fromhex(cookie_hex)
+        except (TypeError, ValueError):
+            return False
+        self._rotate(now)
+        return any(
+            hmac.compare_digest(cookie, self._mac(secret, addr))
+            for secret in (self._secret, self._previous_secret)
+        )
+
+    def _mac(self, secret, addr):
+        source = f"{addr[0]}:{addr[1]}".encode("ascii")
+        return hmac.new(secret, source, hashlib.sha256).digest()[:COOKIE_SIZE]
+
+    def _rotate(self, now):
+        if now - self._rotated >= COOKIE_SECRET_LIFETIME:
+            self._previous_secret = self._secret
+            self._secret = os.urandom(32)
+            self._rotated = now
+
+    def _take_token(self, ip, now):
+        bucket = self._buckets.get(ip)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_IPS:
+                self._prune(now)
+            bucket = self._buckets[ip] = [self.ip_burst, now]
+        tokens = min(self.ip_burst, bucket[0] + (now - bucket[1]) * self.ip_rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def _prune(self, now):
+        # Une adresse dont le seau serait de nouveau plein n'a plus rien a retenir.
+        refill = self.ip_burst / self.ip_rate if self.ip_rate else float("inf")
+        for ip, (_, last) in list(self._buckets.items()):
+            if now - last >= refill:
+                del self._buckets[ip]
+        if len(self._buckets) >= MAX_TRACKED_IPS:
+            self._buckets.clear()
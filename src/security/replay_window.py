@@ -0,0 +1,45 @@
+import threading
+
+
+REPLAY_WINDOW = 4096  # compteurs retenus sous le plus grand recu (tolere le reordonnancement)
+
+
+class ReplayWindow:
+    """Fenetre glissante anti-rejeu sur les compteurs de paquets (cf. IPsec, WireGuard).
+
+    Le bit i de `_bits` indique que le compteur `top - i` a ete accepte. Un
+    compteur plus vieux que la fenetre ou deja vu est refuse.
+    """
+
+    def __init__(self, size=REPLAY_WINDOW):
+        self.size = size
+        self._lock = threading.Lock()
+        self._top = -1
+        self._bits = 0
+
+    def check(self, counter):
+        """Filtre avant dechiffrement ; ne modifie pas la fenetre."""
+        with self._lock:
+            return not self._seen(counter)
+
+    def accept(self, counter):
+        """Enregistre un compteur authentifie ; False s'il a ete accepte entre-temps."""
+        with self._lock:
+            if self._seen(counter):
+                return False
+            if counter > self._top:
+                shift = counter - self._top
+                if shift >= self.size:
+                    self._bits = 1  # saut plus grand que la fenetre : on repart de zero
+                else:
+                    self._bits = ((self._bits << shift) | 1) & ((1 << self.size) - 1)
+                self._top = counter
+            else:
+                self._bits |= 1 << (self._top - counter)
+            return True
+
+    def _seen(self, counter):
+        if counter > self._top:
+            return False
+        offset = self._top - counter
+        return offset >= self.size or bool(self._bits >> offset & 1)
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+import time
+
+
+RESUMPTION_PATH = "data/keys/resumption.json"
+TICKET_LIFETIME = 7 * 24 * 3600  # un ticket plus vieux impose un handshake complet (secondes)
+
+
+class ResumptionStore:
+    """Tickets de reprise de session, un par pair, persistes pres de la cle d'identite.
+
+    Les deux pairs d'un handshake complet enregistrent le meme ticket
+    (identifiant public + secret). Cote repondeur, un ticket ne sert qu'une
+    fois : rejouer le premier paquet d'une reprise ne rouvre pas la session.
+    """
+
+    def __init__(self, path=RESUMPTION_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._tickets = {}  # peer_id -> {"id": hex, "secret": hex, "suite": str, "issued": int}
+        self._load()
+
+    def _load(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._tickets = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"\n[SECURITY] Tickets de reprise illisibles, ignores : {e}")
+            self._tickets = {}
+
+    def _save(self):
+        # Sous self._lock. Fichier secret : lisible par le seul proprietaire.
+        tmp = self.path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._tickets, f)
+        os.replace(tmp, self.path)
+
+    def get(self, peer_id):
+        """Ticket valide pour un pair (secret en bytes), sans le consommer."""
+        with self._lock:
+            ticket = self._tickets.get(peer_id)
+            if not ticket:
+                return None
+            if time.time() - ticket["issued"] > TICKET_LIFETIME:
+                del self._tickets[peer_id]
+                self._save()
+                return None
+            return {**ticket, "secret": bytes.fromhex(ticket["secret"])}
+
+    def take(self, peer_id, ticket_id):
+        """Consomme le ticket `ticket_id` d'un pair ; None s'il est inconnu ou deja utilise."""
+        with self._lock:
+            ticket = self._tickets.get(peer_id)
+            if not ticket or ticket["id"] != ticket_id:
+                return None
+            del self._tickets[peer_id]
+            self._save()
+        if time.time() - ticket["issued"] > TICKET_LIFETIME:
+            return None
+        return {**ticket, "secret": bytes.fromhex(ticket["secret"])}
+
+    def save(self, peer_id, ticket_id, secret, suite):
+        with self._lock:
+            self._tickets[peer_id] = {
+                "id": ticket_id,
+                "secret": secret.hex(),
+                "suite": suite,
+                "issued": int(time.time()),
+            }
+            self._save()
+
+    def discard(self, peer_id):
+        with self._lock:
+            if self._tickets.pop(peer_id, None):
+                self._save()
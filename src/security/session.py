@@ -1,34 +1,133 @@
 import hashlib
 import hmac
+import itertools
 import os
 
-from nacl.bindings import crypto_scalarmult
+from nacl.bindings import (
+    crypto_aead_chacha20poly1305_ietf_decrypt,
+    crypto_aead_chacha20poly1305_ietf_encrypt,
+    crypto_scalarmult,
+)
+from nacl.exceptions import CryptoError
 from nacl.public import PrivateKey
 from Crypto.Cipher import AES
 from Crypto.Protocol.KDF import HKDF
 from Crypto.Hash import SHA256
 
+from src.security.replay_window import ReplayWindow
+
+
+SUITE_CHACHA20 = "chacha20-poly1305"  # AEAD une passe (libsodium)
+SUITE_AES_GCM = "aes-256-gcm"  # AEAD une passe (pycryptodome)
+SUITE_LEGACY = "aes-gcm-hmac"  # format historique : AES-GCM puis HMAC-SHA256
+DEFAULT_SUITES = [SUITE_CHACHA20, SUITE_AES_GCM, SUITE_LEGACY]  # ordre de preference
+NONCE_SIZE = 12
+TAG_SIZE = 16
+MAC_SIZE = 32
+# Suites AEAD : nonce = prefixe de sens (4 octets) + compteur de paquets (8 octets).
+REKEY_AFTER_MESSAGES = 2**32  # au-dela, l'emetteur renegocie une session
+REJECT_AFTER_MESSAGES = 2**33  # au-dela, la session refuse de chiffrer
+
 
 def generate_ephemeral_keypair():
     priv = PrivateKey.generate()
     return bytes(priv), bytes(priv.public_key)
 
 
-def derive_session_keys(local_private_key, remote_public_key, transcript):
+def negotiate_suite(offered, accepted):
+    """Suite retenue par le repondeur : la premiere de l'initiateur qu'il accepte.
+
+    Un initiateur ancien n'annonce rien (`offered` None) : format historique.
+    """
+    if offered is None:
+        return SUITE_LEGACY if SUITE_LEGACY in accepted else None
+    if not isinstance(offered, list):
+        return None
+    for suite in offered:
+        if suite in accepted:
+            return suite
+    return None
+
+
+def derive_session_keys(
+    local_private_key, remote_public_key, transcript, suite=SUITE_LEGACY, first=True
+):
     """
-    Derive 2 keys from X25519 shared secret:
-    - enc_key (AES-256-GCM)
-    - mac_key (HMAC-SHA256)
+    Derive les cles de session du secret partage X25519.
+    - suite historique : enc_key (AES-256-GCM) + mac_key (HMAC-SHA256), nonces aleatoires
+    - suites AEAD : une seule cle, le nom de la suite entre dans la derivation ;
+      nonces a compteur, `first` (noeud local premier du transcript) fixant
+      le prefixe de chaque sens pour que les deux pairs ne partagent aucun nonce
     """
+    if suite not in DEFAULT_SUITES:
+        raise ValueError(f"Suite inconnue : {suite}")
     shared_secret = crypto_scalarmult(local_private_key, remote_public_key)
+    legacy = suite == SUITE_LEGACY
     okm = HKDF(
         master=shared_secret,
-        key_len=64,
+        key_len=64 if legacy else 32,
         salt=hashlib.sha256(transcript).digest(),
         hashmod=SHA256,
-        context=b"archipel-session-v1",
+        context=b"archipel-session-v1" if legacy else b"archipel-session-v2/" + suite.encode("ascii"),
     )
-    return okm[:32], okm[32:]
+    if legacy:
+        return {"suite": suite, "enc_key": okm[:32], "mac_key": okm[32:]}
+    keys = _aead_session(suite, okm, first)
+    # Secret de reprise : permet au prochain handshake avec ce pair d'etre 0-RTT.
+    keys["resumption"] = HKDF(
+        master=shared_secret,
+        key_len=32,
+        salt=hashlib.sha256(transcript).digest(),
+        hashmod=SHA256,
+        context=b"archipel-resume-v1",
+    )
+    return keys
+
+
+def derive_early_keys(resumption_secret, salt, suite, first=True):
+    """Cles 0-RTT d'une reprise : derivees du secret de reprise et d'un alea de l'initiateur.
+
+    Sans secret ephemere, elles n'ont pas de confidentialite persistante :
+    l'echange X25519 qui suit les remplace des la reponse recue.
+    """
+    if suite not in DEFAULT_SUITES or suite == SUITE_LEGACY:
+        raise ValueError(f"Suite sans reprise : {suite}")
+    okm = HKDF(
+        master=resumption_secret,
+        key_len=32,
+        salt=hashlib.sha256(salt).digest(),
+        hashmod=SHA256,
+        context=b"archipel-early-v1/" + suite.encode("ascii"),
+    )
+    keys = _aead_session(suite, okm, first)
+    keys["zero_rtt"] = True
+    return keys
+
+
+def ticket_id(resumption_secret):
+    """Identifiant public d'un ticket de reprise (le secret ne circule jamais)."""
+    return hashlib.sha256(b"archipel-ticket" + resumption_secret).digest()[:16].hex()
+
+
+def _aead_session(suite, key, first):
+    send_prefix, recv_prefix = (b"\0\0\0\1", b"\0\0\0\2") if first else (b"\0\0\0\2", b"\0\0\0\1")
+    return {
+        "suite": suite,
+        "enc_key": key,
+        "mac_key": None,
+        "send_prefix": send_prefix,
+        "recv_prefix": recv_prefix,
+        "send_seq": itertools.count(),
+        "replay": ReplayWindow(),
+        "rekey_after": REKEY_AFTER_MESSAGES,
+        "reject_after": REJECT_AFTER_MESSAGES,
+        "rekey": False,
+    }
+
+
+def overhead(suite):
+    """Octets ajoutes au clair par la suite (nonce, tag, MAC)."""
+    return NONCE_SIZE + TAG_SIZE + (MAC_SIZE if suite == SUITE_LEGACY else 0)
 
 
 def encrypt_payload(enc_key, mac_key, plaintext):
@@ -40,8 +139,81 @@ def encrypt_payload(enc_key, mac_key, plaintext):
 
 
 def decrypt_payload(enc_key, mac_key, nonce, ciphertext, tag, mac):
-    expected = hmac.new(mac_key, nonce + ciphertext + tag, hashlib.sha256).digest()
+    # MAC calcule par morceaux : pas de concatenation nonce + chiffre + tag.
+    h = hmac.new(mac_key, nonce, hashlib.sha256)
+    h.update(ciphertext)
+    h.update(tag)
+    expected = h.digest()
     if not hmac.compare_digest(expected, mac):
         raise ValueError("HMAC invalide")
     cipher = AES.new(enc_key, AES.MODE_GCM, nonce=nonce)
     return cipher.decrypt_and_verify(ciphertext, tag)
+
+
+def seal(keys, aad, plaintext):
+    """Chiffre selon la suite de la session.
+
+    Historique : nonce | tag | mac | chiffre (AAD ignoree, format inchange).
+    AEAD : nonce | chiffre | tag, avec `aad` (en-tete en clair) authentifiee.
+    Passe `rekey_after` messages, `keys["rekey"]` demande une renegociation ;
+    passe `reject_after`, ValueError : un nonce ne doit jamais resservir.
+    """
+    suite = keys["suite"]
+    if suite == SUITE_LEGACY:
+        nonce, ciphertext, tag, mac = encrypt_payload(keys["enc_key"], keys["mac_key"], plaintext)
+        return nonce + tag + mac + ciphertext
+    counter = next(keys["send_seq"])  # atomique sous le GIL
+    if counter >= keys["rekey_after"]:
+        keys["rekey"] = True
+        if counter >= keys["reject_after"]:
+            raise ValueError("Session epuisee, renegociation requise")
+    nonce = keys["send_prefix"] + counter.to_bytes(8, "big")
+    if suite == SUITE_CHACHA20:
+        return nonce + crypto_aead_chacha20poly1305_ietf_encrypt(
+            bytes(plaintext), aad, nonce, keys["enc_key"]
+        )
+    cipher = AES.new(keys["enc_key"], AES.MODE_GCM, nonce=nonce)
+    cipher.update(aad)
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+    return nonce + ciphertext + tag
+
+
+def _chacha20_open(ciphertext, aad, nonce, key):
+    """Dechiffrement ChaCha20-Poly1305 (libsodium, binding public de PyNaCl).
+
+    Le binding exige des bytes : la vue recue est copiee une fois ici.
+    """
+    return crypto_aead_chacha20poly1305_ietf_decrypt(bytes(ciphertext), aad, nonce, key)
+
+
+def open_sealed(keys, aad, sealed):
+    """Inverse de seal ; ValueError si le message est tronque ou falsifie.
+
+    Suites AEAD : None pour un rejeu, ecarte par la fenetre avant tout
+    dechiffrement (et de nouveau apres, si un autre thread l'a accepte).
+    """
+    suite = keys["suite"]
+    if len(sealed) < overhead(suite):
+        raise ValueError("Message chiffre tronque")
+    nonce = bytes(sealed[:NONCE_SIZE])
+    if suite == SUITE_LEGACY:
+        tag = sealed[NONCE_SIZE : NONCE_SIZE + TAG_SIZE]
+        mac = sealed[NONCE_SIZE + TAG_SIZE : NONCE_SIZE + TAG_SIZE + MAC_SIZE]
+        ciphertext = sealed[NONCE_SIZE + TAG_SIZE + MAC_SIZE :]
+        return decrypt_payload(keys["enc_key"], keys["mac_key"], nonce, ciphertext, tag, mac)
+    if nonce[:4] != keys["recv_prefix"]:
+        raise ValueError("Nonce hors sequence")
+    counter = int.from_bytes(nonce[4:], "big")
+    window = keys["replay"]
+    if not window.check(counter):
+        return None
+    if suite == SUITE_CHACHA20:
+        try:
+            plaintext = _chacha20_open(sealed[NONCE_SIZE:], aad, nonce, keys["enc_key"])
+        except CryptoError:
+            raise ValueError("Tag AEAD invalide")
+    else:
+        cipher = AES.new(keys["enc_key"], AES.MODE_GCM, nonce=nonce)
+        cipher.update(aad)
+        plaintext = cipher.decrypt_and_verify(sealed[NONCE_SIZE:-TAG_SIZE], sealed[-TAG_SIZE:])
+    return plaintext if window.accept(counter) else None
@@ -1,15 +1,31 @@
 import json
 import os
+import threading
 import time
 
 
 TRUST_PATH = "data/trust/trust_store.json"
+FLUSH_INTERVAL = 2.0  # delai max avant ecriture des changements en memoire (secondes)
 
 
 class TrustStore:
-    def __init__(self, path=TRUST_PATH):
+    """Pairs connus et confiance accordee, en memoire, ecrits en differe.
+
+    La reception met a jour `last_seen` a chaque paquet : ces changements
+    sont regroupes et ecrits au plus une fois par `flush_interval`
+    (fichier temporaire puis renommage atomique). `set_trusted`, decision
+    explicite de l'utilisateur, est ecrit tout de suite ; `flush()` a l'arret.
+    """
+
+    def __init__(self, path=TRUST_PATH, flush_interval=FLUSH_INTERVAL):
         self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()  # la reception peut etre multi-thread
         self._data = {"peers": {}}
+        self._dirty = False
+        self._timer = None
+        self.writes = 0
+        self.version = 0  # incremente a chaque decision de confiance (nouveau pair, set_trusted)
         self._load()
 
     def _load(self):
@@ -24,34 +40,62 @@ class TrustStore:
             self._save()
 
     def _save(self):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self._data, f, indent=2)
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp, self.path)
+            self._dirty = False
+            self.writes += 1
+
+    def _touch(self):
+        # Sous self._lock : une seule ecriture programmee pour tous les changements.
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Ecrit les changements en attente (appele aussi a l'arret du noeud)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self._save()
 
     def check_or_trust_first_use(self, node_id):
-        peers = self._data.setdefault("peers", {})
-        if node_id in peers:
-            return True, "known"
-        peers[node_id] = {
-            "trusted": False,
-            "first_seen": int(time.time()),
-            "last_seen": int(time.time()),
-        }
-        self._save()
-        return True, "first_seen"
+        with self._lock:
+            peers = self._data.setdefault("peers", {})
+            if node_id in peers:
+                return True, "known"
+            peers[node_id] = {
+                "trusted": False,
+                "first_seen": int(time.time()),
+                "last_seen": int(time.time()),
+            }
+            self.version += 1
+            self._touch()
+            return True, "first_seen"
 
     def mark_seen(self, node_id):
-        peers = self._data.setdefault("peers", {})
-        if node_id in peers:
-            peers[node_id]["last_seen"] = int(time.time())
-            self._save()
+        with self._lock:
+            peers = self._data.setdefault("peers", {})
+            now = int(time.time())
+            if node_id in peers and peers[node_id].get("last_seen") != now:
+                peers[node_id]["last_seen"] = now
+                self._touch()
 
     def set_trusted(self, node_id, trusted=True):
-        peers = self._data.setdefault("peers", {})
-        if node_id not in peers:
-            peers[node_id] = {}
-        peers[node_id]["trusted"] = bool(trusted)
-        peers[node_id]["last_seen"] = int(time.time())
-        self._save()
+        with self._lock:
+            peers = self._data.setdefault("peers", {})
+            if node_id not in peers:
+                peers[node_id] = {}
+            peers[node_id]["trusted"] = bool(trusted)
+            self.version += 1
+            peers[node_id]["last_seen"] = int(time.time())
+            self._save()
 
     def is_trusted(self, node_id):
         return bool(self._data.get("peers", {}).get(node_id, {}).get("trusted", False))
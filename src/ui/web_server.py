@@ -422,6 +422,9 @@ def start_web_server(node, port=5000):
     @app.route('/api/files')
     def files(): return jsonify(node.transfer.list_remote_offers())
 
+    @app.route('/api/transfers')
+    def transfers(): return jsonify(node.transfer.list_uploads())
+
     @app.route('/api/trust/<peer_id>', methods=['POST'])
     def trust(peer_id):
         node.trust_store.set_trusted(peer_id, True)